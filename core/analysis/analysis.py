@@ -0,0 +1,268 @@
+"""
+core/analysis/analysis.py
+Análise de caminhos do fluxo: contagem, espera acumulada, caminho crítico e folga.
+
+Em vez de enumerar os caminhos start→end (exponencial com decisions em
+sequência), usa programação dinâmica sobre o DAG condensado da IR:
+- os ciclos (laços de nova tentativa) viram um componente (Tarjan, o mesmo
+  de core.query), percorrido uma vez: a espera do componente é a soma das
+  esperas dos seus nós;
+- a espera de cada nó vem de `delay.min_seconds`/`max_seconds` (nós de
+  outros tipos contam 0);
+- `analyze_paths` faz uma passada em ordem topológica a partir do start
+  (caminhos, espera mínima e máxima, predecessor crítico) e uma em ordem
+  inversa (maior espera até um end), O(nós + edges) no total;
+- `monte_carlo` sorteia branches (uniforme entre as edges de saída) e
+  esperas (uniforme em [min, max]) em lotes: todas as amostras de um lote
+  avançam juntas pelo DAG, cada componente alcançado é visitado uma vez por lote.
+"""
+import random
+from heapq import heappop, heappush
+from typing import Any, Dict, List, Optional
+
+from core.compiler.graph import CompiledGraph
+from core.profiler.profiler import annotate, instrumented, phase
+from core.query.query import _condense, _strongly_connected
+
+MC_SAMPLES = 10000
+MC_BATCH = 4096
+PERCENTILES = (50, 90, 99)
+
+
+def _seconds(block: Any, key: str) -> float:
+    value = block.get(key, 0) if isinstance(block, dict) else 0
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return 0.0
+    return max(float(value), 0.0)
+
+
+def _prepare(data: Dict[str, Any], graph: CompiledGraph) -> Dict[str, Any]:
+    """DAG condensado, espera por componente, componente do start e dos ends."""
+    node_index = graph.node_index
+    entry = data.get('entry', {})
+    start = node_index.get(entry.get('start'))
+    if start is None:
+        raise ValueError(f"Start ausente ou desconhecido: {entry.get('start')}")
+    comp, num_comps = _strongly_connected(graph.num_nodes, graph.next_offsets, graph.next_targets)
+    succ = _condense(graph, comp, num_comps)
+    members: List[List[int]] = [[] for _ in range(num_comps)]
+    low = [0.0] * num_comps
+    high = [0.0] * num_comps
+    spans: List[List[float]] = [[] for _ in range(num_comps)]
+    nodes = data.get('nodes', {})
+    for i, node_id in enumerate(graph.node_ids):
+        c = comp[i]
+        members[c].append(i)
+        block = nodes[node_id].get('delay')
+        if block is None:
+            continue
+        lo = _seconds(block, 'min_seconds')
+        hi = max(_seconds(block, 'max_seconds'), lo)
+        low[c] += lo
+        high[c] += hi
+        if hi > lo:
+            spans[c].append(hi - lo)
+    end_ids = [e for e in entry.get('ends', []) if e in node_index]
+    if not end_ids:
+        end_ids = [graph.node_ids[i] for i in range(graph.num_nodes) if graph.out_degree(i) == 0]
+    end_of: Dict[int, str] = {}
+    for e in end_ids:
+        end_of.setdefault(comp[node_index[e]], e)
+    return {
+        'comp': comp, 'num_comps': num_comps, 'succ': succ, 'members': members,
+        'low': low, 'high': high, 'spans': spans,
+        'start': comp[start], 'end_ids': end_ids, 'end_of': end_of,
+    }
+
+
+@instrumented()
+def analyze_paths(data: Dict[str, Any], compiled: Dict[str, Any]) -> Dict[str, Any]:
+    """Caminhos, espera mínima/máxima por end, caminho crítico e folga por nó.
+
+    Retorna `paths_total`, `ends` (`{end: {paths, min_seconds, max_seconds}}`,
+    com None nas esperas de ends inalcançáveis), `critical_path`
+    (`{end, max_seconds, nodes}`), `slack` (`{nó: segundos}`, None para nós
+    fora de qualquer caminho start→end), `cycles` e `unreachable`.
+    A folga de um nó é quanto a espera máxima dos caminhos que passam por ele
+    pode crescer sem aumentar a do caminho crítico.
+    """
+    graph: CompiledGraph = compiled['graph']
+    annotate(nodes=graph.num_nodes, edges=graph.num_edges)
+    with phase('condense') as span:
+        dag = _prepare(data, graph)
+        span.set(components=dag['num_comps'])
+    succ, low, high, end_of = dag['succ'], dag['low'], dag['high'], dag['end_of']
+    s = dag['start']
+    num_comps = dag['num_comps']
+    # Componentes numeradas com os sorvedouros primeiro: c→d implica c > d,
+    # então tudo que o start alcança tem índice <= s e s, s-1, ..., 0 é topológica
+    with phase('path_dp'):
+        paths = [0] * num_comps
+        early = [0.0] * num_comps
+        late = [0.0] * num_comps
+        parent = [-1] * num_comps
+        paths[s] = 1
+        early[s] = low[s]
+        late[s] = high[s]
+        for c in range(s, -1, -1):
+            count = paths[c]
+            if not count:
+                continue
+            e, l = early[c], late[c]
+            for d in succ[c]:
+                if paths[d]:
+                    paths[d] += count
+                    if e + low[d] < early[d]:
+                        early[d] = e + low[d]
+                    if l + high[d] > late[d]:
+                        late[d] = l + high[d]
+                        parent[d] = c
+                else:
+                    paths[d] = count
+                    early[d] = e + low[d]
+                    late[d] = l + high[d]
+                    parent[d] = c
+    with phase('slack'):
+        # Maior espera de c (inclusive) até um end; -1 quando nenhum end é alcançável
+        tail = [-1.0] * num_comps
+        for c in range(s + 1):
+            best = 0.0 if c in end_of else -1.0
+            for d in succ[c]:
+                if tail[d] > best:
+                    best = tail[d]
+            if best >= 0:
+                tail[c] = high[c] + best
+        reached = [c for c in end_of if paths[c]]
+        critical_end = max(reached, key=lambda c: (late[c], -c)) if reached else None
+        total = late[critical_end] if critical_end is not None else 0.0
+        slack: Dict[str, Optional[float]] = {}
+        comp, node_ids = dag['comp'], graph.node_ids
+        for i, node_id in enumerate(node_ids):
+            c = comp[i]
+            slack[node_id] = total - (late[c] + tail[c] - high[c]) if paths[c] and tail[c] >= 0 else None
+    critical: List[str] = []
+    c = critical_end if critical_end is not None else -1
+    while c != -1:
+        critical.extend(node_ids[i] for i in reversed(dag['members'][c]))
+        c = parent[c]
+    critical.reverse()
+    ends = {}
+    for e in dag['end_ids']:
+        c = comp[graph.node_index[e]]
+        ends[e] = {
+            'paths': paths[c],
+            'min_seconds': early[c] if paths[c] else None,
+            'max_seconds': late[c] if paths[c] else None,
+        }
+    return {
+        'start': data['entry']['start'],
+        'nodes': graph.num_nodes,
+        'components': num_comps,
+        'cycles': sum(1 for m in dag['members'] if len(m) > 1),
+        'paths_total': sum(paths[c] for c in end_of),
+        'ends': ends,
+        'critical_path': {
+            'end': end_of[critical_end] if critical_end is not None else None,
+            'max_seconds': total,
+            'nodes': critical,
+        },
+        'slack': slack,
+        'unreachable': [node_ids[i] for i in range(graph.num_nodes) if not paths[comp[i]]],
+    }
+
+
+def _summary(values: List[float]) -> Dict[str, Optional[float]]:
+    if not values:
+        return {'mean': None, 'min': None, 'max': None, **{f'p{p}': None for p in PERCENTILES}}
+    values.sort()
+    last = len(values) - 1
+    result = {'mean': sum(values) / len(values), 'min': values[0], 'max': values[-1]}
+    for p in PERCENTILES:
+        result[f'p{p}'] = values[round(last * p / 100)]
+    return result
+
+
+@instrumented()
+def monte_carlo(
+    data: Dict[str, Any],
+    compiled: Dict[str, Any],
+    samples: int = MC_SAMPLES,
+    seed: int = 0,
+    batch_size: int = MC_BATCH,
+) -> Dict[str, Any]:
+    """Simula `samples` execuções do start até um end (mesma semente → mesmo resultado).
+
+    Em cada componente a amostra soma a espera sorteada dos nós e segue por uma
+    das edges que saem do componente (uniforme; edges repetidas pesam mais).
+    Retorna `completed`, `dead_ends` (amostras presas em nós sem saída que não
+    são end), `seconds` (média, mínimo, máximo e percentis das que chegaram) e,
+    por end, `probability` e as mesmas estatísticas.
+    """
+    graph: CompiledGraph = compiled['graph']
+    annotate(nodes=graph.num_nodes, edges=graph.num_edges)
+    with phase('condense'):
+        dag = _prepare(data, graph)
+    comp = dag['comp']
+    num_comps = dag['num_comps']
+    low, spans, end_of = dag['low'], dag['spans'], dag['end_of']
+    # Destinos por edge que sai do componente (com repetição): pesos do sorteio
+    choices: List[List[int]] = [[] for _ in range(num_comps)]
+    for a, b in zip(graph.edge_src, graph.edge_dst):
+        if comp[a] != comp[b]:
+            choices[comp[a]].append(comp[b])
+    rng = random.Random(seed)
+    draw = rng.random
+    s = dag['start']
+    by_end: Dict[int, List[float]] = {c: [] for c in end_of}
+    dead_ends = 0
+    with phase('monte_carlo') as span:
+        remaining = samples
+        while remaining > 0:
+            size = min(batch_size, remaining)
+            remaining -= size
+            # Só os componentes com amostras entram no heap (maior índice = mais cedo na ordem topológica)
+            buckets: Dict[int, List[float]] = {s: [0.0] * size}
+            active = [-s]
+            while active:
+                c = -heappop(active)
+                times = buckets.pop(c)
+                base = low[c]
+                if base:
+                    times = [t + base for t in times]
+                for width in spans[c]:
+                    times = [t + width * draw() for t in times]
+                if c in end_of:
+                    by_end[c].extend(times)
+                    continue
+                targets = choices[c]
+                if not targets:
+                    dead_ends += len(times)
+                    continue
+                if len(targets) == 1:
+                    d = targets[0]
+                    if d in buckets:
+                        buckets[d].extend(times)
+                    else:
+                        buckets[d] = times
+                        heappush(active, -d)
+                    continue
+                for t, d in zip(times, rng.choices(targets, k=len(times))):
+                    bucket = buckets.get(d)
+                    if bucket is None:
+                        buckets[d] = [t]
+                        heappush(active, -d)
+                    else:
+                        bucket.append(t)
+        span.set(samples=samples, batch_size=batch_size)
+    every = [t for times in by_end.values() for t in times]
+    ends = {}
+    for c, e in end_of.items():
+        ends[e] = {'probability': len(by_end[c]) / samples if samples else 0.0, **_summary(by_end[c])}
+    return {
+        'samples': samples,
+        'seed': seed,
+        'completed': len(every),
+        'dead_ends': dead_ends,
+        'seconds': _summary(every),
+        'ends': ends,
+    }
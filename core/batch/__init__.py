@@ -0,0 +1 @@
+# __init__.py para tornar o diretório batch um pacote Python
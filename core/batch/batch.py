@@ -0,0 +1,189 @@
+"""
+core/batch/batch.py
+Processamento em lote de arquivos .sff em um pool de processos.
+
+Cada arquivo passa por leitura, validação estrutural, ligação dos subflows e
+compilação (validação lógica) por `load_flow`, como na CLI, e,
+opcionalmente, layout + exportação. Cada processo mantém um cache em memória,
+então módulos referenciados por vários arquivos são compilados uma vez por
+worker. Os resultados são emitidos
+como JSON lines à medida que ficam prontos e o código de saída agregado é o
+maior código individual (0 = todos OK).
+"""
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Dict, Iterable, Iterator, List, Optional, TextIO
+
+from core.cache.cache import FlowCache, MemoryCache
+from core.reader.reader import read_sff_file
+from core.validator.validator import validate_sff_structure
+from core.linker.linker import load_flow
+from core.layout.ranking import DEFAULT_RANK_MODE
+from core.exporters.registry import get_exporter, write_output
+
+# Mesmos códigos de saída da CLI
+EXIT_OK = 0
+EXIT_LOGIC_ERRORS = 1
+EXIT_STRUCTURE_ERRORS = 2
+EXIT_EXCEPTION = 3
+
+# Cache de compile/layout do processo (módulos compartilhados entre arquivos);
+# poucas entradas, pois cada uma guarda a IR de um fluxo inteiro
+CACHE_ENTRIES = 16
+_process_cache: Optional[FlowCache] = None
+
+
+def collect_files(patterns: Iterable[str]) -> List[str]:
+    """Expande diretórios (busca recursiva por *.sff), globs e arquivos em uma lista ordenada sem repetição."""
+    found = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            found.update(glob.glob(os.path.join(pattern, '**', '*.sff'), recursive=True))
+        elif glob.has_magic(pattern):
+            found.update(p for p in glob.glob(pattern, recursive=True) if os.path.isfile(p))
+        else:
+            found.add(pattern)
+    return sorted(found)
+
+
+def output_names(files: List[str]) -> Dict[str, str]:
+    """Nome de saída (sem extensão) de cada arquivo: o caminho relativo à raiz comum das entradas.
+
+    Arquivos de um mesmo diretório saem só com o nome; `a/flow.sff` e
+    `b/flow.sff` viram `a/flow` e `b/flow`, sem sobrescrever um ao outro.
+    """
+    if not files:
+        return {}
+    paths = {f: os.path.abspath(f) for f in files}
+    try:
+        root = os.path.commonpath([os.path.dirname(p) for p in paths.values()])
+    except ValueError:
+        # Unidades diferentes (Windows): caminho completo sem a unidade
+        root = None
+    names = {}
+    for f, path in paths.items():
+        rel = os.path.relpath(path, root) if root else os.path.splitdrive(path)[1].lstrip(os.sep)
+        names[f] = os.path.splitext(rel)[0]
+    return names
+
+
+class _ByteCounter:
+    """Sink binário que só conta bytes (tamanho da saída sem guardá-la)."""
+
+    mode = 'wb'
+
+    def __init__(self):
+        self.count = 0
+
+    def write(self, block: bytes):
+        self.count += len(block)
+
+
+def process_file(
+    filepath: str,
+    export_format: Optional[str] = None,
+    out_dir: Optional[str] = None,
+    rank_mode: str = DEFAULT_RANK_MODE,
+    out_name: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Valida, compila e (opcionalmente) exporta um arquivo; nunca levanta exceção.
+
+    `out_name` é o caminho de saída relativo a `out_dir`, sem extensão
+    (padrão: nome do arquivo; ver `output_names`).
+    """
+    global _process_cache
+    if _process_cache is None:
+        _process_cache = FlowCache(MemoryCache(CACHE_ENTRIES))
+    t0 = time.perf_counter()
+    result: Dict[str, Any] = {'file': filepath, 'status': 'ok', 'exit_code': EXIT_OK,
+                              'errors': [], 'warnings': []}
+    try:
+        data = read_sff_file(filepath)
+        errors = validate_sff_structure(data)
+        if errors:
+            result.update(status='invalid', exit_code=EXIT_STRUCTURE_ERRORS, errors=errors)
+            return result
+        flow = load_flow(filepath, _process_cache, data)
+        data, compiled = flow['data'], flow['compiled']
+        result['nodes'] = compiled['graph'].num_nodes
+        result['edges'] = compiled['graph'].num_edges
+        result['warnings'] = compiled['validation']['warnings']
+        errors = compiled['validation']['errors']
+        if errors:
+            result.update(status='invalid', exit_code=EXIT_LOGIC_ERRORS, errors=errors)
+            return result
+        if export_format:
+            _, layout = _process_cache.compile_and_layout(data, rank_mode, flow['hash'])
+            if out_dir:
+                name = out_name or os.path.splitext(os.path.basename(filepath))[0]
+                out_path = os.path.join(out_dir, name + get_exporter(export_format).extension)
+                os.makedirs(os.path.dirname(out_path), exist_ok=True)
+                with open(out_path, 'wb') as f:
+                    write_output(export_format, data, compiled, layout, f)
+                result['output'] = out_path
+            else:
+                counter = _ByteCounter()
+                write_output(export_format, data, compiled, layout, counter)
+                result['output_bytes'] = counter.count
+    except Exception as e:
+        result.update(status='error', exit_code=EXIT_EXCEPTION, errors=[str(e)])
+    finally:
+        result['elapsed_ms'] = round((time.perf_counter() - t0) * 1000, 3)
+    return result
+
+
+def iter_batch(
+    files: List[str],
+    export_format: Optional[str] = None,
+    out_dir: Optional[str] = None,
+    rank_mode: str = DEFAULT_RANK_MODE,
+    workers: Optional[int] = None,
+) -> Iterator[Dict[str, Any]]:
+    """Processa `files` e produz os resultados na ordem em que terminam.
+
+    `workers=1` roda no próprio processo; caso contrário usa um
+    ProcessPoolExecutor (padrão: número de CPUs). Em `out_dir`, as saídas
+    espelham os caminhos das entradas a partir da raiz comum (`output_names`).
+    """
+    if out_dir:
+        os.makedirs(out_dir, exist_ok=True)
+    names = output_names(files)
+    if workers == 1 or len(files) <= 1:
+        for filepath in files:
+            yield process_file(filepath, export_format, out_dir, rank_mode, names[filepath])
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(process_file, f, export_format, out_dir, rank_mode, names[f]) for f in files]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def run_batch(
+    patterns: Iterable[str],
+    export_format: Optional[str] = None,
+    out_dir: Optional[str] = None,
+    rank_mode: str = DEFAULT_RANK_MODE,
+    workers: Optional[int] = None,
+    stream: Optional[TextIO] = None,
+) -> int:
+    """Roda o lote, escreve um JSON por linha em `stream` e devolve o código de saída agregado."""
+    stream = stream or sys.stdout
+    files = collect_files(patterns)
+    exit_code = EXIT_OK
+    counts = {'ok': 0, 'invalid': 0, 'error': 0}
+    for result in iter_batch(files, export_format, out_dir, rank_mode, workers):
+        counts[result['status']] += 1
+        exit_code = max(exit_code, result['exit_code'])
+        stream.write(json.dumps(result, ensure_ascii=False) + '\n')
+        stream.flush()
+    if not files:
+        # Nenhum arquivo casou com os padrões: provável erro de configuração
+        exit_code = EXIT_LOGIC_ERRORS
+    summary = {'summary': True, 'files': len(files), **counts, 'exit_code': exit_code}
+    stream.write(json.dumps(summary, ensure_ascii=False) + '\n')
+    stream.flush()
+    return exit_code
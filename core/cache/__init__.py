@@ -0,0 +1 @@
+# __init__.py para tornar o diretório cache um pacote Python
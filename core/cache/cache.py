@@ -0,0 +1,306 @@
+"""
+core/cache/cache.py
+Cache endereçado por conteúdo para resultados de compile_sff e generate_layout.
+
+A chave é o SHA-256 do documento SFF normalizado (JSON canônico) somado à
+versão do engine e aos parâmetros da etapa. Há dois níveis:
+- `MemoryCache`: LRU em memória, para chamadas de biblioteca no mesmo processo;
+- `DiskCache`: um arquivo por entrada em um diretório local, com evicção LRU
+  por tamanho total e verificação de integridade (digest do conteúdo).
+
+Os valores são serializados com pickle: o diretório de cache deve ser
+confiável (mesma premissa de qualquer cache local de build).
+"""
+import hashlib
+import json
+import os
+import pickle
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from core.layout.ranking import DEFAULT_RANK_MODE
+from core.profiler.profiler import phase
+
+# Incrementar sempre que o formato de compile_sff/generate_layout mudar
+ENGINE_VERSION = '1.4'
+
+DEFAULT_CACHE_DIR = os.environ.get('SFF_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'sff'))
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+DEFAULT_MAX_ENTRIES = 256
+
+# A evicção libera espaço até esta fração de max_bytes, para não varrer o diretório a cada put
+EVICT_LOW_WATER = 0.9
+
+_MAGIC = b'SFFC1\n'
+_DIGEST_SIZE = 32
+
+
+def document_hash(data: Dict[str, Any]) -> str:
+    """SHA-256 do documento normalizado (chaves ordenadas, sem espaços)."""
+    canonical = json.dumps(data, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def cache_key(doc_hash: str, stage: str, **params: Any) -> str:
+    """Chave de uma etapa: hash do documento + versão do engine + parâmetros."""
+    extra = ','.join(f'{k}={params[k]}' for k in sorted(params))
+    raw = f'{doc_hash}|{ENGINE_VERSION}|{stage}|{extra}'
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+class MemoryCache:
+    """LRU em memória limitado por número de entradas."""
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[str, Any]' = OrderedDict()
+
+    def get(self, key: str) -> Optional[Any]:
+        value = self._entries.get(key)
+        if value is not None:
+            self._entries.move_to_end(key)
+        return value
+
+    def put(self, key: str, value: Any):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+
+class DiskCache:
+    """Cache em diretório local: `<dir>/<key[:2]>/<key>.bin`.
+
+    Cada arquivo = magic + SHA-256 do payload + payload (pickle). A escrita é
+    atômica (arquivo temporário + os.replace); o mtime marca o último acesso
+    e a evicção remove as entradas mais antigas até caber em `max_bytes`.
+
+    O tamanho total é mantido em memória (varrido uma vez, na primeira
+    escrita, e atualizado a cada put/remoção): o diretório só é varrido de
+    novo quando o total passa de `max_bytes`, e então a evicção desce até
+    `EVICT_LOW_WATER` × `max_bytes`. Escritas de outros processos no
+    mesmo diretório só entram na conta nessa varredura.
+    """
+
+    def __init__(self, directory: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._total: Optional[int] = None
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key + '.bin')
+
+    def _read(self, path: str) -> Optional[bytes]:
+        """Payload de uma entrada, ou None se estiver ausente/corrompida (corrompida é removida)."""
+        try:
+            with open(path, 'rb') as f:
+                blob = f.read()
+        except OSError:
+            return None
+        header = len(_MAGIC) + _DIGEST_SIZE
+        payload = blob[header:]
+        if blob[:len(_MAGIC)] != _MAGIC or hashlib.sha256(payload).digest() != blob[len(_MAGIC):header]:
+            self._remove_entry(path, len(blob))
+            return None
+        return payload
+
+    def get(self, key: str) -> Optional[Any]:
+        path = self._path(key)
+        payload = self._read(path)
+        if payload is None:
+            return None
+        try:
+            value = pickle.loads(payload)
+        except Exception:
+            self._remove_entry(path)
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return value
+
+    def put(self, key: str, value: Any):
+        import tempfile
+        payload = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        path = self._path(key)
+        if self._total is None:
+            self._total = sum(size for _, size, _ in self._entries())
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(_MAGIC)
+                f.write(hashlib.sha256(payload).digest())
+                f.write(payload)
+            replaced = self._size(path)
+            os.replace(tmp, path)
+        except BaseException:
+            self._remove(tmp)
+            raise
+        self._total += len(_MAGIC) + _DIGEST_SIZE + len(payload) - replaced
+        if self._total > self.max_bytes:
+            self.evict(int(self.max_bytes * EVICT_LOW_WATER))
+
+    def _entries(self):
+        if not os.path.isdir(self.directory):
+            return []
+        entries = []
+        for sub in os.scandir(self.directory):
+            if not sub.is_dir():
+                continue
+            for entry in os.scandir(sub.path):
+                if entry.name.endswith('.bin'):
+                    st = entry.stat()
+                    entries.append((st.st_mtime, st.st_size, entry.path))
+        return entries
+
+    def evict(self, target: Optional[int] = None) -> int:
+        """Remove as entradas menos usadas até o total caber em `target` (padrão: `max_bytes`); retorna quantas removeu."""
+        target = self.max_bytes if target is None else target
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= target:
+                break
+            self._remove(path)
+            total -= size
+            removed += 1
+        self._total = total
+        return removed
+
+    def verify(self) -> Dict[str, int]:
+        """Confere o digest de todas as entradas, removendo as corrompidas."""
+        ok = corrupted = 0
+        for _, _, path in self._entries():
+            if self._read(path) is None:
+                corrupted += 1
+            else:
+                ok += 1
+        return {'ok': ok, 'corrupted': corrupted}
+
+    def stats(self) -> Dict[str, Any]:
+        entries = self._entries()
+        return {'directory': self.directory, 'entries': len(entries),
+                'bytes': sum(size for _, size, _ in entries), 'max_bytes': self.max_bytes}
+
+    def clear(self) -> int:
+        entries = self._entries()
+        for _, _, path in entries:
+            self._remove(path)
+        self._total = 0
+        return len(entries)
+
+    def _remove_entry(self, path: str, size: Optional[int] = None):
+        """Remove uma entrada, descontando-a do total."""
+        size = self._size(path) if size is None else size
+        self._remove(path)
+        if self._total is not None:
+            self._total = max(0, self._total - size)
+
+    @staticmethod
+    def _size(path: str) -> int:
+        try:
+            return os.stat(path).st_size
+        except OSError:
+            return 0
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+class FlowCache:
+    """Cache em dois níveis (memória → disco) para compile_sff e generate_layout.
+
+    Qualquer nível pode ser desligado passando None.
+    """
+
+    def __init__(self, memory: Optional[MemoryCache] = None, disk: Optional[DiskCache] = None):
+        self.memory = memory
+        self.disk = disk
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        if self.memory is not None:
+            value = self.memory.get(key)
+            if value is not None:
+                self.hits += 1
+                return value
+        if self.disk is not None:
+            value = self.disk.get(key)
+            if value is not None:
+                if self.memory is not None:
+                    self.memory.put(key, value)
+                self.hits += 1
+                return value
+        self.misses += 1
+        return None
+
+    def put(self, key: str, value: Any):
+        if self.memory is not None:
+            self.memory.put(key, value)
+        if self.disk is not None:
+            try:
+                self.disk.put(key, value)
+            except OSError:
+                # Cache em disco é best-effort (ex.: diretório sem permissão)
+                pass
+
+    def compile(
+        self,
+        data: Dict[str, Any],
+        doc_hash: Optional[str] = None,
+        max_errors: Optional[int] = None,
+        fail_fast: bool = False,
+    ) -> Dict[str, Any]:
+        """compile_sff com cache; limites de erros entram na chave só quando usados."""
+        limits = {}
+        if max_errors is not None:
+            limits['max_errors'] = max_errors
+        if fail_fast:
+            limits['fail_fast'] = True
+        key = cache_key(doc_hash or document_hash(data), 'compile', **limits)
+        with phase('cache_lookup', cat='cache', stage='compile') as span:
+            compiled = self.get(key)
+            span.set(hit=compiled is not None)
+        if compiled is None:
+            # Import tardio: com o cache quente o compilador nem é carregado
+            from core.compiler.compiler import compile_sff
+            compiled = compile_sff(data, max_errors=max_errors, fail_fast=fail_fast)
+            self.put(key, compiled)
+        return compiled
+
+    def compile_and_layout(
+        self,
+        data: Dict[str, Any],
+        rank_mode: str = DEFAULT_RANK_MODE,
+        doc_hash: Optional[str] = None,
+    ) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
+        """(compiled, layout) com cache; layout é None quando há erros de validação."""
+        doc_hash = doc_hash or document_hash(data)
+        compiled = self.compile(data, doc_hash)
+        if compiled['validation']['errors']:
+            return compiled, None
+        key = cache_key(doc_hash, 'layout', rank_mode=rank_mode)
+        with phase('cache_lookup', cat='cache', stage='layout') as span:
+            layout = self.get(key)
+            span.set(hit=layout is not None)
+        if layout is None:
+            from core.layout.layout import generate_layout
+            layout = generate_layout(data, compiled, rank_mode)
+            self.put(key, layout)
+        return compiled, layout
+
+
+def default_cache(use_disk: bool = True) -> FlowCache:
+    """Cache padrão: memória + disco em SFF_CACHE_DIR (ou ~/.cache/sff)."""
+    return FlowCache(MemoryCache(), DiskCache() if use_disk else None)
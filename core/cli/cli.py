@@ -1,43 +1,406 @@
 """
 core/cli/cli.py
 Interface de linha de comando para validação e leitura de arquivos SFF.
+
+Cada comando importa só o que usa (cache, compilador, layout, exporters):
+`validate` não paga o import do pipeline de compilação nem dos exporters.
 """
+import json
 import sys
+import time
 
 
 import os
-from core.reader.reader import read_sff_file
-from core.validator.validator import validate_sff_structure
-from core.compiler.compiler import compile_sff
-from core.layout.layout import generate_layout
+from core.reader.reader import read_sff_file, iter_sff_events
+from core.validator.validator import validate_sff_structure, validate_sff_stream
+from core.layout.ranking import RANK_MODES, DEFAULT_RANK_MODE
 from core.logger.logger import Logger
-from core.exporters.mermaid_exporter import export_mermaid
-from core.exporters.dot_exporter import export_dot
-from core.exporters.json_exporter import export_json
 
 logger = Logger()
 
+def _option(name, default=None):
+    """Valor de uma opção `--name valor` em sys.argv (ou `default`)."""
+    if name in sys.argv:
+        idx = sys.argv.index(name)
+        if len(sys.argv) > idx + 1:
+            return sys.argv[idx + 1]
+    return default
+
+
+def _max_errors_option():
+    """`--max-errors N` (inteiro >= 1) ou None; outro valor encerra com erro de uso."""
+    value = _option('--max-errors')
+    if value is None:
+        return None
+    if not value.isdigit() or int(value) < 1:
+        print(f"--max-errors inválido: {value} (use um inteiro >= 1)")
+        sys.exit(1)
+    return int(value)
+
+
+def _write_output(export_format, data, compiled, layout, out_path=None, **options):
+    """Escreve a saída de texto (com a quebra de linha final do antigo print) em stdout ou em `out_path`."""
+    from core.exporters.registry import write_output
+    if out_path:
+        with open(out_path, 'wb') as f:
+            write_output(export_format, data, compiled, layout, f, **options)
+            f.write(b'\n')
+        logger.info(f"Export salvo em {out_path}")
+    else:
+        write_output(export_format, data, compiled, layout, sys.stdout, **options)
+        sys.stdout.write('\n')
+
+
+def _write_sffc(data, compiled, layout, out_path):
+    from core.sffc.sffc import write_sffc
+    with open(out_path, 'wb') as f:
+        size = write_sffc(data, compiled, layout, f)
+    logger.info(f"SFFC salvo em {out_path} ({size} bytes)")
+
+
+def _start_profile():
+    """--profile ARQUIVO [--profile-format json|chrome]: grava o trace das fases ao sair."""
+    import atexit
+    from core.profiler.profiler import Profiler, TRACE_FORMATS
+    out_path = _option('--profile')
+    fmt = _option('--profile-format')
+    if fmt is not None and fmt not in TRACE_FORMATS:
+        print(f"Formato de profile inválido: {fmt} (use {'|'.join(TRACE_FORMATS)})")
+        sys.exit(1)
+    profiler = Profiler().start()
+
+    def finish():
+        profiler.stop()
+        try:
+            profiler.write(out_path, fmt)
+        except OSError as e:
+            print(f"Erro ao salvar profile: {e}", file=sys.stderr)
+            return
+        print(profiler.format_summary(), file=sys.stderr)
+        print(f"Profile salvo em {out_path}", file=sys.stderr)
+        logger.info(f"Profile salvo em {out_path}")
+
+    # Os comandos terminam com sys.exit: o trace é gravado na saída do processo
+    atexit.register(finish)
+
+
+def run_batch_command():
+    """python -m core.cli batch <arquivos|dirs|globs...> [--format F] [--out DIR] [--workers N]"""
+    from core.batch.batch import run_batch
+    options = {'--format', '--out', '--workers', '--rank-mode'}
+    patterns = []
+    args = sys.argv[2:]
+    i = 0
+    while i < len(args):
+        if args[i] in options:
+            i += 2
+            continue
+        patterns.append(args[i])
+        i += 1
+    export_format = _option('--format')
+    out_dir = _option('--out')
+    workers = _option('--workers')
+    rank_mode = _option('--rank-mode', DEFAULT_RANK_MODE).lower()
+    if rank_mode not in RANK_MODES:
+        print(f"Modo de ranking inválido: {rank_mode} (use {'|'.join(RANK_MODES)})")
+        sys.exit(1)
+    logger.info(f"Batch iniciado: padrões={patterns}, formato={export_format}, out={out_dir}, workers={workers}")
+    exit_code = run_batch(patterns, export_format.lower() if export_format else None, out_dir,
+                          rank_mode, int(workers) if workers else None)
+    logger.info(f"Batch finalizado: exit_code={exit_code}")
+    sys.exit(exit_code)
+
+
+def run_cache_command():
+    """python -m core.cli cache <stats|verify|clear>"""
+    from core.cache.cache import DiskCache
+    action = sys.argv[2]
+    disk = DiskCache()
+    if action == 'stats':
+        result = disk.stats()
+    elif action == 'verify':
+        result = disk.verify()
+    elif action == 'clear':
+        result = {'removed': disk.clear()}
+    else:
+        print(f"Ação de cache desconhecida: {action} (use stats|verify|clear)")
+        sys.exit(1)
+    logger.info(f"Cache {action}: {result}")
+    for key, value in result.items():
+        print(f"{key}: {value}")
+    sys.exit(0)
+
+
+def _load_flow(filepath, cache, max_errors=None, fail_fast=False):
+    """`core.linker.linker.load_flow` (leitura + ligação + compile), registrando no log os módulos."""
+    from core.linker.linker import load_flow
+    flow = load_flow(filepath, cache, max_errors=max_errors, fail_fast=fail_fast)
+    for module in flow['modules'] or []:
+        logger.info(f"Módulo {module['file']}: {'compilado' if module['compiled'] else 'cache'}")
+    return flow
+
+
+def _positional(args, options):
+    """Argumentos posicionais de `args`, pulando as opções que recebem valor (`options`) e flags `--x`."""
+    result = []
+    i = 0
+    while i < len(args):
+        if args[i] in options:
+            i += 2
+            continue
+        if not args[i].startswith('--'):
+            result.append(args[i])
+        i += 1
+    return result
+
+
+QUERY_ACTIONS = {'reach': 2, 'dominators': 1, 'postdominators': 1, 'controls': 1, 'stats': 0}
+
+
+def run_query_command(filepath):
+    """python -m core.cli query <arquivo.sff> <reach A B|dominators N|postdominators N|controls N|stats> [--method M]"""
+    from core.cache.cache import default_cache
+    from core.query.query import QUERY_METHODS, build_query_index
+    args = _positional(sys.argv[3:], {'--method', '--profile', '--profile-format'})
+    action = args[0] if args else None
+    if action not in QUERY_ACTIONS or len(args) - 1 != QUERY_ACTIONS[action]:
+        print("Uso: python -m core.cli query <arquivo.sff> <reach A B|dominators NÓ|postdominators NÓ|controls NÓ|stats> "
+              f"[--method {'|'.join(QUERY_METHODS)}]")
+        sys.exit(1)
+    method = _option('--method', 'auto')
+    logger.info(f"Query {action} {args[1:]} no arquivo {filepath}")
+    try:
+        cache = default_cache(use_disk='--no-cache' not in sys.argv)
+        flow = _load_flow(filepath, cache)
+        data, compiled = flow['data'], flow['compiled']
+        index = build_query_index(data, compiled, method)
+        if action == 'reach':
+            print('sim' if index.reaches(args[1], args[2]) else 'não')
+        elif action == 'dominators':
+            print(' → '.join(index.dominators(args[1])) or '(inalcançável a partir do start)')
+        elif action == 'postdominators':
+            print(' → '.join(index.post_dominators(args[1])) or '(nenhum end alcançável)')
+        elif action == 'controls':
+            controls = index.controlled_by(args[1])
+            for decision, branch in controls:
+                print(f"- {decision}" + (f" [branch={branch}]" if branch else ''))
+            if not controls:
+                print('(nenhuma decision: executa sempre que o fluxo passa pelo trecho)')
+        else:
+            for key, value in index.stats().items():
+                print(f"{key}: {value}")
+    except ValueError as e:
+        logger.error(str(e))
+        print(f"Erro: {e}")
+        sys.exit(1)
+    except Exception as e:
+        logger.error(str(e))
+        print(f"Erro: {e}")
+        sys.exit(3)
+    sys.exit(0)
+
+
+def _seconds_label(value):
+    return '-' if value is None else f"{value:.1f} s"
+
+
+def run_analyze_command(filepath):
+    """python -m core.cli analyze <arquivo.sff> [--monte-carlo N] [--seed S] [--json]"""
+    from core.analysis.analysis import analyze_paths, monte_carlo
+    from core.cache.cache import default_cache
+    logger.info(f"Análise de caminhos do arquivo {filepath}")
+    try:
+        samples = int(_option('--monte-carlo', 0))
+        seed = int(_option('--seed', 0))
+        cache = default_cache(use_disk='--no-cache' not in sys.argv)
+        flow = _load_flow(filepath, cache)
+        data, compiled = flow['data'], flow['compiled']
+        result = analyze_paths(data, compiled)
+        if samples > 0:
+            result['monte_carlo'] = monte_carlo(data, compiled, samples=samples, seed=seed)
+    except ValueError as e:
+        logger.error(str(e))
+        print(f"Erro: {e}")
+        sys.exit(1)
+    except Exception as e:
+        logger.error(str(e))
+        print(f"Erro: {e}")
+        sys.exit(3)
+    if '--json' in sys.argv:
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+        sys.exit(0)
+    print(f"Caminhos start→end: {result['paths_total']} ({result['cycles']} ciclo(s) condensado(s))")
+    for end, item in result['ends'].items():
+        print(f"- {end}: {item['paths']} caminho(s), espera {_seconds_label(item['min_seconds'])} a {_seconds_label(item['max_seconds'])}")
+    critical = result['critical_path']
+    if critical['end'] is not None:
+        print(f"Caminho crítico até {critical['end']} ({_seconds_label(critical['max_seconds'])}): {' → '.join(critical['nodes'])}")
+    slack = [(v, k) for k, v in result['slack'].items() if v is not None]
+    zero = sum(1 for v, _ in slack if v == 0)
+    print(f"Folga zero: {zero} nó(s); sem caminho até um end: {len(result['slack']) - len(slack)} nó(s)")
+    if result['unreachable']:
+        print(f"Inalcançáveis a partir do start: {', '.join(result['unreachable'][:10])}"
+              + (' ...' if len(result['unreachable']) > 10 else ''))
+    if 'monte_carlo' in result:
+        sim = result['monte_carlo']
+        stats = sim['seconds']
+        print(f"Monte Carlo ({sim['samples']} amostras, semente {sim['seed']}): média {_seconds_label(stats['mean'])}, "
+              f"p50 {_seconds_label(stats['p50'])}, p90 {_seconds_label(stats['p90'])}, p99 {_seconds_label(stats['p99'])}"
+              + (f", {sim['dead_ends']} presa(s) sem saída" if sim['dead_ends'] else ''))
+        for end, item in sim['ends'].items():
+            print(f"- {end}: {item['probability']:.1%}, média {_seconds_label(item['mean'])}, p90 {_seconds_label(item['p90'])}")
+    sys.exit(0)
+
+
+def _edge_label(edge):
+    return f"{edge['from']} → {edge['to']}" + (f" [branch={edge['branch']}]" if 'branch' in edge else '')
+
+
+def run_diff_command(filepath):
+    """python -m core.cli diff <antigo.sff> <novo.sff> [--layout] [--json]"""
+    from core.cache.cache import default_cache
+    from core.diff.diff import diff_flows, layout_hint, position_changes
+    args = _positional(sys.argv[3:], {'--rank-mode', '--profile', '--profile-format'})
+    if len(args) != 1:
+        print("Uso: python -m core.cli diff <antigo.sff> <novo.sff> [--layout] [--rank-mode longest-path|network-simplex] [--json]")
+        sys.exit(1)
+    new_path = args[0]
+    rank_mode = (_option('--rank-mode') or DEFAULT_RANK_MODE).lower()
+    logger.info(f"Diff de {filepath} para {new_path}")
+    try:
+        cache = default_cache(use_disk='--no-cache' not in sys.argv)
+        old_flow = _load_flow(filepath, cache)
+        new_flow = _load_flow(new_path, cache)
+        old, new = old_flow['data'], new_flow['data']
+        result = diff_flows(old, new)
+        if '--layout' in sys.argv:
+            renamed = {item['from']: item['to'] for item in result['nodes']['renamed']}
+            _, old_layout = cache.compile_and_layout(old, rank_mode, old_flow['hash'])
+            compiled = new_flow['compiled']
+            if old_layout is None or compiled['validation']['errors']:
+                raise ValueError("Layout indisponível: um dos fluxos tem erros de validação (use validate).")
+            from core.layout.layout import generate_layout
+            layout = generate_layout(new, compiled, rank_mode, hint=layout_hint(old, old_layout, renamed))
+            result['layout'] = dict(position_changes(old_layout, layout, renamed),
+                                    crossings=layout['ordering']['crossings'], **layout['hint'])
+    except ValueError as e:
+        logger.error(str(e))
+        print(f"Erro: {e}")
+        sys.exit(1)
+    except Exception as e:
+        logger.error(str(e))
+        print(f"Erro: {e}")
+        sys.exit(3)
+    if '--json' in sys.argv:
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+        sys.exit(0)
+    nodes, edges, lanes = result['nodes'], result['edges'], result['lanes']
+    if not result['summary']['changed']:
+        print("Sem diferenças estruturais.")
+    for node_id in nodes['added']:
+        print(f"+ nó {node_id}")
+    for node_id in nodes['removed']:
+        print(f"- nó {node_id}")
+    for item in nodes['renamed']:
+        print(f"~ nó {item['from']} → {item['to']} (renomeado)")
+    for item in nodes['modified']:
+        print(f"~ nó {item['id']} ({', '.join(item['fields'])})")
+    for edge in edges['added']:
+        print(f"+ edge {_edge_label(edge)}")
+    for edge in edges['removed']:
+        print(f"- edge {_edge_label(edge)}")
+    for edge in edges['modified']:
+        print(f"~ edge {_edge_label(edge)} ({', '.join(edge['fields'])})")
+    for change, mark in (('added', '+'), ('removed', '-'), ('modified', '~')):
+        for lane in lanes[change]:
+            print(f"{mark} lane {lane}")
+    for block in result['blocks']:
+        print(f"~ bloco {block}")
+    if 'layout' in result:
+        stats = result['layout']
+        print(f"Layout: {stats['kept']} de {stats['common']} nós em comum mantiveram a posição; "
+              f"{stats['reused_routes']} edge(s) com o roteamento anterior; {stats['crossings']} cruzamento(s)")
+    sys.exit(0)
+
+
+def run_serve_command():
+    """python -m core.cli serve [--host H] [--port P] [--socket PATH] [--workers N] [--root DIR]"""
+    from core.server.server import run_server, DEFAULT_HOST, DEFAULT_PORT
+    workers = _option('--workers')
+    run_server(_option('--host', DEFAULT_HOST), int(_option('--port', DEFAULT_PORT)),
+               _option('--socket'), int(workers) if workers else None, _option('--root'))
+    sys.exit(0)
+
+
 def main():
+    if len(sys.argv) >= 2 and sys.argv[1] == "serve":
+        run_serve_command()
     if len(sys.argv) < 3:
-        print("Uso: python -m core.cli.cli <validate|compile|preview|export> <arquivo.sff> [--format mermaid|dot|json]")
+        print("Uso: python -m core.cli.cli <validate|compile|preview|export|query|analyze|diff|batch|cache|serve> <arquivo.sff> [--format mermaid|dot|json|svg|sffc[,...]] [--out ARQUIVO|DIRETÓRIO] [--compact] [--sffc] [--stream] [--max-errors N] [--fail-fast] [--json] [--rank-mode longest-path|network-simplex] [--no-cache] [--profile ARQUIVO] [--profile-format json|chrome]")
         sys.exit(1)
     command = sys.argv[1]
+    if command == "batch":
+        run_batch_command()
+    if command == "cache":
+        run_cache_command()
     filepath = sys.argv[2]
     export_format = None
+    # Detecta --rank-mode (preview/export)
+    rank_mode = DEFAULT_RANK_MODE
+    if '--rank-mode' in sys.argv:
+        idx = sys.argv.index('--rank-mode')
+        if len(sys.argv) > idx + 1:
+            rank_mode = sys.argv[idx + 1].lower()
+        if rank_mode not in RANK_MODES:
+            print(f"Modo de ranking inválido: {rank_mode} (use {'|'.join(RANK_MODES)})")
+            sys.exit(1)
+    if '--profile' in sys.argv:
+        _start_profile()
+    if command == "query":
+        run_query_command(filepath)
+    if command == "analyze":
+        run_analyze_command(filepath)
+    if command == "diff":
+        run_diff_command(filepath)
+    if command in ("compile", "preview", "export"):
+        # Cache de compile/layout (memória + disco); --no-cache desliga o disco
+        from core.cache.cache import default_cache
+        cache = default_cache(use_disk='--no-cache' not in sys.argv)
     if command == "export":
-        # Detecta --format
+        from core.exporters.registry import available_formats, get_exporter
+        # Detecta --format (um formato ou lista separada por vírgula)
         if '--format' in sys.argv:
             idx = sys.argv.index('--format')
             if len(sys.argv) > idx + 1:
                 export_format = sys.argv[idx + 1].lower()
-        if not export_format:
-            print("Formato de exportação obrigatório: --format mermaid|dot|json")
+        export_formats = [f for f in (export_format or '').split(',') if f]
+        if not export_formats:
+            print(f"Formato de exportação obrigatório: --format {'|'.join(available_formats(False))}[,...]")
             sys.exit(1)
+        try:
+            exporters = [get_exporter(f) for f in export_formats]
+        except ValueError as e:
+            logger.error(str(e))
+            print(e)
+            sys.exit(1)
+        out_path = _option('--out')
+        # Vários formatos (ou --out apontando para um diretório): um arquivo por formato
+        to_dir = len(exporters) > 1 or bool(out_path and (os.path.isdir(out_path) or out_path.endswith(('/', os.sep))))
+        if to_dir and not out_path:
+            print("Vários formatos exigem --out DIRETÓRIO")
+            sys.exit(1)
+        exporter = exporters[0]
+    if command in ("validate", "compile"):
+        max_errors = _max_errors_option()
     if command == "validate":
         logger.info(f"Validando arquivo {filepath}")
         try:
-            data = read_sff_file(filepath)
-            errors = validate_sff_structure(data)
+            if '--stream' in sys.argv:
+                # Leitura incremental: memória limitada e falha no primeiro trecho malformado
+                errors = validate_sff_stream(iter_sff_events(filepath), '--fail-fast' in sys.argv, max_errors)
+            else:
+                data = read_sff_file(filepath)
+                errors = validate_sff_structure(data)[:1 if '--fail-fast' in sys.argv else max_errors]
             if errors:
                 for err in errors:
                     logger.error(err)
@@ -55,20 +418,35 @@ def main():
     elif command == "compile":
         logger.info(f"Compilando arquivo {filepath}")
         try:
-            data = read_sff_file(filepath)
-            compiled = compile_sff(data)
+            fail_fast = '--fail-fast' in sys.argv
+            flow = _load_flow(filepath, cache, max_errors, fail_fast)
+            compiled, modules = flow['compiled'], flow['modules']
             errors = compiled['validation']['errors']
             warnings = compiled['validation']['warnings']
+            limited = compiled['validation'].get('limited', False)
+            if '--json' in sys.argv:
+                print(json.dumps({
+                    'errors': [err.to_dict() for err in errors],
+                    'warnings': [w.to_dict() for w in warnings],
+                    'limited': limited,
+                }, ensure_ascii=False, indent=2))
+                sys.exit(1 if errors else 0)
             if errors:
                 for err in errors:
                     logger.error(err)
                 print("Erros de validação lógica encontrados:")
                 for err in errors:
                     print(f"- {err}")
+                if limited:
+                    print(f"(validação interrompida após {len(errors)} erro(s); sem --max-errors/--fail-fast a lista pode ser maior)")
                 sys.exit(1)
             else:
                 logger.info("Compilação OK")
                 print("Compilação OK!")
+                if modules:
+                    print("Módulos:")
+                    for module in modules:
+                        print(f"- {module['file']} ({module['nodes']} nós, {'compilado' if module['compiled'] else 'cache'})")
                 print("Índices prev/next:")
                 print("prev:", compiled['index']['prev'])
                 print("next:", compiled['index']['next'])
@@ -85,8 +463,9 @@ def main():
     elif command == "preview":
         logger.info(f"Preview do layout do arquivo {filepath}")
         try:
-            data = read_sff_file(filepath)
-            compiled = compile_sff(data)
+            flow = _load_flow(filepath, cache)
+            data = flow['data']
+            compiled, layout = cache.compile_and_layout(data, rank_mode, flow['hash'])
             errors = compiled['validation']['errors']
             if errors:
                 for err in errors:
@@ -95,10 +474,11 @@ def main():
                 for err in errors:
                     print(f"- {err}")
                 sys.exit(1)
-            layout = generate_layout(data, compiled)
             direction = data.get('sff', {}).get('direction', 'TB')
             print(f"direction: {direction}")
             print(f"lanes: {layout['lane_order']}")
+            ordering = layout['ordering']
+            print(f"ordering: {ordering['method']}, cruzamentos={ordering['crossings']}, iterações={ordering['iterations']}")
             print("ranks:")
             # Agrupar por rank
             rank_nodes = {}
@@ -139,8 +519,10 @@ def main():
     elif command == "export":
         logger.info(f"Export iniciado: formato={export_format}, arquivo={filepath}")
         try:
-            data = read_sff_file(filepath)
-            compiled = compile_sff(data)
+            started = time.perf_counter()
+            flow = _load_flow(filepath, cache)
+            data = flow['data']
+            compiled, layout = cache.compile_and_layout(data, rank_mode, flow['hash'])
             errors = compiled['validation']['errors']
             if errors:
                 for err in errors:
@@ -149,34 +531,44 @@ def main():
                 for err in errors:
                     print(f"- {err}")
                 sys.exit(1)
-            layout = generate_layout(data, compiled)
-            output = None
-            if export_format == 'mermaid':
-                output = export_mermaid(data, layout)
-            elif export_format == 'dot':
-                output = export_dot(data, layout)
-            elif export_format == 'json':
-                output = export_json(data, compiled, layout)
-            elif export_format == 'svg':
-                from core.exporters.svg_exporter import export_svg
-                output = export_svg(data, layout)
-                # Salvar arquivo SVG em export/
-                input_name = os.path.splitext(os.path.basename(filepath))[0]
-                out_path = os.path.join('export', f'{input_name}.svg')
-                try:
-                    with open(out_path, 'w', encoding='utf-8') as f:
-                        f.write(output)
-                    logger.info(f"[SVG Export] SVG salvo em {out_path}")
-                except Exception as e:
-                    logger.error(f"[SVG Export] Falha ao salvar SVG: {e}")
-                    print(f"Erro ao salvar SVG: {e}")
-                    sys.exit(2)
+            if to_dir:
+                # Um compile/layout para todos os formatos; exporters em paralelo, escrita atômica
+                from core.exporters.registry import export_to_dir
+                formats = [e.name for e in exporters] + (['sffc'] if '--sffc' in sys.argv else [])
+                options = {'json': {'compact': True}} if '--compact' in sys.argv else {}
+                prepare_ms = (time.perf_counter() - started) * 1000
+                name = os.path.splitext(os.path.basename(filepath))[0]
+                outputs = export_to_dir(formats, data, compiled, layout, out_path, name, options)
+                failed = [o for o in outputs if o['status'] != 'ok']
+                manifest = {
+                    'file': filepath,
+                    'out_dir': out_path,
+                    'prepare_ms': round(prepare_ms, 3),
+                    'elapsed_ms': round((time.perf_counter() - started) * 1000, 3),
+                    'outputs': outputs,
+                }
+                print(json.dumps(manifest, ensure_ascii=False, indent=2))
+                for o in outputs:
+                    if o['status'] == 'ok':
+                        logger.info(f"Export salvo em {o['path']} ({o['bytes']} bytes, {o['elapsed_ms']} ms)")
+                    else:
+                        logger.error(f"Falha no export {o['format']}: {o['error']}")
+                sys.exit(3 if failed else 0)
+            options = {'compact': True} if export_format == 'json' and '--compact' in sys.argv else {}
+            if exporter.binary:
+                if not out_path:
+                    print(f"Formato {export_format} é binário: informe --out ARQUIVO{exporter.extension}")
+                    sys.exit(1)
+                from core.exporters.registry import write_file
+                size = write_file(export_format, data, compiled, layout, out_path, **options)
+                logger.info(f"Export salvo em {out_path} ({size} bytes)")
             else:
-                logger.error(f"Formato de exportação inválido: {export_format}")
-                print(f"Formato de exportação inválido: {export_format}")
-                sys.exit(1)
-            if export_format != 'svg':
-                print(output)
+                # Pedaços vão direto para stdout/arquivo, sem montar a saída inteira
+                _write_output(export_format, data, compiled, layout, out_path, **options)
+                # --sffc: grava também o binário compilado ao lado do arquivo de saída
+                if '--sffc' in sys.argv and out_path:
+                    from core.sffc.sffc import sibling_path
+                    _write_sffc(data, compiled, layout, sibling_path(out_path))
             logger.info(f"Export gerado com sucesso: output={export_format}")
             sys.exit(0)
         except Exception as e:
@@ -1,34 +1,46 @@
 """
 core/compiler/compiler.py
-Gera índices prev/next a partir de edges.
+Gera a IR compacta (CompiledGraph) e os índices prev/next a partir de edges.
 """
-from typing import Dict, Any
-from core.validator.validator import validate_sff_logic
+from typing import Dict, Any, Optional
+from core.compiler.graph import CompiledGraph, IndexView
+from core.validator.validator import check_sff_logic
+from core.profiler.profiler import annotate, instrumented, phase
 
-def compile_sff(data: Dict[str, Any]) -> Dict[str, Any]:
-    """Compila o SFF: gera índices prev/next e validação lógica."""
-    nodes = data.get('nodes', {})
-    edges = data.get('edges', [])
-    prev = {k: [] for k in nodes}
-    next_ = {k: [] for k in nodes}
-    for edge in edges:
-        from_id = edge['from']
-        to_id = edge['to']
-        next_[from_id].append(to_id)
-        prev[to_id].append(from_id)
-    errors = validate_sff_logic(data)
-    warnings = []
-    # Exemplo: warning se não houver mainPath (pode ser expandido)
-    if 'mainPath' not in data.get('sff', {}):
-        warnings.append('Nenhum caminho principal (mainPath) definido.')
+@instrumented()
+def compile_sff(
+    data: Dict[str, Any],
+    query_index: bool = False,
+    max_errors: Optional[int] = None,
+    fail_fast: bool = False,
+    parallel: Optional[bool] = None,
+) -> Dict[str, Any]:
+    """Compila o SFF: gera a IR compacta, índices prev/next e validação lógica.
+
+    `compiled['graph']` é a estrutura compartilhada por validator, layout e
+    exporters; `compiled['index']` é uma visão lazy em dicts para compatibilidade.
+    Com `query_index=True`, `compiled['query']` traz o índice de consultas
+    (alcançabilidade, dominadores, dependência de controle; ver core.query).
+    `max_errors`, `fail_fast` e `parallel` vão para o motor de regras
+    (ver `check_sff_logic`); se o limite cortou a lista de erros,
+    `compiled['validation']['limited']` é True.
+    """
+    with phase('compiled_graph'):
+        graph = CompiledGraph(data)
+    annotate(nodes=graph.num_nodes, edges=graph.num_edges)
+    # Reaproveita a IR já montada na validação lógica
+    checked = check_sff_logic(data, graph, max_errors, fail_fast, parallel)
     compiled = {
-        'index': {
-            'prev': prev,
-            'next': next_
-        },
+        'graph': graph,
+        'index': IndexView(graph),
         'validation': {
-            'errors': errors,
-            'warnings': warnings
+            'errors': checked['errors'],
+            'warnings': checked['warnings']
         }
     }
+    if checked['limited']:
+        compiled['validation']['limited'] = True
+    if query_index:
+        from core.query.query import build_query_index
+        compiled['query'] = build_query_index(data, compiled)
     return compiled
@@ -0,0 +1,252 @@
+"""
+core/compiler/graph.py
+Representação intermediária (IR) compacta do fluxo compilado.
+
+Ids de nós, lanes, tipos e branches são internados como inteiros e a
+adjacência é guardada em formato CSR (offsets + alvos) em buffers `array`.
+Validator, layout e exporters consomem esta mesma estrutura; os dicts
+prev/next de `compiled['index']` são apenas uma visão materializada sob demanda.
+"""
+from array import array
+from collections.abc import Mapping
+from itertools import accumulate
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+NO_LANE = -1
+
+# Colunas numéricas da IR (buffers `array` ou memoryviews com o mesmo typecode)
+COLUMNS = (
+    ('node_type', 'H'), ('node_lane', 'i'),
+    ('edge_src', 'i'), ('edge_dst', 'i'), ('edge_branch', 'H'),
+    ('next_offsets', 'i'), ('next_targets', 'i'), ('next_edges', 'i'),
+    ('prev_offsets', 'i'), ('prev_sources', 'i'), ('prev_edges', 'i'),
+)
+
+
+def _intern(table: List[Optional[str]], lookup: Dict[Optional[str], int], value: Optional[str]) -> int:
+    code = lookup.get(value)
+    if code is None:
+        code = len(table)
+        table.append(value)
+        lookup[value] = code
+    return code
+
+
+class CompiledGraph:
+    """Grafo do SFF com ids internados e adjacência CSR.
+
+    Colunas por nó: `node_type`, `node_lane`. Colunas por edge: `edge_src`,
+    `edge_dst`, `edge_branch`. Os vizinhos de saída do nó `i` são
+    `next_targets[next_offsets[i]:next_offsets[i + 1]]` (idem para prev).
+    Edges malformadas ou que apontam para nós inexistentes ficam fora da IR;
+    suas posições no documento ficam em `dangling_edges` (a validação as reporta).
+    """
+
+    __slots__ = (
+        'node_ids', 'node_index', 'lane_ids', 'lane_index', 'type_ids', 'type_index',
+        'branch_ids', 'branch_index', 'node_type', 'node_lane',
+        'edge_src', 'edge_dst', 'edge_branch',
+        'next_offsets', 'next_targets', 'next_edges',
+        'prev_offsets', 'prev_sources', 'prev_edges', 'dangling_edges',
+    )
+
+    def __init__(self, data: Dict[str, Any]):
+        nodes = data.get('nodes', {})
+        edges = data.get('edges', [])
+        lanes = data.get('lanes', {})
+        self.node_ids: List[str] = list(nodes)
+        self.node_index: Dict[str, int] = {k: i for i, k in enumerate(self.node_ids)}
+        self.lane_ids: List[Optional[str]] = list(lanes)
+        self.lane_index: Dict[Optional[str], int] = {k: i for i, k in enumerate(self.lane_ids)}
+        self.type_ids: List[Optional[str]] = []
+        self.type_index: Dict[Optional[str], int] = {}
+        # Código 0 de branch = edge sem branch
+        self.branch_ids: List[Optional[str]] = [None]
+        self.branch_index: Dict[Optional[str], int] = {None: 0}
+        n = len(self.node_ids)
+        types = self.type_index
+        self.node_type = array('H', [
+            types[t] if t in types else _intern(self.type_ids, types, t)
+            for t in (node.get('type') for node in nodes.values())
+        ])
+        lanes_ = self.lane_index
+        self.node_lane = array('i', [
+            NO_LANE if lane is None else (lanes_[lane] if lane in lanes_ else _intern(self.lane_ids, lanes_, lane))
+            for lane in (node.get('lane') for node in nodes.values())
+        ])
+        node_index = self.node_index
+        self.dangling_edges: List[int] = []
+        try:
+            self.edge_src = array('i', [node_index[edge['from']] for edge in edges])
+            self.edge_dst = array('i', [node_index[edge['to']] for edge in edges])
+        except (KeyError, TypeError):
+            # Caminho lento só para documentos inválidos: separa as edges pendentes
+            self.dangling_edges = [
+                k for k, edge in enumerate(edges)
+                if not isinstance(edge, dict) or any(
+                    not isinstance(edge.get(end), str) or edge[end] not in node_index for end in ('from', 'to'))
+            ]
+            skip = set(self.dangling_edges)
+            edges = [edge for k, edge in enumerate(edges) if k not in skip]
+            self.edge_src = array('i', [node_index[edge['from']] for edge in edges])
+            self.edge_dst = array('i', [node_index[edge['to']] for edge in edges])
+        branches_ = self.branch_index
+        self.edge_branch = array('H', [
+            branches_[b] if b in branches_ else _intern(self.branch_ids, branches_, b)
+            for b in (edge.get('branch') for edge in edges)
+        ])
+        self.next_offsets, self.next_edges = _csr(n, self.edge_src)
+        self.prev_offsets, self.prev_edges = _csr(n, self.edge_dst)
+        dst = self.edge_dst
+        src = self.edge_src
+        self.next_targets = array('i', [dst[k] for k in self.next_edges])
+        self.prev_sources = array('i', [src[k] for k in self.prev_edges])
+
+    @classmethod
+    def from_columns(
+        cls,
+        node_ids: Sequence[str],
+        lane_ids: List[Optional[str]],
+        type_ids: List[Optional[str]],
+        branch_ids: List[Optional[str]],
+        columns: Dict[str, Any],
+    ) -> 'CompiledGraph':
+        """Monta a IR a partir de colunas já calculadas (ex.: memoryviews de um .sffc).
+
+        `columns` traz `node_type`, `node_lane`, `edge_*` e os CSR `next_*`/`prev_*`;
+        nada é copiado. `node_index` só é montado no primeiro acesso.
+        """
+        graph = cls.__new__(cls)
+        graph.node_ids = node_ids
+        graph.node_index = LazyIndex(node_ids)
+        graph.lane_ids = lane_ids
+        graph.lane_index = {k: i for i, k in enumerate(lane_ids)}
+        graph.type_ids = type_ids
+        graph.type_index = {k: i for i, k in enumerate(type_ids)}
+        graph.branch_ids = branch_ids
+        graph.branch_index = {k: i for i, k in enumerate(branch_ids)}
+        for name, _ in COLUMNS:
+            setattr(graph, name, columns[name])
+        graph.dangling_edges = []
+        return graph
+
+    @property
+    def num_nodes(self) -> int:
+        return len(self.node_ids)
+
+    @property
+    def num_edges(self) -> int:
+        return len(self.edge_src)
+
+    def successors(self, i: int) -> array:
+        return self.next_targets[self.next_offsets[i]:self.next_offsets[i + 1]]
+
+    def predecessors(self, i: int) -> array:
+        return self.prev_sources[self.prev_offsets[i]:self.prev_offsets[i + 1]]
+
+    def out_edges(self, i: int) -> array:
+        return self.next_edges[self.next_offsets[i]:self.next_offsets[i + 1]]
+
+    def in_edges(self, i: int) -> array:
+        return self.prev_edges[self.prev_offsets[i]:self.prev_offsets[i + 1]]
+
+    def out_degree(self, i: int) -> int:
+        return self.next_offsets[i + 1] - self.next_offsets[i]
+
+    def in_degree(self, i: int) -> int:
+        return self.prev_offsets[i + 1] - self.prev_offsets[i]
+
+    def type_code(self, type_name: str) -> int:
+        """Código interno do tipo (ou -1 se nenhum nó tiver esse tipo)."""
+        return self.type_index.get(type_name, -1)
+
+    def nodes_of_type(self, type_name: str) -> List[int]:
+        code = self.type_index.get(type_name)
+        if code is None:
+            return []
+        return [i for i, t in enumerate(self.node_type) if t == code]
+
+    def lane_of(self, i: int) -> Optional[str]:
+        code = self.node_lane[i]
+        return None if code == NO_LANE else self.lane_ids[code]
+
+    def branch_of(self, k: int) -> Optional[str]:
+        return self.branch_ids[self.edge_branch[k]]
+
+    def prev_dict(self) -> Dict[str, List[str]]:
+        ids = self.node_ids
+        return {ids[i]: [ids[j] for j in self.predecessors(i)] for i in range(len(ids))}
+
+    def next_dict(self) -> Dict[str, List[str]]:
+        ids = self.node_ids
+        return {ids[i]: [ids[j] for j in self.successors(i)] for i in range(len(ids))}
+
+
+def _csr(n: int, keys: array):
+    """Ordenação estável de edges por nó: retorna (offsets, ids de edge)."""
+    counts = [0] * (n + 1)
+    for key in keys:
+        counts[key + 1] += 1
+    offsets = array('i', accumulate(counts))
+    order = array('i', sorted(range(len(keys)), key=keys.__getitem__))
+    return offsets, order
+
+
+class LazyIndex(Mapping):
+    """Mapa id → índice montado só no primeiro acesso (a partir de uma sequência de ids)."""
+
+    def __init__(self, ids: Sequence[str]):
+        self._ids = ids
+        self._index: Optional[Dict[str, int]] = None
+
+    def _build(self) -> Dict[str, int]:
+        if self._index is None:
+            self._index = {k: i for i, k in enumerate(self._ids)}
+        return self._index
+
+    def __getitem__(self, key: str) -> int:
+        return self._build()[key]
+
+    def get(self, key, default=None):
+        return self._build().get(key, default)
+
+    def __contains__(self, key) -> bool:
+        return key in self._build()
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._build())
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+
+class IndexView(Mapping):
+    """Visão compatível com o antigo `compiled['index']` ({'prev': ..., 'next': ...}).
+
+    Os dicts de listas de ids só são montados no primeiro acesso.
+    """
+
+    _KEYS = ('prev', 'next')
+
+    def __init__(self, graph: CompiledGraph):
+        self._graph = graph
+        self._cache: Dict[str, Dict[str, List[str]]] = {}
+
+    def __getitem__(self, key: str) -> Dict[str, List[str]]:
+        if key not in self._KEYS:
+            raise KeyError(key)
+        if key not in self._cache:
+            if key == 'prev':
+                self._cache[key] = self._graph.prev_dict()
+            else:
+                self._cache[key] = self._graph.next_dict()
+        return self._cache[key]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._KEYS)
+
+    def __len__(self) -> int:
+        return len(self._KEYS)
+
+    def __repr__(self) -> str:
+        return f"IndexView(nodes={self._graph.num_nodes}, edges={self._graph.num_edges})"
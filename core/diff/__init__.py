@@ -0,0 +1 @@
+# __init__.py para tornar o diretório diff um pacote Python
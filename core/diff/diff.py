@@ -0,0 +1,202 @@
+"""
+core/diff/diff.py
+Diff estrutural entre duas versões de um fluxo SFF e dica para um layout estável.
+
+`diff_flows(old, new)` compara em O(V+E) (tamanho do conteúdo dos nós):
+- nós pelo id; entre os que sobram de cada lado, um nó removido e um
+  adicionado com o mesmo hash estrutural (`node_signature`, conteúdo sem o
+  id) e únicos nesse hash são um renome;
+- edges pela chave (from, to, branch), com os ids antigos já renomeados;
+  edges paralelas com a mesma chave são pareadas na ordem do documento e as
+  demais propriedades (ex.: `label`) decidem se a edge foi modificada;
+- lanes pelo nome e os demais blocos (`sff`, `entry`) por igualdade.
+
+`layout_hint(old_data, old_layout, renamed)` converte o layout anterior na
+dica aceita por `generate_layout(..., hint=...)`: rank, coluna dentro da
+célula (rank, lane) e largura de cada lane. Com ela, só as células afetadas
+pela mudança são reordenadas e nós cujo rank e célula não mudaram mantêm a
+posição.
+"""
+import hashlib
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+from core.profiler.profiler import annotate, instrumented, phase
+
+EdgeKey = Tuple[str, str, Optional[str]]
+
+
+def node_signature(node: Any) -> str:
+    """Hash estrutural do conteúdo de um nó (JSON canônico, sem o id)."""
+    canonical = json.dumps(node, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def _changed_fields(old: Dict[str, Any], new: Dict[str, Any], skip: Tuple[str, ...] = ()) -> List[str]:
+    """Chaves de primeiro nível que diferem entre os dois objetos."""
+    if not isinstance(old, dict) or not isinstance(new, dict):
+        return [] if old == new else ['*']
+    return sorted(k for k in old.keys() | new.keys() if k not in skip and old.get(k) != new.get(k))
+
+
+def _edge_ref(key: EdgeKey) -> Dict[str, Any]:
+    ref = {'from': key[0], 'to': key[1]}
+    if key[2] is not None:
+        ref['branch'] = key[2]
+    return ref
+
+
+def _match_renames(removed: List[str], added: List[str], old_nodes: Dict[str, Any], new_nodes: Dict[str, Any]) -> Dict[str, str]:
+    """Pares (id antigo → id novo) com o mesmo hash estrutural, únicos nos dois lados."""
+    old_by_sig: Dict[str, List[str]] = {}
+    for node_id in removed:
+        old_by_sig.setdefault(node_signature(old_nodes[node_id]), []).append(node_id)
+    new_by_sig: Dict[str, List[str]] = {}
+    for node_id in added:
+        new_by_sig.setdefault(node_signature(new_nodes[node_id]), []).append(node_id)
+    renamed = {}
+    for sig, old_ids in old_by_sig.items():
+        new_ids = new_by_sig.get(sig)
+        if len(old_ids) == 1 and new_ids is not None and len(new_ids) == 1:
+            renamed[old_ids[0]] = new_ids[0]
+    return renamed
+
+
+@instrumented()
+def diff_flows(old: Dict[str, Any], new: Dict[str, Any]) -> Dict[str, Any]:
+    """Diferenças estruturais de `old` para `new`.
+
+    Retorna `nodes` (`added`, `removed`, `renamed` [{from, to}], `modified`
+    [{id, fields}]), `edges` (`added`, `removed`, `modified`, cada edge como
+    {from, to, branch?}, com ids do documento novo exceto em `removed`),
+    `lanes` (`added`, `removed`, `modified`), `blocks` (outros blocos de
+    primeiro nível alterados, ex.: `entry`) e `summary` (contagens e
+    `changed`).
+    """
+    old_nodes = old.get('nodes', {})
+    new_nodes = new.get('nodes', {})
+    annotate(old_nodes=len(old_nodes), new_nodes=len(new_nodes))
+    with phase('nodes') as span:
+        removed = [node_id for node_id in old_nodes if node_id not in new_nodes]
+        added = [node_id for node_id in new_nodes if node_id not in old_nodes]
+        renamed = _match_renames(removed, added, old_nodes, new_nodes) if removed and added else {}
+        if renamed:
+            targets = set(renamed.values())
+            removed = [node_id for node_id in removed if node_id not in renamed]
+            added = [node_id for node_id in added if node_id not in targets]
+        modified = []
+        for node_id, node in old_nodes.items():
+            other = new_nodes.get(node_id)
+            if other is not None and other != node:
+                modified.append({'id': node_id, 'fields': _changed_fields(node, other)})
+        span.set(added=len(added), removed=len(removed), renamed=len(renamed), modified=len(modified))
+    with phase('edges') as span:
+        rename = renamed.get
+        pending: Dict[EdgeKey, List[Dict[str, Any]]] = {}
+        for edge in new.get('edges', []):
+            pending.setdefault((edge['from'], edge['to'], edge.get('branch')), []).append(edge)
+        edges_removed = []
+        edges_modified = []
+        for edge in old.get('edges', []):
+            src, dst = edge['from'], edge['to']
+            key = (rename(src) or src, rename(dst) or dst, edge.get('branch'))
+            same = pending.get(key)
+            if not same:
+                edges_removed.append(_edge_ref((src, dst, key[2])))
+                continue
+            other = same.pop(0)
+            if other != edge:
+                fields = _changed_fields(edge, other, skip=('from', 'to'))
+                if fields:
+                    edges_modified.append(dict(_edge_ref(key), fields=fields))
+        edges_added = [_edge_ref(key) for key, rest in pending.items() for _ in rest]
+        span.set(added=len(edges_added), removed=len(edges_removed), modified=len(edges_modified))
+    old_lanes = old.get('lanes', {})
+    new_lanes = new.get('lanes', {})
+    lanes = {
+        'added': [lane for lane in new_lanes if lane not in old_lanes],
+        'removed': [lane for lane in old_lanes if lane not in new_lanes],
+        'modified': [lane for lane in old_lanes if lane in new_lanes and old_lanes[lane] != new_lanes[lane]],
+    }
+    blocks = sorted(k for k in old.keys() | new.keys()
+                    if k not in ('nodes', 'edges', 'lanes') and old.get(k) != new.get(k))
+    nodes = {
+        'added': added,
+        'removed': removed,
+        'renamed': [{'from': a, 'to': b} for a, b in renamed.items()],
+        'modified': modified,
+    }
+    edges = {'added': edges_added, 'removed': edges_removed, 'modified': edges_modified}
+    summary = {f'{kind}_{change}': len(items) for kind, group in (('nodes', nodes), ('edges', edges), ('lanes', lanes))
+               for change, items in group.items()}
+    summary['changed'] = bool(blocks) or any(summary.values())
+    return {'nodes': nodes, 'edges': edges, 'lanes': lanes, 'blocks': blocks, 'summary': summary}
+
+
+def layout_hint(old_data: Dict[str, Any], old_layout: Dict[str, Any], renamed: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    """Dica para `generate_layout` a partir do layout de `old_data`.
+
+    `ranks` e `columns` (coluna do nó dentro da sua célula (rank, lane)) vêm
+    indexados pelos ids novos (`renamed`: id antigo → id novo);
+    `lane_widths` é a largura de cada lane no layout anterior e `routes` o
+    caminho de cada edge na malha do roteamento (coordenadas dobradas, sem o
+    afastamento dos canais paralelos), por (from, to, branch).
+    """
+    rename = (renamed or {}).get
+    nodes = old_data.get('nodes', {})
+    transverse = 0 if old_data.get('sff', {}).get('direction', 'TB') == 'TB' else 1
+    positions = old_layout.get('positions', {})
+    ranks = old_layout.get('ranks', {})
+    # Coordenadas transversais de cada lane; o início da lane é a menor (a coluna 0 de alguma célula)
+    by_lane: Dict[str, List[int]] = {}
+    for node_id, pos in positions.items():
+        by_lane.setdefault(nodes[node_id].get('lane'), []).append(pos[transverse])
+    lane_order = old_layout.get('lane_order', [])
+    filled = [lane for lane in lane_order if by_lane.get(lane)]
+    lane_start = {lane: min(by_lane[lane]) for lane in filled}
+    # Lanes vazias contam como 1 coluna; a largura de uma lane com nós vai até o início da próxima lane com nós
+    lane_widths = dict.fromkeys(lane_order, 1)
+    for p, lane in enumerate(filled):
+        width = max(by_lane[lane]) - lane_start[lane] + 1
+        if p + 1 < len(filled):
+            following = filled[p + 1]
+            empty = lane_order.index(following) - lane_order.index(lane) - 1
+            width = max(width, lane_start[following] - lane_start[lane] - empty)
+        lane_widths[lane] = width
+    columns: Dict[str, int] = {}
+    hint_ranks: Dict[str, int] = {}
+    for node_id, pos in positions.items():
+        new_id = rename(node_id) or node_id
+        hint_ranks[new_id] = ranks[node_id]
+        columns[new_id] = pos[transverse] - lane_start[nodes[node_id].get('lane')]
+    routes: Dict[Tuple[str, str, Optional[str]], List[Tuple[int, int]]] = {}
+    routing = old_layout.get('routing', {})
+    for edge in old_data.get('edges', []):
+        segments = routing.get((edge['from'], edge['to']))
+        if not segments:
+            continue
+        # Os canais deslocam menos de 1/4 de célula: o arredondamento volta ao ponto da malha
+        points = [(round(2 * x), round(2 * y)) for (x, y), _ in segments]
+        points.append((round(2 * segments[-1][1][0]), round(2 * segments[-1][1][1])))
+        src, dst = edge['from'], edge['to']
+        routes.setdefault((rename(src) or src, rename(dst) or dst, edge.get('branch')), points)
+    return {'ranks': hint_ranks, 'columns': columns, 'lane_widths': lane_widths, 'routes': routes}
+
+
+def position_changes(old_layout: Dict[str, Any], new_layout: Dict[str, Any], renamed: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    """Nós presentes nos dois layouts (`common`), quantos mantiveram a posição (`kept`) e os que mudaram (`moved`)."""
+    rename = (renamed or {}).get
+    new_positions = new_layout.get('positions', {})
+    common = kept = 0
+    moved = []
+    for node_id, pos in old_layout.get('positions', {}).items():
+        new_id = rename(node_id) or node_id
+        other = new_positions.get(new_id)
+        if other is None:
+            continue
+        common += 1
+        if tuple(other) == tuple(pos):
+            kept += 1
+        else:
+            moved.append(new_id)
+    return {'common': common, 'kept': kept, 'moved': moved}
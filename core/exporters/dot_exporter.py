@@ -1,7 +1,34 @@
 """
 Gera arquivo DOT/Graphviz a partir do fluxo SFF.
+
+`iter_dot` gera as linhas sob demanda; `write_dot` as escreve em um sink
+(texto ou binário) e `export_dot` devolve a string completa.
+
+Ids que não são identificadores DOT (ex.: `pagamento/aprovado`, de fluxos
+ligados por subflow) saem entre aspas; aspas e barras invertidas em ids e
+labels são escapadas.
 """
-def export_dot(data, layout):
+import re
+
+from core.exporters.stream import join_lines, write_chunks
+
+_PLAIN_ID = re.compile(r'[A-Za-z_][A-Za-z0-9_]*\Z')
+_KEYWORDS = {'node', 'edge', 'graph', 'digraph', 'subgraph', 'strict'}
+
+
+def _quoted(text) -> str:
+    text = str(text)
+    return '"' + text.replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+
+def _id(node_id) -> str:
+    """Id DOT: o próprio id quando é identificador, senão entre aspas."""
+    if _PLAIN_ID.match(node_id) and node_id.lower() not in _KEYWORDS:
+        return node_id
+    return _quoted(node_id)
+
+
+def _lines(data, layout):
     direction = data.get('sff', {}).get('direction', 'TB')
     lanes = layout['lane_order']
     nodes = data['nodes']
@@ -10,19 +37,20 @@ def export_dot(data, layout):
     for node_id, node in nodes.items():
         lane_nodes[node['lane']].append(node_id)
     rankdir = 'TB' if direction == 'TB' else 'LR'
-    lines = [f'digraph G {{', f'  rankdir={rankdir};']
+    yield f'digraph G {{'
+    yield f'  rankdir={rankdir};'
     # Clusters por lane
     for lane in lanes:
-        lines.append(f'  subgraph cluster_{lane} {{')
-        lines.append(f'    label="{lane}";')
+        yield f'  subgraph {_id("cluster_" + lane)} {{'
+        yield f'    label={_quoted(lane)};'
         for node_id in lane_nodes[lane]:
             label = nodes[node_id].get('label', node_id)
-            lines.append(f'    {node_id} [label="{label}"]')
-        lines.append('  }')
+            yield f'    {_id(node_id)} [label={_quoted(label)}]'
+        yield '  }'
     # Edges
     for edge in edges:
-        src = edge['from']
-        dst = edge['to']
+        src = _id(edge['from'])
+        dst = _id(edge['to'])
         branch = edge.get('branch')
         label = edge.get('label', '')
         edge_label = label
@@ -31,8 +59,19 @@ def export_dot(data, layout):
             elif branch == 'false': edge_label = 'Não'
             elif label: edge_label = label
         if edge_label:
-            lines.append(f'  {src} -> {dst} [label="{edge_label}"]')
+            yield f'  {src} -> {dst} [label={_quoted(edge_label)}]'
         else:
-            lines.append(f'  {src} -> {dst}')
-    lines.append('}')
-    return '\n'.join(lines)
+            yield f'  {src} -> {dst}'
+    yield '}'
+
+
+def iter_dot(data, layout):
+    return join_lines(_lines(data, layout))
+
+
+def write_dot(data, layout, sink):
+    return write_chunks(iter_dot(data, layout), sink)
+
+
+def export_dot(data, layout):
+    return '\n'.join(_lines(data, layout))
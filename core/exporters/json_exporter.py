@@ -1,16 +1,181 @@
 """
 Exporta objeto compilado + layout em JSON estável e versionado.
+
+`iter_json` gera a saída em pedaços (coleções grandes são percorridas item a
+item e o índice prev/next sai direto da IR), `write_json` a escreve
+em qualquer sink e `export_json` devolve a string completa. As três produzem
+exatamente o mesmo texto; `compact=True` remove indentação e espaços.
 """
 import json
-def export_json(data, compiled, layout):
+from typing import Any, Iterator
+
+from core.exporters.stream import write_chunks
+
+EXPORT_VERSION = '1.0'
+
+
+def _compiled_to_json(compiled):
+    """Converte o resultado de compile_sff em dicts serializáveis (a IR vira prev/next)."""
+    index = compiled['index']
+    return {
+        'index': {'prev': index['prev'], 'next': index['next']},
+        'validation': compiled['validation'],
+    }
+
+
+def _edge_keys_to_json(mapping):
+    return {(f'{k[0]}->{k[1]}' if isinstance(k, tuple) else k): v for k, v in mapping.items()}
+
+
+def layout_to_json(layout):
+    """Chaves de routing/bends são tuplas (from, to); no JSON viram 'from->to'."""
+    obj = dict(layout)
+    if 'routing' in obj:
+        obj['routing'] = _edge_keys_to_json(obj['routing'])
+    if 'routing_stats' in obj:
+        obj['routing_stats'] = dict(obj['routing_stats'], bends=_edge_keys_to_json(obj['routing_stats']['bends']))
+    return obj
+
+
+class LazyItems:
+    """Objeto JSON cujos pares (chave, valor) são gerados só durante a serialização."""
+
+    def __init__(self, factory):
+        self.factory = factory
+
+    def __iter__(self):
+        return iter(self.factory())
+
+
+def _adjacency_items(graph, incoming: bool):
+    """Pares (id, [vizinhos]) direto do CSR, sem materializar os dicts prev/next."""
+    ids = graph.node_ids
+    neighbours = graph.predecessors if incoming else graph.successors
+    return LazyItems(lambda: ((ids[i], [ids[j] for j in neighbours(i)]) for i in range(len(ids))))
+
+
+def _edge_key_items(mapping):
+    return LazyItems(lambda: (((f'{k[0]}->{k[1]}' if isinstance(k, tuple) else k), v) for k, v in mapping.items()))
+
+
+def _lazy_layout(layout):
+    obj = dict(layout)
+    if 'routing' in obj:
+        obj['routing'] = _edge_key_items(obj['routing'])
+    if 'routing_stats' in obj:
+        obj['routing_stats'] = _lazy_dict(dict(obj['routing_stats'], bends=_edge_key_items(obj['routing_stats']['bends'])))
+    return obj
+
+
+# Coleções maiores que isto são emitidas em blocos de até STREAM_BLOCK itens
+STREAM_MIN_ITEMS = 256
+STREAM_BLOCK = 256
+
+_COMPACT_ENCODER = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+_INDENT_ENCODERS = {}
+
+
+def _encode(value: Any, indent: Any, level: int) -> str:
+    if indent is None:
+        return _COMPACT_ENCODER.encode(value)
+    encoder = _INDENT_ENCODERS.get(indent)
+    if encoder is None:
+        encoder = _INDENT_ENCODERS[indent] = json.JSONEncoder(indent=indent, ensure_ascii=False)
+    text = encoder.encode(value)
+    # Strings JSON nunca contêm quebra de linha literal: basta reindentar
+    return text.replace('\n', '\n' + ' ' * (indent * level)) if level else text
+
+
+def _streams(value: Any) -> bool:
+    return isinstance(value, LazyItems) or (isinstance(value, (dict, list, tuple)) and len(value) > STREAM_MIN_ITEMS)
+
+
+def iter_json_value(value: Any, indent: Any = 2, level: int = 0) -> Iterator[str]:
+    """Serialização incremental idêntica a `json.dumps(value, indent=indent, ensure_ascii=False)`.
+
+    `LazyItems` e coleções com mais de `STREAM_MIN_ITEMS` itens são emitidos
+    em blocos: cada bloco de itens simples é codificado de uma vez e tem os
+    delimitadores removidos. `indent=None` gera a forma compacta.
+    """
+    if not _streams(value):
+        yield _encode(value, indent, level)
+        return
+    is_mapping = isinstance(value, (dict, LazyItems))
+    items = iter(value.items() if isinstance(value, dict) else value)
+    open_, close = ('{', '}') if is_mapping else ('[', ']')
+    compact = indent is None
+    pad = '' if compact else '\n' + ' ' * (indent * (level + 1))
+    tail = '' if compact else '\n' + ' ' * (indent * level)
+    key_separator = ':' if compact else ': '
+    first = True
+    block = []
+
+    def flush() -> str:
+        # '{' + itens + tail + '}' → só os itens (já com a indentação certa)
+        text = _encode(dict(block) if is_mapping else block, indent, level)
+        block.clear()
+        return text[1:len(text) - 1 - len(tail)]
+
+    for item in items:
+        if not _streams(item[1] if is_mapping else item):
+            block.append(item)
+            if len(block) >= STREAM_BLOCK:
+                yield (open_ if first else ',') + flush()
+                first = False
+            continue
+        if block:
+            yield (open_ if first else ',') + flush()
+            first = False
+        yield (open_ if first else ',') + pad
+        first = False
+        if is_mapping:
+            key, item = item
+            yield json.dumps(key, ensure_ascii=False) + key_separator
+        yield from iter_json_value(item, indent, level + 1)
+    if block:
+        yield (open_ if first else ',') + flush()
+        first = False
+    yield open_ + close if first else tail + close
+
+
+def _export_object(data, compiled, layout, lazy: bool):
+    if lazy:
+        graph = compiled['graph']
+        index = {'prev': _adjacency_items(graph, True), 'next': _adjacency_items(graph, False)}
+        compiled_obj = _lazy_dict({'index': _lazy_dict(index), 'validation': compiled['validation']})
+        layout_obj = _lazy_dict(_lazy_layout(layout))
+    else:
+        compiled_obj = _compiled_to_json(compiled)
+        layout_obj = layout_to_json(layout)
     obj = {
         'sff': data.get('sff', {}),
         'entry': data.get('entry', {}),
         'lanes': data.get('lanes', {}),
         'nodes': data.get('nodes', {}),
         'edges': data.get('edges', []),
-        'compiled': compiled,
-        'layout': layout,
-        'export_version': '1.0'
+        'compiled': compiled_obj,
+        'layout': layout_obj,
+        'export_version': EXPORT_VERSION
     }
-    return json.dumps(obj, indent=2, ensure_ascii=False)
+    return _lazy_dict(obj) if lazy else obj
+
+
+def _lazy_dict(obj):
+    """Força a emissão item a item de um dict pequeno que contém LazyItems."""
+    return LazyItems(obj.items)
+
+
+def iter_json(data, compiled, layout, compact: bool = False) -> Iterator[str]:
+    """Gera o export JSON em pedaços (mesmo texto de `export_json`)."""
+    obj = _export_object(data, compiled, layout, lazy='graph' in compiled)
+    return iter_json_value(obj, None if compact else 2)
+
+
+def write_json(data, compiled, layout, sink, compact: bool = False) -> int:
+    return write_chunks(iter_json(data, compiled, layout, compact), sink)
+
+
+def export_json(data, compiled, layout, compact: bool = False):
+    if compact:
+        return json.dumps(_export_object(data, compiled, layout, lazy=False), ensure_ascii=False, separators=(',', ':'))
+    return json.dumps(_export_object(data, compiled, layout, lazy=False), indent=2, ensure_ascii=False)
@@ -1,7 +1,58 @@
 """
 Gera flowchart Mermaid determinístico a partir do fluxo SFF.
+
+`iter_mermaid` gera as linhas sob demanda; `write_mermaid` as escreve em um
+sink (texto ou binário) e `export_mermaid` devolve a string completa.
+
+Ids que não são identificadores Mermaid (ex.: `pagamento/aprovado`, de fluxos
+ligados por subflow, ou `end`, palavra reservada) saem com um apelido seguro
+e determinístico (`pagamento_aprovado`, com sufixo numérico se colidir).
+Labels com caracteres da sintaxe (`[]()|"` etc.)
+saem entre aspas, com `"` como `#quot;`.
 """
-def export_mermaid(data, layout):
+import re
+
+from core.exporters.stream import join_lines, write_chunks
+
+_PLAIN_ID = re.compile(r'[A-Za-z_][A-Za-z0-9_]*\Z')
+_UNSAFE = re.compile(r'[^A-Za-z0-9_]')
+_SYNTAX = re.compile(r'[\[\](){}<>|"#;`]')
+_RESERVED = {'end', 'graph', 'subgraph', 'flowchart', 'style', 'class', 'classdef', 'click', 'linkstyle', 'direction'}
+
+
+def _plain(node_id: str) -> bool:
+    return bool(_PLAIN_ID.match(node_id)) and node_id.lower() not in _RESERVED
+
+
+def _aliases(ids):
+    """Apelido de cada id que não pode ser usado como está (ids seguros ficam de fora)."""
+    plain = {node_id for node_id in ids if _plain(node_id)}
+    taken = set(plain)
+    aliases = {}
+    for node_id in ids:
+        if node_id in plain:
+            continue
+        base = _UNSAFE.sub('_', node_id)
+        if not base or not (base[0].isalpha() or base[0] == '_') or base.lower() in _RESERVED:
+            base = 'n_' + base
+        alias, n = base, 1
+        while alias in taken:
+            n += 1
+            alias = f'{base}_{n}'
+        taken.add(alias)
+        aliases[node_id] = alias
+    return aliases
+
+
+def _text(label) -> str:
+    """Texto de label: entre aspas só quando tem caracteres da sintaxe."""
+    label = str(label)
+    if not _SYNTAX.search(label):
+        return label
+    return '"' + label.replace('"', '#quot;') + '"'
+
+
+def _lines(data, layout):
     direction = data.get('sff', {}).get('direction', 'TB')
     lanes = layout['lane_order']
     nodes = data['nodes']
@@ -9,18 +60,22 @@ def export_mermaid(data, layout):
     lane_nodes = {lane: [] for lane in lanes}
     for node_id, node in nodes.items():
         lane_nodes[node['lane']].append(node_id)
-    lines = [f"flowchart {direction}"]
+    aliases = _aliases(nodes)
+    yield f"flowchart {direction}"
     # Lanes como subgraph
     for lane in lanes:
-        lines.append(f"subgraph {lane}")
+        if _plain(lane):
+            yield f"subgraph {lane}"
+        else:
+            yield f"subgraph lane_{_UNSAFE.sub('_', lane)} [{_text(lane)}]"
         for node_id in lane_nodes[lane]:
             label = nodes[node_id].get('label', node_id)
-            lines.append(f"    {node_id}[{label}]")
-        lines.append("end")
+            yield f"    {aliases.get(node_id, node_id)}[{_text(label)}]"
+        yield "end"
     # Edges
     for edge in edges:
-        src = edge['from']
-        dst = edge['to']
+        src = aliases.get(edge['from'], edge['from'])
+        dst = aliases.get(edge['to'], edge['to'])
         branch = edge.get('branch')
         label = edge.get('label', '')
         edge_label = label
@@ -29,7 +84,18 @@ def export_mermaid(data, layout):
             elif branch == 'false': edge_label = 'Não'
             elif label: edge_label = label
         if edge_label:
-            lines.append(f"{src} -->|{edge_label}| {dst}")
+            yield f"{src} -->|{_text(edge_label)}| {dst}"
         else:
-            lines.append(f"{src} --> {dst}")
-    return '\n'.join(lines)
+            yield f"{src} --> {dst}"
+
+
+def iter_mermaid(data, layout):
+    return join_lines(_lines(data, layout))
+
+
+def write_mermaid(data, layout, sink):
+    return write_chunks(iter_mermaid(data, layout), sink)
+
+
+def export_mermaid(data, layout):
+    return '\n'.join(_lines(data, layout))
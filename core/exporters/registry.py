@@ -0,0 +1,228 @@
+"""
+core/exporters/registry.py
+Registro de exporters com carga sob demanda.
+
+Cada formato é descrito por um `Exporter` cujo alvo é uma string
+`'pacote.modulo:funcao'`: o módulo só é importado quando o formato é usado,
+então a CLI e os workers não pagam o import dos exporters que não pedem.
+Tipos de alvo (`kind`):
+- `writer`: `funcao(data, [compiled,] layout, sink, **opções)` escreve no sink;
+- `builder`: `funcao(data, [compiled,] layout, **opções)` devolve str ou bytes.
+`uses_compiled=False` omite o argumento `compiled` (ex.: Mermaid/DOT).
+
+`export_to_dir` roda vários formatos sobre o mesmo compile/layout em um pool
+de threads, gravando cada arquivo de forma atômica, e devolve o manifesto
+(caminho, bytes e tempo por formato).
+
+Exporters de terceiros entram por `register_exporter(...)` ou pelo grupo de
+entry points `sff.exporters`. O objeto do entry point pode ser um `Exporter`
+ou uma função writer (`funcao(data, compiled, layout, sink, **opções)`). Os
+entry points só são consultados quando o formato pedido não está no mapa.
+"""
+import importlib
+import io
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Union
+
+from core.exporters.stream import write_chunks
+from core.profiler.profiler import phase
+
+ENTRY_POINT_GROUP = 'sff.exporters'
+EXPORTER_KINDS = ('writer', 'builder')
+
+
+class Exporter:
+    """Descrição de um formato de exportação (o código só é importado em `load`)."""
+
+    __slots__ = ('name', 'target', 'extension', 'content_type', 'binary', 'uses_compiled', 'kind', '_func')
+
+    def __init__(
+        self,
+        name: str,
+        target: Union[str, Callable],
+        extension: Optional[str] = None,
+        content_type: str = 'application/octet-stream',
+        binary: bool = False,
+        uses_compiled: bool = True,
+        kind: str = 'writer',
+    ):
+        if kind not in EXPORTER_KINDS:
+            raise ValueError(f"Tipo de exporter inválido: {kind} (use {', '.join(EXPORTER_KINDS)})")
+        self.name = name
+        self.target = target
+        self.extension = extension or f'.{name}'
+        self.content_type = content_type
+        self.binary = binary
+        self.uses_compiled = uses_compiled
+        self.kind = kind
+        self._func = target if callable(target) else None
+
+    def load(self) -> Callable:
+        if self._func is None:
+            module_name, _, attr = self.target.partition(':')
+            self._func = getattr(importlib.import_module(module_name), attr)
+        return self._func
+
+    def _args(self, data, compiled, layout) -> tuple:
+        return (data, compiled, layout) if self.uses_compiled else (data, layout)
+
+    def write(self, data, compiled, layout, sink, **options):
+        """Escreve a saída no sink (texto ou binário)."""
+        func = self.load()
+        if self.kind == 'writer':
+            return func(*self._args(data, compiled, layout), sink, **options)
+        output = func(*self._args(data, compiled, layout), **options)
+        if isinstance(output, bytes):
+            sink.write(output)
+            return len(output)
+        return write_chunks([output or ''], sink)
+
+    def export(self, data, compiled, layout, **options) -> Union[str, bytes]:
+        """Saída completa em memória (str; bytes nos formatos binários)."""
+        func = self.load()
+        if self.kind == 'builder':
+            return func(*self._args(data, compiled, layout), **options)
+        sink = io.BytesIO() if self.binary else io.StringIO()
+        func(*self._args(data, compiled, layout), sink, **options)
+        return sink.getvalue()
+
+    def __repr__(self) -> str:
+        return f"Exporter({self.name!r}, {self.target!r})"
+
+
+_registry: Dict[str, Exporter] = {}
+_entry_points_loaded = False
+
+
+def register_exporter(name: str, target: Union[str, Callable, Exporter], replace: bool = False, **kwargs) -> Exporter:
+    """Registra um formato; `target` é 'modulo:funcao', uma função ou um `Exporter` pronto."""
+    name = name.lower()
+    if name in _registry and not replace:
+        raise ValueError(f"Exporter já registrado: {name}")
+    exporter = target if isinstance(target, Exporter) else Exporter(name, target, **kwargs)
+    _registry[name] = exporter
+    return exporter
+
+
+def _load_entry_points():
+    global _entry_points_loaded
+    if _entry_points_loaded:
+        return
+    _entry_points_loaded = True
+    try:
+        from importlib.metadata import entry_points
+        found = entry_points(group=ENTRY_POINT_GROUP)
+    except Exception:
+        return
+    for ep in found:
+        if ep.name.lower() in _registry:
+            continue
+        try:
+            obj = ep.load()
+        except Exception:
+            continue
+        register_exporter(ep.name, obj if isinstance(obj, Exporter) else Exporter(ep.name, obj))
+
+
+def get_exporter(name: str) -> Exporter:
+    """Exporter do formato (consulta os entry points se não estiver registrado)."""
+    name = name.lower()
+    exporter = _registry.get(name)
+    if exporter is None:
+        _load_entry_points()
+        exporter = _registry.get(name)
+    if exporter is None:
+        raise ValueError(f"Formato de exportação inválido: {name} (use {'|'.join(available_formats())})")
+    return exporter
+
+
+def available_formats(include_entry_points: bool = True) -> List[str]:
+    if include_entry_points:
+        _load_entry_points()
+    return list(_registry)
+
+
+def export_output(name: str, data, compiled, layout, **options) -> Union[str, bytes]:
+    """Saída completa do formato `name` (str; bytes nos formatos binários)."""
+    exporter = get_exporter(name)
+    with phase('export', format=exporter.name):
+        return exporter.export(data, compiled, layout, **options)
+
+
+def write_output(name: str, data, compiled, layout, sink, **options) -> Any:
+    """Escreve a saída do formato `name` em `sink`, em pedaços quando o exporter permite."""
+    exporter = get_exporter(name)
+    with phase('export', format=exporter.name):
+        return exporter.write(data, compiled, layout, sink, **options)
+
+
+def write_file(name: str, data, compiled, layout, path: str, **options) -> int:
+    """Grava a saída em `path` de forma atômica (temporário + os.replace); devolve o tamanho em bytes."""
+    # Temporário no mesmo diretório, único por processo/thread, com as permissões da umask
+    tmp = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, 'O_BINARY', 0), 0o666)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            write_output(name, data, compiled, layout, f, **options)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+    return os.path.getsize(path)
+
+
+def export_to_dir(
+    formats: Iterable[str],
+    data,
+    compiled,
+    layout,
+    out_dir: str,
+    basename: str,
+    options: Optional[Dict[str, Dict[str, Any]]] = None,
+    max_workers: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """Grava `<out_dir>/<basename><extensão>` para cada formato, em paralelo (threads).
+
+    Formatos desconhecidos levantam ValueError antes de qualquer escrita; a
+    falha de um exporter não interrompe os outros (`status: error` no manifesto).
+    `options` mapeia formato → opções do exporter (ex.: `{'json': {'compact': True}}`).
+    """
+    exporters = [get_exporter(name) for name in dict.fromkeys(f.lower() for f in formats)]
+    options = options or {}
+    os.makedirs(out_dir, exist_ok=True)
+
+    def run(exporter: Exporter) -> Dict[str, Any]:
+        path = os.path.join(out_dir, basename + exporter.extension)
+        entry: Dict[str, Any] = {'format': exporter.name, 'path': path}
+        t0 = time.perf_counter()
+        try:
+            entry['bytes'] = write_file(exporter.name, data, compiled, layout, path, **options.get(exporter.name, {}))
+            entry['status'] = 'ok'
+        except Exception as e:
+            entry['status'] = 'error'
+            entry['error'] = str(e)
+        entry['elapsed_ms'] = round((time.perf_counter() - t0) * 1000, 3)
+        return entry
+
+    if not exporters:
+        return []
+    with ThreadPoolExecutor(max_workers=max_workers or len(exporters)) as pool:
+        return list(pool.map(run, exporters))
+
+
+# Formatos embutidos
+register_exporter('mermaid', 'core.exporters.mermaid_exporter:write_mermaid', extension='.mmd',
+                  content_type='text/plain; charset=utf-8', uses_compiled=False)
+register_exporter('dot', 'core.exporters.dot_exporter:write_dot', extension='.dot',
+                  content_type='text/vnd.graphviz; charset=utf-8', uses_compiled=False)
+register_exporter('json', 'core.exporters.json_exporter:write_json', extension='.json',
+                  content_type='application/json; charset=utf-8')
+register_exporter('svg', 'core.exporters.svg_exporter:write_svg', extension='.svg',
+                  content_type='image/svg+xml; charset=utf-8', uses_compiled=False)
+register_exporter('sffc', 'core.sffc.sffc:write_sffc', extension='.sffc', binary=True)
@@ -0,0 +1,55 @@
+"""
+core/exporters/stream.py
+Escrita incremental das saídas dos exporters em sinks de texto ou binários.
+
+Os exporters produzem a saída como um gerador de pedaços de texto; aqui os
+pedaços são agrupados em blocos de até `BUFFER_SIZE` caracteres antes de cada
+`write`, então a memória de pico não cresce com o tamanho da saída.
+"""
+import io
+from typing import Any, Iterable, Iterator
+
+BUFFER_SIZE = 64 * 1024
+
+
+def is_binary_sink(sink: Any) -> bool:
+    """True para arquivos abertos em modo binário, BytesIO, sys.stdout.buffer etc."""
+    if isinstance(sink, (io.RawIOBase, io.BufferedIOBase)):
+        return True
+    if isinstance(sink, io.TextIOBase):
+        return False
+    return 'b' in getattr(sink, 'mode', '')
+
+
+def write_chunks(chunks: Iterable[str], sink: Any, encoding: str = 'utf-8') -> int:
+    """Escreve os pedaços em `sink` (texto ou binário); retorna o nº de caracteres escritos."""
+    binary = is_binary_sink(sink)
+    buffer = []
+    buffered = 0
+    total = 0
+    for chunk in chunks:
+        buffer.append(chunk)
+        buffered += len(chunk)
+        if buffered >= BUFFER_SIZE:
+            block = ''.join(buffer)
+            sink.write(block.encode(encoding) if binary else block)
+            total += buffered
+            buffer = []
+            buffered = 0
+    if buffer:
+        block = ''.join(buffer)
+        sink.write(block.encode(encoding) if binary else block)
+        total += buffered
+    return total
+
+
+def join_lines(lines: Iterable[str]) -> Iterator[str]:
+    """Equivalente incremental de '\\n'.join(lines)."""
+    first = True
+    for line in lines:
+        if first:
+            first = False
+            yield line
+        else:
+            yield '\n' + line
+
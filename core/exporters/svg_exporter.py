@@ -1,8 +1,21 @@
 """
 core/exporters/svg_exporter.py
 Exporta o diagrama SFF para SVG visual real, auto-size, lanes, nodes, edges ortogonais.
+
+O SVG é gerado em streaming, linha a linha (`iter_svg`/`write_svg`), na mesma
+ordem de desenho: faixas das lanes, edges, nós, labels dos nós e labels das
+edges. Para a saída crescer linearmente com o número de nós:
+- cada tipo de nó é desenhado uma vez em `<defs>` e reutilizado com `<use>`;
+- a seta é um único `<marker>`; estilos comuns ficam nos grupos `<g>` e no `<style>`;
+- as coordenadas saem do grid do layout (`positions`/`routing`), sem medir texto.
+Labels das edges são posicionados com um índice espacial (hash em grid de
+caixas já ocupadas por nós e labels): cada label testa algumas posições ao
+longo do caminho e fica na primeira sem colisão.
 """
-import os
+from html import escape
+from typing import Any, Dict, Iterator, List, Tuple
+
+from core.exporters.stream import join_lines, write_chunks
 from core.logger.logger import Logger
 
 logger = Logger()
@@ -15,6 +28,7 @@ NODE_STYLES = {
     'process': {'shape': 'rect', 'fill': '#e3f2fd', 'stroke': '#1565c0'},
     'decision': {'shape': 'diamond', 'fill': '#fffde7', 'stroke': '#fbc02d'},
     'delay': {'shape': 'rect', 'fill': '#f3e5f5', 'stroke': '#6a1b9a', 'icon': True},
+    'subflow': {'shape': 'rect', 'fill': '#e8f5e9', 'stroke': '#2e7d32'},
 }
 
 LANE_COLORS = ['#f5f5f5', '#e0e0e0', '#eeeeee', '#fafafa']
@@ -30,13 +44,347 @@ FONT_SIZE = 16
 LABEL_MARGIN = 8
 LANE_TITLE_HEIGHT = 32
 
+# Espaçamento do grid do layout (px por coluna/rank) e fonte dos labels de nós/edges
+GRID_X = NODE_WIDTH + 64
+GRID_Y = NODE_HEIGHT + 48
+LABEL_FONT_SIZE = FONT_SIZE - 4
+LABEL_LINE_HEIGHT = LABEL_FONT_SIZE + 2
+LABEL_MAX_LINES = 2
+# Largura média estimada de um caractere (em múltiplos do tamanho da fonte)
+CHAR_WIDTH = 0.55
+EDGE_COLOR = '#455a64'
+
+Box = Tuple[float, float, float, float]
+
+
+def _num(v: float) -> str:
+    """Coordenada com no máximo 1 casa decimal (inteiros sem ponto)."""
+    v = round(v, 1)
+    return str(int(v)) if v == int(v) else str(v)
+
+
+def _half_extent(node_type: str) -> Tuple[float, float]:
+    """Meia largura e meia altura do desenho de um tipo de nó."""
+    shape = NODE_STYLES.get(node_type, NODE_STYLES['process'])['shape']
+    if shape == 'circle':
+        return CIRCLE_RADIUS, CIRCLE_RADIUS
+    if shape == 'diamond':
+        return NODE_WIDTH / 2, DIAMOND_SIZE / 2
+    return NODE_WIDTH / 2, NODE_HEIGHT / 2
+
+
+def _label_room(node_type: str) -> float:
+    """Largura útil (px) de cada linha do label dentro do desenho do nó."""
+    shape = NODE_STYLES.get(node_type, NODE_STYLES['process'])['shape']
+    if shape == 'circle':
+        return 2 * CIRCLE_RADIUS - LABEL_MARGIN
+    if shape == 'diamond':
+        # Largura do losango na altura das duas linhas de texto
+        return NODE_WIDTH * (1 - LABEL_LINE_HEIGHT / DIAMOND_SIZE) - LABEL_MARGIN
+    return NODE_WIDTH - 2 * LABEL_MARGIN
+
+
+def _text_width(text: str, font_size: float = LABEL_FONT_SIZE) -> float:
+    return len(text) * font_size * CHAR_WIDTH
+
+
+def _truncate(text: str, width: float, font_size: float = LABEL_FONT_SIZE) -> str:
+    """Trunca o texto com reticências para caber em `width` px (estimado)."""
+    max_chars = max(int(width / (font_size * CHAR_WIDTH)), 1)
+    return text if len(text) <= max_chars else text[:max_chars - 1].rstrip() + '…'
+
+
+def _wrap(text: str, width: float, max_lines: int = LABEL_MAX_LINES) -> List[str]:
+    """Quebra o texto por palavras em até `max_lines` linhas de `width` px (estimado).
+
+    O que não couber na última linha é truncado com reticências.
+    """
+    max_chars = max(int(width / (LABEL_FONT_SIZE * CHAR_WIDTH)), 1)
+    if len(text) <= max_chars:
+        return [text]
+    lines: List[str] = []
+    current = ''
+    words = text.split()
+    for k, word in enumerate(words):
+        candidate = f'{current} {word}' if current else word
+        if len(candidate) <= max_chars:
+            current = candidate
+            continue
+        if current:
+            lines.append(current)
+        current = word
+        if len(lines) == max_lines - 1:
+            current = ' '.join(words[k:])
+            break
+    lines.append(current)
+    lines[-1] = _truncate(lines[-1], width)
+    return lines
+
+
+def _symbol(node_type: str, style: Dict[str, Any]) -> str:
+    """Desenho de um tipo de nó centrado na origem (para `<use>`)."""
+    attrs = f'fill="{style["fill"]}" stroke="{style["stroke"]}" stroke-width="2"'
+    shape = style['shape']
+    if shape == 'circle':
+        body = f'<circle r="{CIRCLE_RADIUS}" {attrs}/>'
+    elif shape == 'diamond':
+        w, h = NODE_WIDTH // 2, DIAMOND_SIZE // 2
+        body = f'<polygon points="0,{-h} {w},0 0,{h} {-w},0" {attrs}/>'
+    else:
+        w, h = NODE_WIDTH // 2, NODE_HEIGHT // 2
+        body = f'<rect x="{-w}" y="{-h}" width="{NODE_WIDTH}" height="{NODE_HEIGHT}" rx="6" {attrs}/>'
+    if style.get('icon'):
+        # Relógio no canto superior direito (nós de espera)
+        cx, cy = NODE_WIDTH // 2 - 10, -NODE_HEIGHT // 2 + 10
+        body += (f'<circle cx="{cx}" cy="{cy}" r="6" fill="#fff" stroke="{style["stroke"]}"/>'
+                 f'<path d="M{cx},{cy - 4}V{cy}H{cx + 3}" fill="none" stroke="{style["stroke"]}"/>')
+    return f'<g id="n-{node_type}">{body}</g>'
+
+
+class LabelIndex:
+    """Índice espacial de caixas (hash em grid) para posicionar labels sem colisão."""
+
+    __slots__ = ('cell', 'buckets')
+
+    def __init__(self, cell: float = GRID_X / 2):
+        self.cell = cell
+        self.buckets: Dict[Tuple[int, int], List[Box]] = {}
+
+    def _keys(self, box: Box) -> Iterator[Tuple[int, int]]:
+        cell = self.cell
+        for gx in range(int(box[0] // cell), int(box[2] // cell) + 1):
+            for gy in range(int(box[1] // cell), int(box[3] // cell) + 1):
+                yield gx, gy
+
+    def add(self, box: Box):
+        for key in self._keys(box):
+            self.buckets.setdefault(key, []).append(box)
+
+    def collides(self, box: Box) -> bool:
+        x0, y0, x1, y1 = box
+        for key in self._keys(box):
+            for other in self.buckets.get(key, ()):
+                if x0 < other[2] and other[0] < x1 and y0 < other[3] and other[1] < y1:
+                    return True
+        return False
+
+
+def _edge_label(edge: Dict[str, Any]) -> str:
+    branch = edge.get('branch')
+    if branch == 'true':
+        return 'Sim'
+    if branch == 'false':
+        return 'Não'
+    return edge.get('label') or ''
+
+
+class _Frame:
+    """Conversão grid → px e faixas das lanes, derivadas de `positions`."""
+
+    def __init__(self, data, layout):
+        self.direction = data.get('sff', {}).get('direction', 'TB')
+        positions = layout.get('positions', {})
+        nodes = data.get('nodes', {})
+        tb = self.direction == 'TB'
+        # Eixo "transversal" (colunas das lanes) e eixo dos ranks
+        cross = {}
+        max_rank = 0
+        for node_id, (x, y) in positions.items():
+            c, r = (x, y) if tb else (y, x)
+            lane = nodes[node_id].get('lane')
+            lo, hi = cross.get(lane, (c, c))
+            cross[lane] = (min(lo, c), max(hi, c))
+            max_rank = max(max_rank, r)
+        # Cada lane ocupa colunas contíguas [início, início + largura) na ordem de lane_order
+        self.bands: List[Tuple[str, int, int]] = []
+        start = 0
+        for lane in layout.get('lane_order', []):
+            lo, hi = cross.get(lane, (start, start))
+            width = hi - lo + 1
+            self.bands.append((lane, start, width))
+            start += width
+        self.columns = max(start, 1)
+        self.rows = max_rank + 1 if positions else 1
+        if tb:
+            self.origin = (SVG_PADDING, SVG_PADDING + LANE_TITLE_HEIGHT)
+            self.width = 2 * SVG_PADDING + self.columns * GRID_X
+            self.height = 2 * SVG_PADDING + LANE_TITLE_HEIGHT + self.rows * GRID_Y
+        else:
+            self.origin = (SVG_PADDING + LANE_TITLE_HEIGHT, SVG_PADDING)
+            self.width = 2 * SVG_PADDING + LANE_TITLE_HEIGHT + self.rows * GRID_X
+            self.height = 2 * SVG_PADDING + self.columns * GRID_Y
+
+    def point(self, x: float, y: float) -> Tuple[float, float]:
+        return self.origin[0] + (x + 0.5) * GRID_X, self.origin[1] + (y + 0.5) * GRID_Y
+
+    def lane_elements(self, data) -> Iterator[str]:
+        lanes = data.get('lanes', {})
+        tb = self.direction == 'TB'
+        for k, (lane, start, width) in enumerate(self.bands):
+            full = str(lanes.get(lane, {}).get('title') or lane)
+            color = LANE_COLORS[k % len(LANE_COLORS)]
+            if tb:
+                x, y = SVG_PADDING + start * GRID_X, SVG_PADDING
+                w, h = width * GRID_X, LANE_TITLE_HEIGHT + self.rows * GRID_Y
+                tx, ty, extra, room = _num(x + w / 2), _num(y + LANE_TITLE_HEIGHT / 2), '', w
+            else:
+                x, y = SVG_PADDING, SVG_PADDING + start * GRID_Y
+                w, h = LANE_TITLE_HEIGHT + self.rows * GRID_X, width * GRID_Y
+                tx, ty, room = _num(x + LANE_TITLE_HEIGHT / 2), _num(y + h / 2), h
+                extra = f' transform="rotate(-90 {tx} {ty})"'
+            # Título truncado à largura da faixa (texto inteiro no <title>)
+            title = _truncate(full, room - LABEL_MARGIN, FONT_SIZE)
+            tip = f'<title>{escape(full)}</title>' if title != full else ''
+            yield (f'<rect x="{x}" y="{y}" width="{w}" height="{h}" fill="{color}"/>'
+                   f'<text class="t" x="{tx}" y="{ty}"{extra}>{escape(title)}{tip}</text>')
+
+
+def _clip(points: List[Tuple[float, float]], start_ext, end_ext) -> List[Tuple[float, float]]:
+    """Encurta o primeiro e o último trecho até a borda dos nós de origem e destino."""
+    def toward(a, b, ext):
+        dx, dy = b[0] - a[0], b[1] - a[1]
+        if dx == 0 and dy == 0:
+            return a
+        if abs(dx) >= abs(dy):
+            step = min(ext[0], abs(dx))
+            return a[0] + (step if dx > 0 else -step), a[1]
+        step = min(ext[1], abs(dy))
+        return a[0], a[1] + (step if dy > 0 else -step)
+    if len(points) < 2:
+        return points
+    points = list(points)
+    points[0] = toward(points[0], points[1], start_ext)
+    points[-1] = toward(points[-1], points[-2], end_ext)
+    return points
+
+
+def _edge_points(frame: _Frame, segments, src_pos, dst_pos) -> List[Tuple[float, float]]:
+    if segments:
+        grid = [segments[0][0]] + [b for _, b in segments]
+    else:
+        # Sem rota (ex.: nó fora do layout roteado): linha reta entre os centros
+        grid = [src_pos, dst_pos]
+    points = []
+    for gx, gy in grid:
+        p = frame.point(gx, gy)
+        if not points or points[-1] != p:
+            points.append(p)
+    return points
+
+
+def _label_candidates(points, width: float, height: float) -> Iterator[Box]:
+    """Caixas candidatas para o label: meio de cada trecho, dos dois lados da linha."""
+    gap = 4
+    for a, b in zip(points, points[1:]):
+        mx, my = (a[0] + b[0]) / 2, (a[1] + b[1]) / 2
+        if a[0] == b[0]:
+            # Trecho vertical: label à direita ou à esquerda
+            for cx in (mx + gap + width / 2, mx - gap - width / 2):
+                yield cx - width / 2, my - height / 2, cx + width / 2, my + height / 2
+        else:
+            for cy in (my - gap - height / 2, my + gap + height / 2):
+                yield mx - width / 2, cy - height / 2, mx + width / 2, cy + height / 2
+
+
+def _elements(data, layout) -> Iterator[str]:
+    nodes = data.get('nodes', {})
+    positions = layout.get('positions', {})
+    routing = layout.get('routing', {})
+    back_edges = set(map(tuple, layout.get('back_edges', [])))
+    frame = _Frame(data, layout)
+    width, height = frame.width, frame.height
+    title = escape(str(data.get('sff', {}).get('title') or data.get('sff', {}).get('id') or 'SFF'))
+    used_types = {nodes[n].get('type') if nodes[n].get('type') in NODE_STYLES else 'process' for n in positions}
+    yield (f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+           f'viewBox="0 0 {width} {height}" font-family="sans-serif">')
+    yield f'<title>{title}</title>'
+    yield ('<style>text{text-anchor:middle;dominant-baseline:central}'
+           f'.t{{font-size:{FONT_SIZE}px;font-weight:bold;fill:#37474f}}'
+           f'.n text{{font-size:{LABEL_FONT_SIZE}px;fill:#212121}}'
+           f'.l text{{font-size:{LABEL_FONT_SIZE}px;fill:{EDGE_COLOR};paint-order:stroke;stroke:#fff;stroke-width:3px}}'
+           '.b{stroke-dasharray:6 4}</style>')
+    yield '<defs>'
+    yield (f'<marker id="arrow" viewBox="0 0 {ARROW_SIZE} {ARROW_SIZE}" refX="{ARROW_SIZE}" refY="{ARROW_SIZE // 2}" '
+           f'markerWidth="{ARROW_SIZE}" markerHeight="{ARROW_SIZE}" markerUnits="userSpaceOnUse" orient="auto">'
+           f'<path d="M0,0L{ARROW_SIZE},{ARROW_SIZE // 2}L0,{ARROW_SIZE}z" fill="{EDGE_COLOR}"/></marker>')
+    for node_type, style in NODE_STYLES.items():
+        if node_type in used_types:
+            yield _symbol(node_type, style)
+    yield '</defs>'
+    yield '<g class="lanes">'
+    yield from frame.lane_elements(data)
+    yield '</g>'
+    # Edges (os pontos são guardados para posicionar os labels no fim)
+    labeled: List[Tuple[str, List[Tuple[float, float]]]] = []
+    yield f'<g class="edges" fill="none" stroke="{EDGE_COLOR}" stroke-width="1.5" marker-end="url(#arrow)">'
+    for edge in data.get('edges', []):
+        src, dst = edge.get('from'), edge.get('to')
+        if src not in positions or dst not in positions:
+            continue
+        points = _edge_points(frame, routing.get((src, dst)), positions[src], positions[dst])
+        points = _clip(points, _half_extent(nodes[src].get('type')), _half_extent(nodes[dst].get('type')))
+        d = 'M' + 'L'.join(f'{_num(x)},{_num(y)}' for x, y in points)
+        cls = ' class="b"' if (src, dst) in back_edges else ''
+        yield f'<path{cls} d="{d}"/>'
+        text = _edge_label(edge)
+        if text:
+            labeled.append((text, points))
+    yield '</g>'
+    # Nós: um <use> por nó referenciando o desenho do tipo
+    index = LabelIndex()
+    yield '<g class="n">'
+    for node_id, (gx, gy) in positions.items():
+        node_type = nodes[node_id].get('type')
+        x, y = frame.point(gx, gy)
+        hw, hh = _half_extent(node_type)
+        index.add((x - hw, y - hh, x + hw, y + hh))
+        ref = node_type if node_type in NODE_STYLES else 'process'
+        yield f'<use href="#n-{ref}" x="{_num(x)}" y="{_num(y)}"/>'
+    for node_id, (gx, gy) in positions.items():
+        node = nodes[node_id]
+        label = str(node.get('label', node_id))
+        x, y = frame.point(gx, gy)
+        lines = _wrap(label, _label_room(node.get('type')))
+        tip = f'<title>{escape(label)}</title>' if lines[-1].endswith('…') else ''
+        sx, sy = _num(x), _num(y)
+        if len(lines) == 1:
+            yield f'<text x="{sx}" y="{sy}">{escape(lines[0])}{tip}</text>'
+        else:
+            # Linhas centradas verticalmente no nó
+            dy = _num(-(len(lines) - 1) * LABEL_LINE_HEIGHT / 2)
+            spans = ''.join(f'<tspan x="{sx}" dy="{dy if k == 0 else LABEL_LINE_HEIGHT}">{escape(line)}</tspan>'
+                            for k, line in enumerate(lines))
+            yield f'<text x="{sx}" y="{sy}">{spans}{tip}</text>'
+    yield '</g>'
+    # Labels das edges, na primeira posição livre ao longo do caminho
+    collisions = 0
+    yield '<g class="l">'
+    for text, points in labeled:
+        w = _text_width(text) + 4
+        h = LABEL_FONT_SIZE + 4
+        candidates = list(_label_candidates(points, w, h))
+        if not candidates:
+            continue
+        chosen = next((box for box in candidates if not index.collides(box)), None)
+        if chosen is None:
+            # Sem posição livre: fica no meio do primeiro trecho
+            collisions += 1
+            chosen = candidates[0]
+        index.add(chosen)
+        yield f'<text x="{_num((chosen[0] + chosen[2]) / 2)}" y="{_num((chosen[1] + chosen[3]) / 2)}">{escape(text)}</text>'
+    yield '</g>'
+    yield '</svg>'
+    logger.info(f"[SVG Export] {width}x{height}px, {len(positions)} nós, {len(labeled)} labels de edge, "
+                f"{collisions} sem posição livre")
+
+
+def iter_svg(data, layout):
+    return join_lines(_elements(data, layout))
+
+
+def write_svg(data, layout, sink):
+    return write_chunks(iter_svg(data, layout), sink)
+
 
 def export_svg(data, layout):
-    try:
-        logger.info(f"[SVG Export] Iniciando exportação SVG para {data.get('filename', '<output>')}")
-        # ...existing code...
-        svg.append('</svg>')
-        return '\n'.join(svg)
-    except Exception as e:
-        logger.error(f"[SVG Export] Falha ao gerar SVG: {e}")
-        return f'<svg><text x="10" y="20" fill="red">Erro ao gerar SVG: {e}</text></svg>'
+    return '\n'.join(_elements(data, layout))
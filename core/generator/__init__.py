@@ -0,0 +1 @@
+# __init__.py para tornar o diretório generator um pacote Python
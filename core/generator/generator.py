@@ -0,0 +1,121 @@
+"""
+core/generator/generator.py
+Gerador determinístico (semente) de fluxos SFF válidos para testes de escala.
+
+O fluxo é uma cadeia principal de `start` até `end_success`, com:
+- decisions booleanas (`decision_ratio`): o ramo true segue a cadeia e o ramo
+  false volta para um nó anterior (`loop_ratio`, laço de nova tentativa), vai
+  para `end_failure` ou abre um desvio que reencontra a cadeia adiante;
+- nós de espera `delay` (`delay_ratio`) com `min_seconds`/`max_seconds`;
+- troca de lane aleatória entre nós consecutivos (`lane_switch`).
+O resultado sempre passa em `validate_sff_structure` e `validate_sff_logic`
+e tem exatamente `num_nodes` nós (mínimo 3).
+"""
+import random
+from typing import Any, Dict, List, Tuple
+
+# Janela (em nós da cadeia) para alvos de laço e para o reencontro dos desvios
+LOOP_WINDOW = 20
+DETOUR_SPAN = (2, 8)
+
+
+def generate_flow(
+    num_nodes: int = 1000,
+    lanes: int = 3,
+    decision_ratio: float = 0.1,
+    delay_ratio: float = 0.05,
+    loop_ratio: float = 0.2,
+    lane_switch: float = 0.3,
+    seed: int = 0,
+    direction: str = 'TB',
+) -> Dict[str, Any]:
+    """Gera um documento SFF válido; mesma semente e parâmetros → mesmo documento."""
+    rng = random.Random(seed)
+    num_nodes = max(num_nodes, 3)
+    lane_ids = [f'lane_{i + 1}' for i in range(max(lanes, 1))]
+    nodes: Dict[str, Dict[str, Any]] = {}
+    edges: List[Dict[str, Any]] = []
+    lane = lane_ids[0]
+    nodes['start'] = {'type': 'start', 'lane': lane, 'label': 'Início'}
+    chain = ['start']
+    # Desvios abertos: (posição da cadeia em que reencontram, id do nó do desvio)
+    detours: List[Tuple[int, str]] = []
+    uses_failure = False
+    # Reserva end_success e end_failure
+    budget = num_nodes - 2
+
+    def link(source: str, target: str, branch=None):
+        edge = {'from': source, 'to': target}
+        if branch is not None:
+            edge['branch'] = branch
+            edge['label'] = 'Sim' if branch == 'true' else 'Não'
+            nodes[source]['branches'][branch] = {'label': edge['label'], 'next': target}
+        edges.append(edge)
+
+    def attach(node_id: str):
+        """Liga o nó ao fim da cadeia (ramo true se o último for decision) e aos desvios pendentes."""
+        last = chain[-1]
+        link(last, node_id, 'true' if nodes[last]['type'] == 'decision' else None)
+        position = len(chain)
+        for item in [d for d in detours if d[0] <= position]:
+            link(item[1], node_id)
+            detours.remove(item)
+        chain.append(node_id)
+
+    i = 0
+    while len(nodes) < budget:
+        i += 1
+        if rng.random() < lane_switch:
+            lane = rng.choice(lane_ids)
+        node_id = f'n{i}'
+        roll = rng.random()
+        # Decision precisa de espaço para um possível nó de desvio
+        if roll < decision_ratio and len(nodes) + 2 <= budget:
+            nodes[node_id] = {
+                'type': 'decision', 'lane': lane, 'label': f'Decisão {i}',
+                'decision': {'kind': 'boolean'}, 'branches': {},
+            }
+            attach(node_id)
+            pick = rng.random()
+            candidates = chain[max(1, len(chain) - 1 - LOOP_WINDOW):-1]
+            if pick < loop_ratio and candidates:
+                link(node_id, rng.choice(candidates), 'false')
+            elif pick < loop_ratio + (1 - loop_ratio) / 2:
+                link(node_id, 'end_failure', 'false')
+                uses_failure = True
+            else:
+                detour_id = f'd{i}'
+                nodes[detour_id] = {'type': 'process', 'lane': rng.choice(lane_ids), 'label': f'Tratamento {i}'}
+                link(node_id, detour_id, 'false')
+                detours.append((len(chain) + rng.randint(*DETOUR_SPAN), detour_id))
+        elif roll < decision_ratio + delay_ratio:
+            low = rng.randint(1, 30)
+            nodes[node_id] = {
+                'type': 'delay', 'lane': lane, 'label': f'Aguardar {i}',
+                'delay': {'min_seconds': low, 'max_seconds': low + rng.randint(0, 60)},
+            }
+            attach(node_id)
+        else:
+            nodes[node_id] = {'type': 'process', 'lane': lane, 'label': f'Passo {i}'}
+            attach(node_id)
+    ends = ['end_success']
+    if uses_failure:
+        ends.append('end_failure')
+    else:
+        # Sem decision apontando para a falha: completa a contagem com mais um passo
+        nodes[f'n{i + 1}'] = {'type': 'process', 'lane': lane, 'label': f'Passo {i + 1}'}
+        attach(f'n{i + 1}')
+    nodes['end_success'] = {'type': 'end', 'lane': lane_ids[0], 'label': 'Sucesso'}
+    attach('end_success')
+    for _, detour_id in detours:
+        link(detour_id, 'end_success')
+    if uses_failure:
+        nodes['end_failure'] = {'type': 'end', 'lane': lane_ids[0], 'label': 'Falha'}
+    return {
+        'sff': {'version': '1.0', 'id': f'generated_{num_nodes}_{seed}', 'title': f'Fluxo gerado ({num_nodes} nós)',
+                'direction': direction},
+        'entry': {'start': 'start', 'ends': ends},
+        'lanes': {lane_id: {'title': f'Lane {k + 1}', 'order': k + 1} for k, lane_id in enumerate(lane_ids)},
+        'nodes': nodes,
+        'edges': edges,
+    }
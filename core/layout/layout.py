@@ -1,85 +1,146 @@
 """
 core/layout/layout.py
-Estrutura base para futura implementação do cálculo de ranks, posições e roteamento.
+Cálculo de ranks, posições e roteamento do layout.
 """
-from typing import Dict, Any, List, Tuple
-import collections
+from typing import Dict, Any, Optional
+from array import array
+from core.layout.ranking import compute_ranks, compute_ranks_with_floor, DEFAULT_RANK_MODE
+from core.layout.ordering import order_layers, order_from_hint, DEFAULT_ORDER_METHOD, DEFAULT_ORDER_ITERATIONS
+from core.layout.routing import route_edges
+from core.compiler.graph import CompiledGraph
+from core.profiler.profiler import annotate, instrumented, phase
 
-def generate_layout(data: Dict[str, Any], compiled: Dict[str, Any]) -> Dict[str, Any]:
-    """Gera ranks, positions (grid) e routing ortogonal determinístico."""
-    nodes = data.get("nodes", {})
-    edges = data.get("edges", [])
-    lanes = data.get("lanes", {})
+@instrumented()
+def generate_layout(
+    data: Dict[str, Any],
+    compiled: Dict[str, Any],
+    rank_mode: str = DEFAULT_RANK_MODE,
+    order_method: str = DEFAULT_ORDER_METHOD,
+    order_iterations: int = DEFAULT_ORDER_ITERATIONS,
+    order_time_budget: Optional[float] = None,
+    hint: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """Gera ranks, positions (grid) e routing ortogonal determinístico.
+
+    `rank_mode` seleciona o algoritmo de camadas (`longest-path` ou
+    `network-simplex`); back-edges são invertidas apenas durante o ranking.
+    `order_method`, `order_iterations` e `order_time_budget` (segundos)
+    controlam a ordenação dentro dos ranks; nós que dividem a mesma célula
+    (rank, lane) recebem colunas distintas dentro da lane.
+
+    `hint` é o layout anterior do fluxo no formato de `core.diff.layout_hint`
+    (`ranks`, `columns`, `lane_widths` e `routes`): os nós que já existiam
+    partem do rank e da coluna anteriores e só as células (rank, lane)
+    afetadas pela mudança mudam, e edges cujo caminho continua livre não
+    são roteadas de novo. Com dica, `rank_mode` e a ordenação por
+    varreduras não são usados.
+    """
     entry = data.get("entry", {})
-    direction = data.get("sff", {}).get("direction", "TB")
-    prev = compiled["index"]["prev"]
-    # 1. Calcular ranks (BFS)
-    ranks = {}
-    queue = collections.deque()
+    graph = compiled["graph"]
+    # 1. Calcular ranks (quebra de ciclos + layering sobre o índice next compilado)
     start = entry.get("start")
     if start is None:
         return {"ranks": {}, "positions": {}, "routing": {}}
-    ranks[start] = 0
-    queue.append(start)
-    while queue:
-        node = queue.popleft()
-        for e in edges:
-            if e["from"] == node:
-                to = e["to"]
-                if to not in ranks or ranks[to] > ranks[node] + 1:
-                    ranks[to] = ranks[node] + 1
-                    queue.append(to)
+    annotate(nodes=graph.num_nodes, edges=graph.num_edges, rank_mode=rank_mode)
+    if hint is not None:
+        previous = hint["ranks"]
+        floor = array("i", [previous.get(node_id, 0) for node_id in graph.node_ids])
+        with phase('ranking', rank_mode='hint'):
+            rank_array, back = compute_ranks_with_floor(graph, graph.node_index.get(start), floor)
+    else:
+        with phase('ranking', rank_mode=rank_mode):
+            rank_array, back = compute_ranks(graph, graph.node_index.get(start), rank_mode)
+    return layout_from_ranks(data, graph, rank_array, back, rank_mode,
+                             order_method, order_iterations, order_time_budget, hint)
+
+
+def layout_from_ranks(
+    data: Dict[str, Any],
+    graph: CompiledGraph,
+    rank_array: array,
+    back: bytearray,
+    rank_mode: str = DEFAULT_RANK_MODE,
+    order_method: str = DEFAULT_ORDER_METHOD,
+    order_iterations: int = DEFAULT_ORDER_ITERATIONS,
+    order_time_budget: Optional[float] = None,
+    hint: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """Etapas 2–5 do layout a partir de ranks já calculados (ex.: pela sessão incremental).
+
+    `rank_array` é indexado pelos nós da IR; `back` é a máscara de back-edges.
+    Com `hint` (ver `generate_layout`), a ordem parte das colunas anteriores e
+    nenhuma lane fica mais estreita do que era.
+    """
+    lanes = data.get("lanes", {})
+    direction = data.get("sff", {}).get("direction", "TB")
+    ids = graph.node_ids
+    ranks = dict(zip(ids, rank_array))
+    back_edges = [(ids[graph.edge_src[k]], ids[graph.edge_dst[k]]) for k in range(graph.num_edges) if back[k]]
     # 2. Ordenar lanes
     lane_order = sorted(lanes, key=lambda l: lanes[l].get("order", 0))
     lane_offsets = {lane: i for i, lane in enumerate(lane_order)}
-    # 3. Calcular posições (grid)
+    # 3. Ordenação dentro dos ranks (minimização de cruzamentos, agrupada por lane)
+    no_lane = len(lane_order)
+    lane_key = array("i", [lane_offsets.get(graph.lane_of(i), no_lane) for i in range(len(ids))])
+    if hint is not None:
+        with phase('ordering', method='hint') as span:
+            columns = hint["columns"]
+            previous = {i: columns[node_id] for i, node_id in enumerate(ids) if node_id in columns}
+            ordering = order_from_hint(graph, rank_array, lane_key, back, previous)
+            span.set(crossings=ordering["crossings"], kept=len(previous))
+    else:
+        with phase('ordering', method=order_method) as span:
+            ordering = order_layers(graph, rank_array, lane_key, back, order_method, order_iterations, order_time_budget)
+            span.set(crossings=ordering["crossings"], iterations=ordering["iterations"])
+    # 4. Calcular posições (grid): cada lane tem a largura da sua maior célula (rank, lane)
+    cell_index = array("i", [0]) * len(ids)
+    lane_width = [1] * (no_lane + 1)
+    if hint is not None:
+        # Lanes não encolhem: as seguintes mantêm o início enquanto nenhuma crescer
+        for lane, width in hint["lane_widths"].items():
+            if lane in lane_offsets:
+                lane_width[lane_offsets[lane]] = max(width, 1)
+    for layer in ordering["layers"]:
+        count = {}
+        for i in layer:
+            c = count.get(lane_key[i], 0)
+            cell_index[i] = c
+            count[lane_key[i]] = c + 1
+        for lane, c in count.items():
+            if c > lane_width[lane]:
+                lane_width[lane] = c
+    lane_start = [0] * (no_lane + 1)
+    for lane in range(1, no_lane + 1):
+        lane_start[lane] = lane_start[lane - 1] + lane_width[lane - 1]
     positions = {}
-    # Agrupar por rank e lane
-    rank_lane_nodes = collections.defaultdict(lambda: collections.defaultdict(list))
-    for node_id, node in nodes.items():
-        r = ranks.get(node_id, 0)
-        lane = node.get("lane")
-        rank_lane_nodes[r][lane].append(node_id)
-    for r in sorted(rank_lane_nodes):
-        for lane in lane_order:
-            nodes_in_cell = rank_lane_nodes[r].get(lane, [])
-            for idx, node_id in enumerate(nodes_in_cell):
-                if direction == "TB":
-                    x = lane_offsets[lane]
-                    y = r
-                else:
-                    x = r
-                    y = lane_offsets[lane]
-                positions[node_id] = (x, y)
-    # 4. Routing ortogonal (mínimo viável)
-    routing = {}
-    occupied = set(positions.values())
-    for edge in edges:
-        src = edge["from"]
-        dst = edge["to"]
-        src_pos = positions.get(src)
-        dst_pos = positions.get(dst)
-        if not src_pos or not dst_pos:
-            routing[(src, dst)] = []
+    for i, node_id in enumerate(ids):
+        if lane_key[i] == no_lane:
             continue
-        path = []
-        # Caminho ortogonal: src → (x_dst, y_src) → dst
-        if direction == "TB":
-            mid = (dst_pos[0], src_pos[1])
-            if mid != src_pos:
-                path.append((src_pos, mid))
-            if mid != dst_pos:
-                path.append((mid, dst_pos))
-        else:
-            mid = (src_pos[0], dst_pos[1])
-            if mid != src_pos:
-                path.append((src_pos, mid))
-            if mid != dst_pos:
-                path.append((mid, dst_pos))
-        routing[(src, dst)] = path
-    return {
+        x = lane_start[lane_key[i]] + cell_index[i]
+        r = rank_array[i]
+        positions[node_id] = (x, r) if direction == "TB" else (r, x)
+    # 5. Routing ortogonal com desvio de obstáculos (A* + canais paralelos)
+    with phase('routing') as span:
+        routed = route_edges(graph, positions, direction, hint.get("routes") if hint is not None else None)
+        span.set(fallbacks=routed["fallbacks"], reused=routed["reused"])
+    layout = {
         "ranks": ranks,
         "positions": positions,
         "lane_order": lane_order,
-        "routing": routing
+        "routing": routed["routing"],
+        "routing_stats": {
+            "bends": routed["bends"],
+            "fallbacks": routed["fallbacks"],
+            "time_ms": routed["time_ms"]
+        },
+        "rank_mode": rank_mode,
+        "back_edges": back_edges,
+        "ordering": {
+            "method": ordering["method"],
+            "iterations": ordering["iterations"],
+            "crossings": ordering["crossings"]
+        }
     }
+    if hint is not None:
+        layout["hint"] = {"kept_columns": len(previous), "reused_routes": routed["reused"]}
+    return layout
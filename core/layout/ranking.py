@@ -0,0 +1,349 @@
+"""
+core/layout/ranking.py
+Etapa de camadas (ranks) do layout: quebra de ciclos e atribuição de ranks.
+
+Trabalha sobre a IR compilada (`CompiledGraph`). Back-edges (ex.: laços de
+nova tentativa) são detectadas por DFS iterativa e invertidas apenas durante
+o ranking. Modos disponíveis:
+- `longest-path`: rank = maior distância a partir das fontes, O(V+E);
+- `network-simplex`: minimiza o comprimento total das edges (Gansner et al.),
+  partindo do longest-path.
+"""
+from array import array
+from itertools import accumulate
+from operator import itemgetter
+from typing import Dict, List, Optional, Tuple
+
+from core.compiler.graph import CompiledGraph
+
+RANK_MODES = ('longest-path', 'network-simplex')
+DEFAULT_RANK_MODE = 'longest-path'
+
+_WHITE, _GRAY, _BLACK = 0, 1, 2
+
+
+def find_back_edges(graph: CompiledGraph, start: Optional[int] = None) -> bytearray:
+    """Marca as back-edges (edges que fecham ciclo) via DFS iterativa.
+
+    A DFS começa em `start` (entry.start), depois nas demais fontes e por fim
+    nos nós restantes, na ordem de declaração. Retorna uma máscara por edge.
+    Self-loops também são marcados.
+    """
+    n = graph.num_nodes
+    offsets = graph.next_offsets
+    prev_offsets = graph.prev_offsets
+    out_edges = graph.next_edges
+    dst = graph.edge_dst
+    back = bytearray(graph.num_edges)
+    color = bytearray(n)
+    # Próxima posição no CSR a visitar, por nó
+    cursor = array('i', offsets)
+    roots = [] if start is None else [start]
+    roots.extend(i for i in range(n) if prev_offsets[i] == prev_offsets[i + 1])
+    roots.extend(range(n))
+    for root in roots:
+        if color[root]:
+            continue
+        color[root] = _GRAY
+        stack = [root]
+        while stack:
+            i = stack[-1]
+            pos = cursor[i]
+            if pos == offsets[i + 1]:
+                color[i] = _BLACK
+                stack.pop()
+                continue
+            cursor[i] = pos + 1
+            k = out_edges[pos]
+            j = dst[k]
+            c = color[j]
+            if c == _WHITE:
+                color[j] = _GRAY
+                stack.append(j)
+            elif c == _GRAY:
+                back[k] = 1
+    return back
+
+
+def _acyclic_edges(graph: CompiledGraph, back: bytearray) -> List[Tuple[int, int]]:
+    """Edges (tail, head) com back-edges invertidas e sem self-loops."""
+    src = graph.edge_src
+    dst = graph.edge_dst
+    result = []
+    for k in range(graph.num_edges):
+        u, v = src[k], dst[k]
+        if u == v:
+            continue
+        result.append((v, u) if back[k] else (u, v))
+    return result
+
+
+def rank_longest_path(n: int, edges: List[Tuple[int, int]]) -> array:
+    """Longest-path layering (Kahn): rank[v] = max(rank[u] + 1) sobre as entradas."""
+    offsets, targets = _edge_list_csr(n, edges)
+    return _longest_path_csr(n, offsets, targets)
+
+
+def _edge_list_csr(n: int, edges: List[Tuple[int, int]]):
+    counts = [0] * (n + 1)
+    for u, _ in edges:
+        counts[u + 1] += 1
+    offsets = array('i', accumulate(counts))
+    targets = array('i', [v for _, v in sorted(edges, key=itemgetter(0))])
+    return offsets, targets
+
+
+def _longest_path_csr(n: int, offsets: array, targets: array, floor: Optional[array] = None) -> array:
+    indeg = [0] * n
+    for v in targets:
+        indeg[v] += 1
+    # `floor`: rank mínimo por nó (layout anterior como dica); sem ele, todos partem de 0
+    rank = array('i', floor) if floor is not None else array('i', [0]) * n
+    queue = [i for i in range(n) if indeg[i] == 0]
+    # A lista cresce durante a iteração (fila FIFO sem popleft)
+    for u in queue:
+        r = rank[u] + 1
+        for pos in range(offsets[u], offsets[u + 1]):
+            v = targets[pos]
+            if rank[v] < r:
+                rank[v] = r
+            indeg[v] -= 1
+            if indeg[v] == 0:
+                queue.append(v)
+    return rank
+
+
+def rank_network_simplex(n: int, edges: List[Tuple[int, int]], max_iterations: Optional[int] = None) -> array:
+    """Network simplex (Gansner et al. 1993) com minlen=1 e peso = multiplicidade.
+
+    Minimiza a soma dos comprimentos das edges. Roda por componente fracamente
+    conexa; cada iteração custa O(V+E). `max_iterations` limita os pivôs.
+    """
+    rank = rank_longest_path(n, edges)
+    weights: Dict[Tuple[int, int], int] = {}
+    for e in edges:
+        weights[e] = weights.get(e, 0) + 1
+    simple = list(weights)
+    incident: List[List[int]] = [[] for _ in range(n)]
+    for idx, (u, v) in enumerate(simple):
+        incident[u].append(idx)
+        incident[v].append(idx)
+    seen = bytearray(n)
+    for root in range(n):
+        if seen[root]:
+            continue
+        component = [root]
+        seen[root] = 1
+        pos = 0
+        while pos < len(component):
+            i = component[pos]
+            pos += 1
+            for idx in incident[i]:
+                u, v = simple[idx]
+                j = v if u == i else u
+                if not seen[j]:
+                    seen[j] = 1
+                    component.append(j)
+        if len(component) > 1:
+            _NetworkSimplex(component, simple, weights, incident, rank).run(max_iterations)
+        base = min(rank[i] for i in component)
+        for i in component:
+            rank[i] -= base
+    return rank
+
+
+class _NetworkSimplex:
+    """Estado do network simplex para uma componente conexa."""
+
+    def __init__(self, nodes, edges, weights, incident, rank):
+        self.nodes = nodes
+        self.edges = edges
+        self.weights = weights
+        self.incident = incident
+        self.rank = rank
+        self.in_tree = bytearray(len(edges))
+        self.parent: Dict[int, int] = {}
+        self.parent_edge: Dict[int, int] = {}
+        self.low: Dict[int, int] = {}
+        self.lim: Dict[int, int] = {}
+        self.cut: Dict[int, int] = {}
+        comp = set(nodes)
+        self.comp_edges = sorted({idx for i in nodes for idx in incident[i] if edges[idx][0] in comp})
+
+    def slack(self, idx: int) -> int:
+        u, v = self.edges[idx]
+        return self.rank[v] - self.rank[u] - 1
+
+    def feasible_tree(self):
+        """Árvore geradora de edges justas (slack 0), ajustando ranks quando necessário."""
+        rank = self.rank
+        tree = {self.nodes[0]}
+        total = len(self.nodes)
+        while True:
+            stack = list(tree)
+            while stack:
+                i = stack.pop()
+                for idx in self.incident[i]:
+                    u, v = self.edges[idx]
+                    j = v if u == i else u
+                    if j not in tree and self.slack(idx) == 0:
+                        tree.add(j)
+                        self.in_tree[idx] = 1
+                        stack.append(j)
+            if len(tree) == total:
+                return
+            best = None
+            best_slack = None
+            for idx in self.comp_edges:
+                u, v = self.edges[idx]
+                if (u in tree) != (v in tree):
+                    s = self.slack(idx)
+                    if best_slack is None or s < best_slack:
+                        best, best_slack = idx, s
+            u, v = self.edges[best]
+            # Move a árvore até a edge ficar justa (cauda sobe ou cabeça desce)
+            delta = best_slack if u in tree else -best_slack
+            for i in tree:
+                rank[i] += delta
+
+    def init_low_lim(self):
+        """Numeração pós-ordem (low/lim) e pais da árvore a partir do primeiro nó."""
+        root = self.nodes[0]
+        self.parent = {root: -1}
+        self.parent_edge = {root: -1}
+        counter = 1
+        stack = [(root, iter(self.incident[root]))]
+        low = {root: counter}
+        while stack:
+            i, it = stack[-1]
+            advanced = False
+            for idx in it:
+                if not self.in_tree[idx]:
+                    continue
+                u, v = self.edges[idx]
+                j = v if u == i else u
+                if j in self.parent:
+                    continue
+                self.parent[j] = i
+                self.parent_edge[j] = idx
+                low[j] = counter
+                stack.append((j, iter(self.incident[j])))
+                advanced = True
+                break
+            if not advanced:
+                stack.pop()
+                self.lim[i] = counter
+                counter += 1
+        self.low = low
+
+    def init_cut_values(self):
+        """Cut values das edges da árvore, em pós-ordem (O(E) no total)."""
+        self.cut = {}
+        for child in sorted(self.lim, key=self.lim.__getitem__):
+            par = self.parent[child]
+            if par == -1:
+                continue
+            tree_idx = self.parent_edge[child]
+            child_is_tail = self.edges[tree_idx][0] == child
+            value = self.weights[self.edges[tree_idx]]
+            for idx in self.incident[child]:
+                if idx == tree_idx:
+                    continue
+                u, v = self.edges[idx]
+                is_out = u == child
+                other = v if is_out else u
+                points_to_head = is_out == child_is_tail
+                w = self.weights[self.edges[idx]]
+                value += w if points_to_head else -w
+                if self.in_tree[idx] and self.parent.get(other) == child:
+                    value += -self.cut[idx] if points_to_head else self.cut[idx]
+            self.cut[tree_idx] = value
+
+    def is_descendant(self, i: int, root: int) -> bool:
+        return self.low[root] <= self.lim[i] <= self.lim[root]
+
+    def enter_edge(self, leave: int) -> int:
+        u, v = self.edges[leave]
+        tail, flip = u, False
+        if self.lim[u] > self.lim[v]:
+            tail, flip = v, True
+        best = None
+        best_slack = None
+        for idx in self.comp_edges:
+            a, b = self.edges[idx]
+            if flip == self.is_descendant(a, tail) and flip != self.is_descendant(b, tail):
+                s = self.slack(idx)
+                if best_slack is None or s < best_slack:
+                    best, best_slack = idx, s
+        return best
+
+    def update_ranks(self):
+        """Recalcula ranks em pré-ordem a partir da raiz, seguindo as edges da árvore."""
+        rank = self.rank
+        for child in sorted(self.low, key=lambda i: -self.lim[i]):
+            par = self.parent[child]
+            if par == -1:
+                continue
+            u, _ = self.edges[self.parent_edge[child]]
+            rank[child] = rank[par] + (1 if u == par else -1)
+
+    def run(self, max_iterations: Optional[int]):
+        self.feasible_tree()
+        self.init_low_lim()
+        self.init_cut_values()
+        iterations = 0
+        while max_iterations is None or iterations < max_iterations:
+            leave = next((idx for idx, c in self.cut.items() if c < 0), None)
+            if leave is None:
+                break
+            enter = self.enter_edge(leave)
+            if enter is None:
+                break
+            self.in_tree[leave] = 0
+            self.in_tree[enter] = 1
+            self.init_low_lim()
+            self.init_cut_values()
+            self.update_ranks()
+            iterations += 1
+
+
+def compute_ranks(
+    graph: CompiledGraph,
+    start: Optional[int] = None,
+    mode: str = DEFAULT_RANK_MODE,
+    max_iterations: Optional[int] = None,
+) -> Tuple[array, bytearray]:
+    """Quebra ciclos e calcula ranks para todos os nós.
+
+    Retorna (ranks por índice de nó, máscara de back-edges por edge).
+    """
+    if mode not in RANK_MODES:
+        raise ValueError(f"Modo de ranking inválido: {mode} (use {', '.join(RANK_MODES)})")
+    back = find_back_edges(graph, start)
+    if mode == 'network-simplex':
+        ranks = rank_network_simplex(graph.num_nodes, _acyclic_edges(graph, back), max_iterations)
+    elif any(back):
+        ranks = rank_longest_path(graph.num_nodes, _acyclic_edges(graph, back))
+    else:
+        # Grafo já acíclico: usa o CSR compilado diretamente
+        ranks = _longest_path_csr(graph.num_nodes, graph.next_offsets, graph.next_targets)
+    return ranks, back
+
+
+def compute_ranks_with_floor(
+    graph: CompiledGraph,
+    start: Optional[int],
+    floor: array,
+) -> Tuple[array, bytearray]:
+    """Longest-path em que nenhum nó fica acima de `floor[i]` (rank no layout anterior).
+
+    Nós que já existiam mantêm o rank, a não ser que uma edge os empurre para
+    baixo; nós novos (floor 0) ficam logo abaixo dos predecessores. Usado pelo
+    layout com dica (`generate_layout(..., hint=...)`), independente do modo.
+    """
+    back = find_back_edges(graph, start)
+    if any(back):
+        offsets, targets = _edge_list_csr(graph.num_nodes, _acyclic_edges(graph, back))
+    else:
+        offsets, targets = graph.next_offsets, graph.next_targets
+    return _longest_path_csr(graph.num_nodes, offsets, targets, floor), back
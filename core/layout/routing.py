@@ -0,0 +1,358 @@
+"""
+core/layout/routing.py
+Roteamento ortogonal de edges com desvio de obstáculos.
+
+O grid de posições é dobrado em uma malha: o nó em (x, y) ocupa o ponto
+(2x, 2y) e as linhas ímpares formam os "corredores invisíveis" entre nós.
+Cada edge sai por uma porta fixa (docs/context/architecture.md, seção 6):
+- TB: saída pela base, entrada pelo topo; decision true à direita, false à esquerda;
+- LR: saída pela direita, entrada pela esquerda; decision false pela base (desvio).
+O caminho entre portas é buscado com A* em um grid esparso montado só com as
+coordenadas relevantes da edge (portas e corredores vizinhos), com custo =
+comprimento + curvas + congestionamento. Nós e segmentos já roteados ficam
+em um índice espacial por linha da malha (listas ordenadas + bisect), então
+cada consulta custa O(log n) e o total não cresce quadraticamente com o
+número de edges. Trechos que dividem um corredor são afastados em canais paralelos.
+"""
+import heapq
+import time
+from bisect import bisect_left, bisect_right, insort
+from typing import Dict, List, Optional, Tuple
+
+from core.compiler.graph import CompiledGraph
+
+Point = Tuple[int, int]
+
+BEND_PENALTY = 2
+CONGESTION_PENALTY = 3
+
+# Direções: 0 = +x, 1 = +y, 2 = -x, 3 = -y
+_HORIZONTAL, _VERTICAL = 1, 0
+
+
+class SpatialIndex:
+    """Índice espacial da malha: caixas de nós e segmentos já roteados.
+
+    Tudo é agrupado por linha da malha (coluna x=c ou linha y=c) em listas
+    ordenadas, então as consultas de intervalo usam bisect:
+    - `blocked(a, b)`: o trecho reto a→b passa por algum nó?
+    - `load(a, b)`: quantos segmentos já roteados se sobrepõem ao trecho a→b?
+    """
+
+    __slots__ = ('node_lines', 'nodes', 'seg_lines')
+
+    def __init__(self, centers: List[Point]):
+        self.nodes = set(centers)
+        lines: Dict[Tuple[int, int], List[int]] = {}
+        for x, y in centers:
+            lines.setdefault((_VERTICAL, x), []).append(y)
+            lines.setdefault((_HORIZONTAL, y), []).append(x)
+        for values in lines.values():
+            values.sort()
+        self.node_lines = lines
+        self.seg_lines: Dict[Tuple[int, int], Tuple[List[int], List[int]]] = {}
+
+    @staticmethod
+    def _line(a: Point, b: Point) -> Tuple[Tuple[int, int], int, int]:
+        if a[0] == b[0]:
+            return (_VERTICAL, a[0]), min(a[1], b[1]), max(a[1], b[1])
+        return (_HORIZONTAL, a[1]), min(a[0], b[0]), max(a[0], b[0])
+
+    def blocked(self, a: Point, b: Point) -> bool:
+        line, lo, hi = self._line(a, b)
+        values = self.node_lines.get(line)
+        if not values:
+            return False
+        idx = bisect_left(values, lo)
+        return idx < len(values) and values[idx] <= hi
+
+    def nodes_on(self, a: Point, b: Point) -> int:
+        """Quantos nós estão no trecho reto a→b (pontas incluídas)."""
+        line, lo, hi = self._line(a, b)
+        values = self.node_lines.get(line)
+        if not values:
+            return 0
+        return bisect_right(values, hi) - bisect_left(values, lo)
+
+    def load(self, a: Point, b: Point) -> int:
+        line, lo, hi = self._line(a, b)
+        ends = self.seg_lines.get(line)
+        if ends is None:
+            return 0
+        # Intervalos [l, h] com l < hi e h > lo
+        return bisect_left(ends[0], hi) - bisect_right(ends[1], lo)
+
+    def add_path(self, points: List[Point]):
+        """Registra os trechos retos de um caminho ortogonal."""
+        for a, b in zip(points, points[1:]):
+            line, lo, hi = self._line(a, b)
+            los, his = self.seg_lines.setdefault(line, ([], []))
+            insort(los, lo)
+            insort(his, hi)
+
+
+def _out_port(direction: str, center: Point, branch: Optional[str]) -> Tuple[Point, int]:
+    """(porta de saída, direção de saída) do nó de origem na malha."""
+    x, y = center
+    if direction == 'TB':
+        if branch == 'true':
+            return (x + 1, y), 0
+        if branch == 'false':
+            return (x - 1, y), 2
+        return (x, y + 1), 1
+    if branch == 'false':
+        return (x, y + 1), 1
+    return (x + 1, y), 0
+
+
+def _in_port(direction: str, center: Point) -> Tuple[Point, int]:
+    """(porta de entrada, direção de chegada) do nó de destino na malha."""
+    x, y = center
+    if direction == 'TB':
+        return (x, y - 1), 1
+    return (x - 1, y), 0
+
+
+def _sparse_axis(*values: int) -> List[int]:
+    """Coordenadas do grid esparso: as portas, os corredores ímpares vizinhos e uma borda externa."""
+    coords = set()
+    for v in values:
+        coords.add(v)
+        if v % 2 == 0:
+            coords.update((v - 1, v + 1))
+    low, high = min(coords), max(coords)
+    coords.update((low - 2 if low % 2 else low - 1, high + 2 if high % 2 else high + 1))
+    return sorted(coords)
+
+
+def _astar(index: SpatialIndex, start: Point, start_dir: int, goal: Point, goal_dir: int) -> Optional[List[Point]]:
+    """A* em estados (ponto, direção) sobre o grid esparso da edge.
+
+    Cada movimento vai até a próxima coordenada do grid na direção escolhida;
+    o trecho é descartado se atravessar um nó (consulta ao índice espacial).
+    O custo de cada movimento é consultado uma única vez por busca.
+    """
+    xs = _sparse_axis(start[0], goal[0])
+    ys = _sparse_axis(start[1], goal[1])
+    nx, ny = len(xs), len(ys)
+    gi, gj = xs.index(goal[0]), ys.index(goal[1])
+    si, sj = xs.index(start[0]), ys.index(start[1])
+    gx, gy = goal
+    moves: Dict[Tuple[int, int, int], Optional[int]] = {}
+    best = {(si, sj, start_dir): 0}
+    came: Dict[Tuple[int, int, int], Tuple[int, int, int]] = {}
+    heap = [(abs(start[0] - gx) + abs(start[1] - gy), 0, si, sj, start_dir)]
+    while heap:
+        _, cost, i, j, d = heapq.heappop(heap)
+        state = (i, j, d)
+        if best.get(state, cost) < cost:
+            continue
+        if i == gi and j == gj:
+            path = [(xs[i], ys[j])]
+            while state in came:
+                state = came[state]
+                path.append((xs[state[0]], ys[state[1]]))
+            path.reverse()
+            return path
+        for nd, di, dj in ((0, 1, 0), (1, 0, 1), (2, -1, 0), (3, 0, -1)):
+            if nd == (d + 2) % 4:
+                continue
+            ni, nj = i + di, j + dj
+            if not (0 <= ni < nx and 0 <= nj < ny):
+                continue
+            key = (i, j, nd)
+            move = moves.get(key, -1)
+            if move == -1:
+                a, b = (xs[i], ys[j]), (xs[ni], ys[nj])
+                if b in index.nodes or index.blocked(a, b):
+                    move = None
+                else:
+                    move = abs(b[0] - a[0]) + abs(b[1] - a[1]) + CONGESTION_PENALTY * index.load(a, b)
+                moves[key] = move
+            if move is None:
+                continue
+            new_cost = cost + move
+            if nd != d:
+                new_cost += BEND_PENALTY
+            if ni == gi and nj == gj and nd != goal_dir:
+                new_cost += BEND_PENALTY
+            nstate = (ni, nj, nd)
+            if new_cost < best.get(nstate, float('inf')):
+                best[nstate] = new_cost
+                came[nstate] = state
+                heapq.heappush(heap, (new_cost + abs(xs[ni] - gx) + abs(ys[nj] - gy), new_cost, ni, nj, nd))
+    return None
+
+
+def _corridor_path(start: Point, goal: Point, direction: str) -> List[Point]:
+    """Caminho de reserva só por corredores (linhas ímpares), sempre livre de nós."""
+    (sx, sy), (gx, gy) = start, goal
+    if direction == 'TB':
+        row_s = sy if sy % 2 else sy + 1
+        row_g = gy if gy % 2 else gy - 1
+        col = gx + 1 if gx % 2 == 0 else gx
+        return [start, (sx, row_s), (col, row_s), (col, row_g), (gx, row_g), goal]
+    col_s = sx if sx % 2 else sx + 1
+    col_g = gx if gx % 2 else gx - 1
+    row = gy + 1 if gy % 2 == 0 else gy
+    return [start, (col_s, sy), (col_s, row), (col_g, row), (col_g, gy), goal]
+
+
+def _corners(points: List[Point]) -> List[Point]:
+    """Remove pontos repetidos e colineares, mantendo só extremos e curvas."""
+    result: List[Point] = []
+    for p in points:
+        if result and result[-1] == p:
+            continue
+        if len(result) >= 2:
+            (ax, ay), (bx, by) = result[-2], result[-1]
+            if (ax == bx == p[0]) or (ay == by == p[1]):
+                result[-1] = p
+                continue
+        result.append(p)
+    return result
+
+
+def _reusable(index: SpatialIndex, points: Optional[List[Point]], src: Point, dst: Point) -> bool:
+    """O caminho anterior ainda liga src a dst sem atravessar nenhum outro nó?"""
+    if not points or points[0] != src or points[-1] != dst:
+        return False
+    # Cada trecho só pode tocar os nós das pontas do caminho
+    allowed = [0] * (len(points) - 1)
+    allowed[0] += 1
+    allowed[-1] += 1
+    return all(index.nodes_on(a, b) == n for (a, b), n in zip(zip(points, points[1:]), allowed))
+
+
+def _assign_channels(paths: List[List[Point]]) -> List[List[Tuple[float, float]]]:
+    """Afasta em canais paralelos os trechos que dividem a mesma linha da malha.
+
+    Os trechos retos de cada linha (exceto os que tocam o centro dos nós de
+    origem/destino) são coloridos como um grafo de intervalos: varredura por
+    início com heap de canais livres, O(n log n) e número mínimo de canais.
+    O deslocamento de cada canal é distribuído dentro da metade da célula.
+    """
+    by_line: Dict[Tuple[int, int], List[Tuple[int, int, int, int]]] = {}
+    for p, pts in enumerate(paths):
+        last = len(pts) - 2
+        for r in range(1, last):
+            (x1, y1), (x2, y2) = pts[r], pts[r + 1]
+            if x1 == x2:
+                by_line.setdefault((0, x1), []).append((min(y1, y2), max(y1, y2), p, r))
+            else:
+                by_line.setdefault((1, y1), []).append((min(x1, x2), max(x1, x2), p, r))
+    offsets: Dict[Tuple[int, int], float] = {}
+    for runs in by_line.values():
+        if len(runs) < 2:
+            continue
+        runs.sort()
+        active: List[Tuple[int, int]] = []
+        free: List[int] = []
+        assigned = []
+        count = 0
+        for lo, hi, p, r in runs:
+            while active and active[0][0] <= lo:
+                heapq.heappush(free, heapq.heappop(active)[1])
+            if free:
+                ch = heapq.heappop(free)
+            else:
+                ch = count
+                count += 1
+            heapq.heappush(active, (hi, ch))
+            assigned.append((p, r, ch))
+        if count > 1:
+            for p, r, ch in assigned:
+                offsets[(p, r)] = (ch - (count - 1) / 2) * (0.5 / (count + 1))
+    result = []
+    for p, pts in enumerate(paths):
+        out = [(pts[0][0] / 2, pts[0][1] / 2)]
+        for r in range(1, len(pts) - 1):
+            # Canto entre o trecho r-1 e o trecho r: cada coordenada vem do trecho que a fixa
+            (ax, _), (bx, by) = pts[r - 1], pts[r]
+            before = offsets.get((p, r - 1), 0.0)
+            after = offsets.get((p, r), 0.0)
+            if ax == bx:
+                x, y = bx / 2 + before, by / 2 + after
+            else:
+                x, y = bx / 2 + after, by / 2 + before
+            out.append((round(x, 4), round(y, 4)))
+        out.append((pts[-1][0] / 2, pts[-1][1] / 2))
+        result.append(out)
+    return result
+
+
+def route_edges(
+    graph: CompiledGraph,
+    positions: Dict[str, Tuple[int, int]],
+    direction: str = 'TB',
+    previous: Optional[Dict[Tuple[str, str, Optional[str]], List[Point]]] = None,
+) -> Dict[str, object]:
+    """Roteia todas as edges e devolve routing, bends por edge e tempo total.
+
+    `routing[(from, to)]` é a lista de segmentos ((x1, y1), (x2, y2)) em
+    coordenadas do grid de `positions` (corredores ficam em x.5/y.5).
+    `previous` traz os caminhos na malha de um layout anterior por
+    (from, to, branch) (ver `core.diff.layout_hint`): se as pontas não
+    mudaram e nenhum nó passou a ocupar o caminho, a edge o reaproveita sem
+    A*. Os caminhos reaproveitados entram no índice antes das edges roteadas.
+    """
+    t0 = time.perf_counter()
+    ids = graph.node_ids
+    centers: Dict[int, Point] = {}
+    for i, node_id in enumerate(ids):
+        pos = positions.get(node_id)
+        if pos is not None:
+            centers[i] = (2 * pos[0], 2 * pos[1])
+    index = SpatialIndex(list(centers.values()))
+    keys = []
+    paths: List[List[Point]] = [[] for _ in range(graph.num_edges)]
+    pending = []
+    reused = 0
+    for k in range(graph.num_edges):
+        u, v = graph.edge_src[k], graph.edge_dst[k]
+        keys.append((ids[u], ids[v]))
+        if u not in centers or v not in centers:
+            continue
+        if previous is not None:
+            points = previous.get((ids[u], ids[v], graph.branch_of(k)))
+            if _reusable(index, points, centers[u], centers[v]):
+                index.add_path(points[1:-1])
+                paths[k] = points
+                reused += 1
+                continue
+        pending.append(k)
+    fallbacks = 0
+    for k in pending:
+        u, v = graph.edge_src[k], graph.edge_dst[k]
+        src, dst = centers[u], centers[v]
+        out_port, out_dir = _out_port(direction, src, graph.branch_of(k))
+        in_port, in_dir = _in_port(direction, dst)
+        if out_port == in_port:
+            path = [out_port]
+        else:
+            path = _astar(index, out_port, out_dir, in_port, in_dir)
+            if path is None:
+                fallbacks += 1
+                path = _corridor_path(out_port, in_port, direction)
+        points = _corners([src] + path + [dst])
+        index.add_path(points[1:-1])
+        paths[k] = points
+    routed = _assign_channels([p for p in paths if p])
+    routing: Dict[Tuple[str, str], List] = {}
+    bends: Dict[Tuple[str, str], int] = {}
+    it = iter(routed)
+    for key, points in zip(keys, paths):
+        if not points:
+            routing[key] = []
+            bends[key] = 0
+            continue
+        pts = next(it)
+        routing[key] = list(zip(pts, pts[1:]))
+        bends[key] = max(len(pts) - 2, 0)
+    return {
+        'routing': routing,
+        'bends': bends,
+        'fallbacks': fallbacks,
+        'reused': reused,
+        'time_ms': round((time.perf_counter() - t0) * 1000, 3),
+    }
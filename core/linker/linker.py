@@ -0,0 +1,337 @@
+"""
+core/linker/linker.py
+Composição de fluxos em vários arquivos: nós `subflow` e ligação dos módulos.
+
+Um nó `{"type": "subflow", "subflow": {"file": "pagamento.sff"}}` insere o
+fluxo de outro `.sff` (caminho relativo ao arquivo que o referencia). As
+edges de saída do nó usam como `branch` o end do módulo que continua por
+elas (sem branch quando o módulo tem um único end).
+
+`link_flow` faz, a partir do arquivo raiz:
+1. leitura de cada módulo uma única vez (mesmo que referenciado por vários
+   nós), detectando referências circulares;
+2. compile de cada módulo pelo `FlowCache`, com chave no hash do conteúdo do
+   arquivo do módulo: editar um módulo só recompila esse módulo;
+3. conferência de cada nó subflow contra o `entry` do módulo
+   (`validate_subflow_interface`);
+4. ligação em um documento único para layout e export: os nós do módulo
+   ganham o prefixo `<id do subflow>/`, o start do módulo é o próprio nó
+   subflow e cada end vira o alvo da edge correspondente. O documento ligado
+   e o seu compile ficam no cache com chave nos hashes de todos os módulos.
+
+Com `root`, cada módulo precisa resolver (`os.path.realpath`, seguindo
+links simbólicos) para dentro desse diretório; caminhos absolutos ou com
+`..` que saiam dele viram erro `SFF011` sem que o arquivo seja lido. O
+servidor sempre passa `root`, pois os caminhos vêm do corpo da requisição.
+
+`load_flow` é a entrada comum da CLI, do lote e do servidor: lê, liga
+quando há nós subflow e compila, de modo que os três tratam o mesmo arquivo
+da mesma forma.
+"""
+import hashlib
+import json
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+from core.cache.cache import FlowCache, cache_key, document_hash
+from core.compiler.graph import CompiledGraph, IndexView
+from core.profiler.profiler import annotate, instrumented, phase
+from core.reader.reader import open_sff, read_sff_file
+from core.validator.rules import Issue, error_limit
+from core.validator.validator import validate_subflow_interface
+
+SUBFLOW_TYPE = 'subflow'
+SEPARATOR = '/'
+
+
+def has_subflows(data: Dict[str, Any]) -> bool:
+    """True se o documento tem algum nó `subflow`."""
+    return any(isinstance(node, dict) and node.get('type') == SUBFLOW_TYPE for node in data.get('nodes', {}).values())
+
+
+def subflow_file(node: Dict[str, Any], base_dir: str) -> Optional[str]:
+    """Caminho absoluto do módulo referenciado pelo nó (None sem `subflow.file`)."""
+    ref = node.get('subflow')
+    if not isinstance(ref, dict) or not isinstance(ref.get('file'), str) or not ref['file']:
+        return None
+    return os.path.normpath(os.path.join(base_dir, ref['file']))
+
+
+def _inside(path: str, root_dir: str) -> bool:
+    """True se `path` resolve (seguindo links simbólicos) para dentro de `root_dir`."""
+    real, base = os.path.realpath(path), os.path.realpath(root_dir)
+    return os.path.commonpath([real, base]) == base
+
+
+def _read_module(path: str) -> Tuple[Dict[str, Any], str]:
+    """(documento, SHA-256 do texto do arquivo).
+
+    O hash sai do texto lido, sem serializar o documento de novo como
+    `document_hash`: com vários módulos grandes, a releitura de todos a cada
+    chamada é o custo dominante quando nada mudou.
+    """
+    try:
+        with open_sff(path) as f:
+            text = f.read()
+        data = json.loads(text)
+    except Exception as e:
+        raise RuntimeError(f"Erro ao ler arquivo {path}: {e}")
+    return data, hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def _load_modules(
+    root: str,
+    root_data: Optional[Dict[str, Any]] = None,
+    root_dir: Optional[str] = None,
+) -> Tuple[Dict[str, Dict[str, Any]], List[Issue]]:
+    """Lê o módulo raiz e os referenciados (DFS); retorna os módulos e os erros de referência.
+
+    Cada módulo: `data`, `hash` e `refs` (id do nó subflow → caminho do módulo).
+    Com `root_data`, a raiz é esse documento (hash pelo `document_hash`) e o
+    arquivo `root` não é lido. Com `root_dir`, módulos fora dele são recusados.
+    """
+    modules: Dict[str, Dict[str, Any]] = {}
+    errors: List[Issue] = []
+
+    def visit(path: str, stack: List[str]):
+        if path == root and root_data is not None:
+            data, content_hash = root_data, document_hash(root_data)
+        else:
+            data, content_hash = _read_module(path)
+        module = {'data': data, 'hash': content_hash, 'refs': {}}
+        modules[path] = module
+        base_dir = os.path.dirname(path)
+        for node_id, node in data.get('nodes', {}).items():
+            if not isinstance(node, dict) or node.get('type') != SUBFLOW_TYPE:
+                continue
+            ref = subflow_file(node, base_dir)
+            if ref is None:
+                # validate_sff_logic já aponta a referência ausente
+                continue
+            where = _relative(path, root)
+            if root_dir is not None and not _inside(ref, root_dir):
+                errors.append(Issue(f"{where}: Subflow '{node_id}': arquivo '{node['subflow']['file']}' fora do diretório raiz.",
+                                    'SFF011', node_id))
+                continue
+            if ref in stack or ref == path:
+                chain = ' → '.join(_relative(p, root) for p in stack + [path, ref])
+                errors.append(Issue(f"{where}: Subflow '{node_id}': referência circular ({chain}).", 'SFF011', node_id))
+                continue
+            if ref not in modules:
+                try:
+                    visit(ref, stack + [path])
+                except RuntimeError as e:
+                    errors.append(Issue(f"{where}: Subflow '{node_id}': {e}", 'SFF011', node_id))
+                    continue
+            module['refs'][node_id] = ref
+
+    visit(root, [])
+    return modules, errors
+
+
+def _relative(path: str, root: str) -> str:
+    return os.path.relpath(path, os.path.dirname(root))
+
+
+def _link_hash(root: str, modules: Dict[str, Dict[str, Any]], errors: List[Issue]) -> str:
+    """Hash do fluxo ligado: hashes dos módulos na ordem da DFS a partir da raiz.
+
+    Os erros de referência entram no hash: um módulo recusado ou ilegível
+    não é lido, e o mesmo conjunto de módulos não pode reaproveitar o compile
+    de uma chamada com outros erros.
+    """
+    digest = hashlib.sha256(b'link')
+    for path in modules:
+        digest.update(modules[path]['hash'].encode('ascii'))
+    for err in errors:
+        digest.update(str(err).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def _emit(
+    modules: Dict[str, Dict[str, Any]],
+    path: str,
+    prefix: str,
+    rename: Dict[str, str],
+    lane: Optional[str],
+    root_lanes: Dict[str, Any],
+    nodes: Dict[str, Any],
+    edges: List[Dict[str, Any]],
+    errors: List[Issue],
+):
+    """Copia o módulo `path` para `nodes`/`edges` com ids já ligados.
+
+    `rename` leva o start e os ends do módulo aos ids finais (o nó subflow e
+    os alvos das suas edges); os outros ids ganham `prefix`. Na raiz os dois
+    são vazios e nós/edges entram sem cópia. Lanes que não existem na raiz
+    passam a ser a `lane` do nó subflow.
+    """
+    module = modules[path]
+    data = module['data']
+    refs = module['refs']
+
+    get = rename.get
+
+    def final(node_id: str) -> str:
+        return get(node_id) or prefix + node_id
+
+    # Edges de saída dos nós subflow viram as edges que chegam aos ends do módulo
+    exits: Dict[str, Dict[Optional[str], str]] = {node_id: {} for node_id in refs}
+    for edge in data.get('edges', []):
+        src = edge['from']
+        exit_map = exits.get(src) if exits else None
+        if exit_map is not None:
+            exit_map[edge.get('branch')] = edge['to']
+        elif prefix:
+            dst = edge['to']
+            edge = dict(edge)
+            edge['from'] = get(src) or prefix + src
+            edge['to'] = get(dst) or prefix + dst
+            edges.append(edge)
+        else:
+            edges.append(edge)
+    for node_id, node in data.get('nodes', {}).items():
+        if node_id in rename:
+            continue
+        linked_id = prefix + node_id
+        if linked_id in nodes:
+            errors.append(Issue(f"Id duplicado após a ligação dos módulos: '{linked_id}'.", 'SFF012', linked_id))
+            continue
+        if lane is not None and node.get('lane') not in root_lanes:
+            node = dict(node)
+            node['lane'] = lane
+        branches = node.get('branches')
+        if prefix and isinstance(branches, dict):
+            node = dict(node, branches={
+                key: dict(branch, next=final(branch['next'])) if isinstance(branch, dict) and 'next' in branch else branch
+                for key, branch in branches.items()
+            })
+        nodes[linked_id] = node
+        ref = refs.get(node_id)
+        if ref is not None:
+            entry = modules[ref]['data']['entry']
+            targets = exits[node_id]
+            if None in targets:
+                targets = {entry['ends'][0]: targets[None]}
+            child_rename = {end: final(targets[end]) for end in entry['ends']}
+            child_rename[entry['start']] = linked_id
+            _emit(modules, ref, linked_id + SEPARATOR, child_rename, node.get('lane'), root_lanes, nodes, edges, errors)
+
+
+def _link(modules: Dict[str, Dict[str, Any]], root: str) -> Tuple[Dict[str, Any], List[Issue]]:
+    """Documento único a partir dos módulos (contratos já conferidos) e erros de ids duplicados."""
+    root_data = modules[root]['data']
+    nodes: Dict[str, Any] = {}
+    edges: List[Dict[str, Any]] = []
+    errors: List[Issue] = []
+    _emit(modules, root, '', {}, None, root_data.get('lanes', {}), nodes, edges, errors)
+    return dict(root_data, nodes=nodes, edges=edges), errors
+
+
+@instrumented()
+def link_flow(
+    filepath: str,
+    cache: Optional[FlowCache] = None,
+    data: Optional[Dict[str, Any]] = None,
+    root: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Lê, compila (por módulo) e liga o fluxo de `filepath` e dos módulos referenciados.
+
+    `data` é o documento raiz já lido (ex.: corpo de uma requisição ao
+    servidor); os módulos continuam relativos ao diretório de `filepath`.
+    Com `root`, módulos que resolvem para fora desse diretório são recusados
+    (`SFF011`).
+
+    Retorna `data` (documento ligado), `hash` (chave do fluxo ligado, aceita
+    como `doc_hash` por `FlowCache.compile_and_layout`), `compiled` e `modules`
+    (`file`, `hash`, `nodes`, `compiled`: se foi compilado nesta chamada).
+    Erros de validação de qualquer módulo aparecem em
+    `compiled['validation']['errors']` (`Issue`), prefixados pelo arquivo do
+    módulo; referências circulares ou ilegíveis usam o código `SFF011` e ids
+    duplicados após a ligação, `SFF012`. Com erros, o documento ligado é o
+    próprio módulo raiz.
+    Só o compile do fluxo ligado vai para o cache: o documento ligado é
+    remontado dos módulos a cada chamada, o que custa menos que ler o pickle.
+    """
+    cache = cache if cache is not None else FlowCache()
+    root_dir = root
+    root = os.path.normpath(os.path.abspath(filepath))
+    with phase('load_modules') as span:
+        modules, errors = _load_modules(root, data, root_dir)
+        span.set(modules=len(modules))
+    link_hash = _link_hash(root, modules, errors)
+    report = [{'file': _relative(path, root), 'hash': m['hash'], 'nodes': len(m['data'].get('nodes', {})), 'compiled': False}
+              for path, m in modules.items()]
+    root_data = modules[root]['data']
+    compile_key = cache_key(link_hash, 'compile')
+    with phase('cache_lookup', cat='cache', stage='link') as span:
+        compiled = cache.get(compile_key)
+        span.set(hit=compiled is not None)
+    if compiled is not None:
+        if compiled['validation']['errors']:
+            return {'data': root_data, 'hash': link_hash, 'compiled': compiled, 'modules': report}
+        with phase('link'):
+            linked, _ = _link(modules, root)
+        return {'data': linked, 'hash': link_hash, 'compiled': compiled, 'modules': report}
+    # Compile por módulo: cada um com a chave do seu próprio conteúdo
+    for item, (path, module) in zip(report, modules.items()):
+        misses = cache.misses
+        module['compiled'] = cache.compile(module['data'], module['hash'])
+        item['compiled'] = cache.misses > misses
+        where = '' if path == root else f"{item['file']}: "
+        errors.extend(err.prefixed(where) for err in module['compiled']['validation']['errors'])
+    with phase('subflow_interface'):
+        for path, module in modules.items():
+            where = '' if path == root else f"{_relative(path, root)}: "
+            for node_id, ref in module['refs'].items():
+                found = validate_subflow_interface(module['compiled']['graph'], node_id, modules[ref]['data'].get('entry', {}))
+                errors.extend(err.prefixed(where) for err in found)
+    warnings = modules[root]['compiled']['validation']['warnings']
+    linked = root_data
+    if not errors:
+        with phase('link') as span:
+            linked, errors = _link(modules, root)
+            graph = CompiledGraph(linked)
+            span.set(nodes=graph.num_nodes, edges=graph.num_edges)
+        annotate(nodes=graph.num_nodes, edges=graph.num_edges, modules=len(modules))
+    if errors:
+        compiled = dict(modules[root]['compiled'], validation={'errors': errors, 'warnings': warnings})
+        linked = root_data
+    else:
+        # Módulos válidos e contratos conferidos: o grafo ligado dispensa nova validação
+        compiled = {'graph': graph, 'index': IndexView(graph), 'validation': {'errors': [], 'warnings': warnings}}
+    cache.put(compile_key, compiled)
+    return {'data': linked, 'hash': link_hash, 'compiled': compiled, 'modules': report}
+
+
+def load_flow(
+    filepath: str,
+    cache: FlowCache,
+    data: Optional[Dict[str, Any]] = None,
+    max_errors: Optional[int] = None,
+    fail_fast: bool = False,
+    root: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Leitura + ligação + compile de um fluxo, igual para CLI, lote e servidor.
+
+    `data` evita reler `filepath` quando o documento já foi lido (ex.: para a
+    validação estrutural). Retorna `data` (documento ligado, ou o próprio
+    documento sem subflow), `hash` (para `FlowCache.compile_and_layout`),
+    `compiled` e `modules` (None sem subflow). Fluxos ligados validam os
+    módulos por inteiro; o limite de erros é aplicado à lista resultante,
+    com `validation['limited']`. `root` restringe os módulos a um diretório
+    (ver `link_flow`).
+    """
+    limit = error_limit(max_errors, fail_fast)
+    if data is None:
+        data = read_sff_file(filepath)
+    if not has_subflows(data):
+        doc_hash = document_hash(data)
+        compiled = cache.compile(data, doc_hash, max_errors, fail_fast)
+        return {'data': data, 'hash': doc_hash, 'compiled': compiled, 'modules': None}
+    linked = link_flow(filepath, cache, data, root)
+    validation = linked['compiled']['validation']
+    if limit is not None and len(validation['errors']) > limit:
+        validation = dict(validation, errors=validation['errors'][:limit], limited=True)
+        linked['compiled'] = dict(linked['compiled'], validation=validation)
+    return linked
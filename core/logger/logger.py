@@ -1,21 +1,215 @@
 """
 core/logger/logger.py
-Logger simples para persistência de logs em arquivo.
+Logger com fila e escrita em background para persistência de logs em arquivo.
+
+`log()` só formata a linha e a coloca em uma fila; uma thread por arquivo
+escreve as linhas em lotes com um único `os.write` em um descritor aberto com
+O_APPEND (escritas concorrentes de vários processos não se intercalam no meio
+de uma linha). O diretório só é criado na primeira escrita.
+
+Rotação opcional por tamanho (`max_bytes`) e/ou por tempo (`rotate_interval`,
+em segundos): feita sob um lock de arquivo (`<log>.lock`, fcntl) e conferida
+de novo dentro do lock, para que só um processo renomeie os arquivos.
 """
+import atexit
 import os
-from datetime import datetime
+import queue
+import sys
+import threading
+import time
+from typing import Dict, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: rotação sem lock entre processos
+    fcntl = None
 
 LOG_PATH = os.path.join(os.path.dirname(__file__), '../../logs/layout_engine.log')
 
+LEVELS = {'DEBUG': 10, 'INFO': 20, 'WARN': 30, 'ERROR': 40}
+DEFAULT_LEVEL = os.environ.get('SFF_LOG_LEVEL', 'INFO').upper()
+DEFAULT_MAX_BYTES = 10 * 1024 * 1024
+DEFAULT_BACKUP_COUNT = 5
+FLUSH_INTERVAL = 0.2
+MAX_BATCH = 1024
+
+_STOP = None
+
+
+class _Writer:
+    """Thread de escrita de um arquivo de log (uma por caminho e por processo)."""
+
+    def __init__(self, path: str, max_bytes: int, backup_count: int, rotate_interval: Optional[float]):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.rotate_interval = rotate_interval
+        self.pid = os.getpid()
+        self.queue: 'queue.Queue[Optional[str]]' = queue.Queue()
+        self.fd: Optional[int] = None
+        self.failed = False
+        self.thread = threading.Thread(target=self._run, name='sff-logger', daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        while True:
+            first = self.queue.get()
+            batch: List[str] = []
+            stop = first is _STOP
+            if not stop:
+                batch.append(first)
+            # Junta o que chegar em até FLUSH_INTERVAL para um único write
+            deadline = time.monotonic() + FLUSH_INTERVAL
+            while not stop and len(batch) < MAX_BATCH:
+                timeout = deadline - time.monotonic()
+                try:
+                    item = self.queue.get(timeout=timeout) if timeout > 0 else self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                else:
+                    batch.append(item)
+            if batch:
+                self._write(''.join(batch).encode('utf-8'))
+            for _ in range(len(batch) + (1 if stop else 0)):
+                self.queue.task_done()
+            if stop:
+                self._close()
+                return
+
+    def _open(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+
+    def _close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+    def _write(self, payload: bytes):
+        try:
+            if self.fd is None:
+                self._open()
+            else:
+                self._reopen_if_rotated()
+            if self._should_rotate(len(payload)):
+                self._rotate(len(payload))
+            os.write(self.fd, payload)
+        except OSError as e:
+            if not self.failed:
+                self.failed = True
+                print(f"Logger: falha ao escrever em {self.path}: {e}", file=sys.stderr)
+
+    def _reopen_if_rotated(self):
+        """Outro processo pode ter rotacionado o arquivo: reabre se o inode mudou."""
+        try:
+            current = os.stat(self.path).st_ino
+        except FileNotFoundError:
+            current = None
+        if current != os.fstat(self.fd).st_ino:
+            self._close()
+            self._open()
+
+    def _should_rotate(self, incoming: int) -> bool:
+        if not self.max_bytes and not self.rotate_interval:
+            return False
+        st = os.fstat(self.fd)
+        if not st.st_size:
+            return False
+        if self.max_bytes and st.st_size + incoming > self.max_bytes:
+            return True
+        if self.rotate_interval:
+            # Última escrita em um período anterior (ex.: dia anterior)
+            return int(st.st_mtime // self.rotate_interval) < int(time.time() // self.rotate_interval)
+        return False
+
+    def _rotate(self, incoming: int):
+        lock_fd = os.open(self.path + '.lock', os.O_WRONLY | os.O_CREAT, 0o644)
+        try:
+            if fcntl is not None:
+                fcntl.flock(lock_fd, fcntl.LOCK_EX)
+            # Dentro do lock: outro processo pode já ter rotacionado
+            self._reopen_if_rotated()
+            if not self._should_rotate(incoming):
+                return
+            if self.backup_count:
+                for i in range(self.backup_count - 1, 0, -1):
+                    src = f'{self.path}.{i}'
+                    if os.path.exists(src):
+                        os.replace(src, f'{self.path}.{i + 1}')
+                os.replace(self.path, f'{self.path}.1')
+            else:
+                os.truncate(self.path, 0)
+            self._close()
+            self._open()
+        finally:
+            os.close(lock_fd)
+
+    def stop(self):
+        if self.thread.is_alive():
+            self.queue.put(_STOP)
+            self.thread.join()
+
+
+_writers: Dict[str, _Writer] = {}
+_writers_lock = threading.Lock()
+
+
+def _get_writer(path: str, max_bytes: int, backup_count: int, rotate_interval: Optional[float]) -> _Writer:
+    writer = _writers.get(path)
+    # Após fork a thread do pai não existe no filho: cria outra
+    if writer is None or writer.pid != os.getpid():
+        with _writers_lock:
+            writer = _writers.get(path)
+            if writer is None or writer.pid != os.getpid():
+                writer = _Writer(path, max_bytes, backup_count, rotate_interval)
+                _writers[path] = writer
+    return writer
+
+
+def shutdown():
+    """Esvazia as filas e encerra as threads de escrita deste processo."""
+    for writer in list(_writers.values()):
+        if writer.pid == os.getpid():
+            writer.stop()
+    _writers.clear()
+
+
+atexit.register(shutdown)
+
+
 class Logger:
-    def __init__(self, log_path: str = LOG_PATH):
+    def __init__(
+        self,
+        log_path: str = LOG_PATH,
+        level: str = DEFAULT_LEVEL,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        backup_count: int = DEFAULT_BACKUP_COUNT,
+        rotate_interval: Optional[float] = None,
+    ):
         self.log_path = os.path.abspath(log_path)
-        os.makedirs(os.path.dirname(self.log_path), exist_ok=True)
+        self.level = LEVELS.get(level.upper(), LEVELS['INFO'])
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.rotate_interval = rotate_interval
 
     def log(self, level: str, message: str):
-        now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        with open(self.log_path, 'a', encoding='utf-8') as f:
-            f.write(f"{now} | {level.upper():5} | {message}\n")
+        level = level.upper()
+        if LEVELS.get(level, LEVELS['ERROR']) < self.level:
+            return
+        now = time.strftime('%Y-%m-%d %H:%M:%S')
+        writer = _get_writer(self.log_path, self.max_bytes, self.backup_count, self.rotate_interval)
+        writer.queue.put(f"{now} | {level:5} | {message}\n")
+
+    def flush(self):
+        """Bloqueia até todas as linhas já enfileiradas estarem no arquivo."""
+        writer = _writers.get(self.log_path)
+        if writer is not None and writer.pid == os.getpid():
+            writer.queue.join()
+
+    def debug(self, message: str):
+        self.log('DEBUG', message)
 
     def info(self, message: str):
         self.log('INFO', message)
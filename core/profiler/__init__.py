@@ -0,0 +1 @@
+# __init__.py para tornar o diretório profiler um pacote Python
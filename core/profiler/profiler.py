@@ -0,0 +1,250 @@
+"""
+core/profiler/profiler.py
+Instrumentação por fase do pipeline SFF (leitura, validação, compilação, layout, export).
+
+Os pontos instrumentados usam `with phase('nome', **attrs) as span:` ou o
+decorador `@instrumented()`. Sem `Profiler` ativo nem hooks registrados,
+`phase` devolve um objeto vazio compartilhado e o decorador chama a função
+direto: uma checagem de flag por chamada, nada é medido.
+
+Com instrumentação ligada, cada fase gera um registro com:
+- `wall_ms` (perf_counter) e `cpu_ms` (process_time);
+- `alloc_blocks`: variação líquida de blocos alocados (`sys.getallocatedblocks`);
+- `attrs`: atributos da fase (ex.: `nodes`/`edges` do grafo, formato do export);
+- `parent`/`depth`: aninhamento por thread.
+Os registros vão para os `Profiler` ativos e para os hooks (`add_hook`).
+`Profiler.write` grava JSON estruturado (`json`) ou trace-event do Chrome
+(`chrome`, abrir em chrome://tracing ou https://ui.perfetto.dev).
+"""
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+TRACE_FORMATS = ('json', 'chrome')
+TRACE_VERSION = 1
+
+Hook = Callable[[Dict[str, Any]], None]
+
+_hooks: List[Hook] = []
+_profilers: List['Profiler'] = []
+_enabled = False
+_local = threading.local()
+
+
+def _refresh():
+    global _enabled
+    _enabled = bool(_hooks or _profilers)
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def add_hook(hook: Hook):
+    """Registra `hook(registro)`, chamado ao fim de cada fase (liga a instrumentação)."""
+    _hooks.append(hook)
+    _refresh()
+
+
+def remove_hook(hook: Hook):
+    if hook in _hooks:
+        _hooks.remove(hook)
+    _refresh()
+
+
+def _stack() -> List['Span']:
+    stack = getattr(_local, 'stack', None)
+    if stack is None:
+        stack = _local.stack = []
+    return stack
+
+
+class _NoopSpan:
+    """Fase desligada: mesmo protocolo de `Span`, sem custo."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+class Span:
+    """Fase em andamento (use via `phase`)."""
+
+    __slots__ = ('name', 'cat', 'attrs', 'parent', 'depth', '_start', '_cpu', '_blocks')
+
+    def __init__(self, name: str, cat: str, attrs: Dict[str, Any]):
+        self.name = name
+        self.cat = cat
+        self.attrs = attrs
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def __enter__(self) -> 'Span':
+        stack = _stack()
+        self.parent = stack[-1].name if stack else None
+        self.depth = len(stack)
+        stack.append(self)
+        self._blocks = sys.getallocatedblocks()
+        self._cpu = time.process_time_ns()
+        self._start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter_ns()
+        cpu = time.process_time_ns() - self._cpu
+        blocks = sys.getallocatedblocks() - self._blocks
+        stack = _stack()
+        if stack and stack[-1] is self:
+            stack.pop()
+        record = {
+            'name': self.name,
+            'cat': self.cat,
+            'start_ns': self._start,
+            'wall_ms': (end - self._start) / 1e6,
+            'cpu_ms': cpu / 1e6,
+            'alloc_blocks': blocks,
+            'parent': self.parent,
+            'depth': self.depth,
+            'thread': threading.get_ident(),
+            'attrs': self.attrs,
+        }
+        if exc_type is not None:
+            record['error'] = exc_type.__name__
+        for profiler in _profilers:
+            profiler.spans.append(record)
+        for hook in _hooks:
+            hook(record)
+        return False
+
+
+def phase(name: str, cat: str = 'phase', **attrs):
+    """Contexto de uma fase; `cat` agrupa no trace (`phase`, `rule`, `cache`, ...)."""
+    if not _enabled:
+        return _NOOP
+    return Span(name, cat, attrs)
+
+
+def instrumented(name: Optional[str] = None, cat: str = 'phase'):
+    """Decorador: a chamada inteira vira uma fase (só uma checagem de flag quando desligado)."""
+    def decorator(func):
+        label = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with Span(label, cat, {}):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def annotate(**attrs):
+    """Acrescenta atributos à fase corrente desta thread (se houver instrumentação)."""
+    if _enabled:
+        stack = _stack()
+        if stack:
+            stack[-1].attrs.update(attrs)
+
+
+class Profiler:
+    """Coleta as fases registradas enquanto está ativo (`start`/`stop` ou `with`)."""
+
+    def __init__(self):
+        self.spans: List[Dict[str, Any]] = []
+        self.origin = time.perf_counter_ns()
+
+    def start(self) -> 'Profiler':
+        if self not in _profilers:
+            _profilers.append(self)
+            _refresh()
+        return self
+
+    def stop(self):
+        if self in _profilers:
+            _profilers.remove(self)
+            _refresh()
+
+    def __enter__(self) -> 'Profiler':
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
+
+    def summary(self) -> List[Dict[str, Any]]:
+        """Totais por (categoria, nome), na ordem da primeira ocorrência."""
+        totals: Dict[tuple, Dict[str, Any]] = {}
+        for span in self.spans:
+            key = (span['cat'], span['name'])
+            entry = totals.get(key)
+            if entry is None:
+                entry = totals[key] = {'cat': span['cat'], 'name': span['name'], 'count': 0,
+                                       'wall_ms': 0.0, 'cpu_ms': 0.0, 'alloc_blocks': 0, 'first': span['start_ns']}
+            entry['count'] += 1
+            entry['wall_ms'] += span['wall_ms']
+            entry['cpu_ms'] += span['cpu_ms']
+            entry['alloc_blocks'] += span['alloc_blocks']
+        result = sorted(totals.values(), key=lambda e: e['first'])
+        for entry in result:
+            del entry['first']
+            entry['wall_ms'] = round(entry['wall_ms'], 3)
+            entry['cpu_ms'] = round(entry['cpu_ms'], 3)
+        return result
+
+    def to_json(self) -> Dict[str, Any]:
+        spans = []
+        for span in sorted(self.spans, key=lambda s: s['start_ns']):
+            item = {k: v for k, v in span.items() if k != 'start_ns'}
+            item['start_ms'] = round((span['start_ns'] - self.origin) / 1e6, 3)
+            item['wall_ms'] = round(span['wall_ms'], 3)
+            item['cpu_ms'] = round(span['cpu_ms'], 3)
+            spans.append(item)
+        return {'version': TRACE_VERSION, 'pid': os.getpid(), 'spans': spans, 'summary': self.summary()}
+
+    def to_chrome_trace(self) -> Dict[str, Any]:
+        """Eventos completos (`ph: X`) em microssegundos, formato Trace Event do Chrome."""
+        pid = os.getpid()
+        events = []
+        for span in sorted(self.spans, key=lambda s: s['start_ns']):
+            args = dict(span['attrs'], cpu_ms=round(span['cpu_ms'], 3), alloc_blocks=span['alloc_blocks'])
+            if 'error' in span:
+                args['error'] = span['error']
+            events.append({
+                'name': span['name'], 'cat': span['cat'], 'ph': 'X', 'pid': pid, 'tid': span['thread'],
+                'ts': round((span['start_ns'] - self.origin) / 1000, 3), 'dur': round(span['wall_ms'] * 1000, 3),
+                'args': args,
+            })
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def write(self, path: str, fmt: Optional[str] = None):
+        """Grava o trace; sem `fmt`, `*.trace.json` vira trace do Chrome e o resto JSON."""
+        fmt = fmt or ('chrome' if path.endswith('.trace.json') else 'json')
+        if fmt not in TRACE_FORMATS:
+            raise ValueError(f"Formato de profile inválido: {fmt} (use {', '.join(TRACE_FORMATS)})")
+        obj = self.to_chrome_trace() if fmt == 'chrome' else self.to_json()
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(obj, f, ensure_ascii=False, indent=1, default=str)
+
+    def format_summary(self) -> str:
+        lines = [f"{'fase':<32} {'n':>4} {'parede ms':>11} {'CPU ms':>10} {'blocos':>10}"]
+        for entry in self.summary():
+            name = entry['name'] if entry['cat'] == 'phase' else f"{entry['cat']}:{entry['name']}"
+            lines.append(f"{name:<32} {entry['count']:>4} {entry['wall_ms']:>11.3f} "
+                         f"{entry['cpu_ms']:>10.3f} {entry['alloc_blocks']:>10}")
+        return '\n'.join(lines)
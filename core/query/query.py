@@ -0,0 +1,445 @@
+"""
+core/query/query.py
+Índice de consultas sobre o grafo compilado: alcançabilidade, dominadores e controle.
+
+Montado uma vez a partir da IR (`CompiledGraph`), responde sem nova busca:
+- `reaches(a, b)`: os ciclos são condensados em componentes fortes (Tarjan) e
+  o fecho transitivo do DAG resultante fica em:
+  - `bitset`: uma linha de bits por componente, consulta O(1); usado (em
+    `auto`) até `BITSET_MAX_COMPONENTS`, memória C²/8 bytes;
+  - `intervals`: rotulação por intervalos sobre uma árvore geradora do DAG
+    (generalização da decomposição em cadeias), consulta O(log k) por
+    busca binária nos k intervalos do nó. Em fluxos (cadeias com desvios
+    curtos) k fica pequeno, enquanto rótulos por cadeia cresceriam com o
+    número de desvios;
+- `dominates`/`dominators`: árvore de dominadores a partir de `entry.start`
+  (Lengauer-Tarjan), com numeração de entrada/saída: "a domina b" é O(1);
+- `post_dominates`/`post_dominators`: o mesmo no grafo reverso, a partir de
+  uma saída virtual ligada a todos os `entry.ends`;
+- `controlled_by`: dependência de controle (quais decisions, e por qual
+  branch, decidem se o nó executa), pré-calculada pela árvore de pós-dominadores.
+"""
+import time
+from array import array
+from bisect import bisect_right
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from core.compiler.graph import CompiledGraph, _csr
+from core.profiler.profiler import annotate, instrumented, phase
+
+QUERY_METHODS = ('auto', 'bitset', 'intervals')
+BITSET_MAX_COMPONENTS = 2048
+
+NONE = -1
+
+
+def _strongly_connected(n: int, offsets: Sequence[int], targets: Sequence[int]) -> Tuple[array, int]:
+    """Tarjan iterativo: componente de cada nó, numeradas em ordem topológica reversa (sorvedouros primeiro)."""
+    index = array('i', [NONE]) * n
+    low = array('i', [0]) * n
+    comp = array('i', [NONE]) * n
+    on_stack = bytearray(n)
+    stack: List[int] = []
+    counter = 0
+    num_comps = 0
+    for root in range(n):
+        if index[root] != NONE:
+            continue
+        work = [(root, offsets[root])]
+        index[root] = low[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack[root] = 1
+        while work:
+            v, k = work[-1]
+            end = offsets[v + 1]
+            while k < end:
+                w = targets[k]
+                k += 1
+                if index[w] == NONE:
+                    work[-1] = (v, k)
+                    index[w] = low[w] = counter
+                    counter += 1
+                    stack.append(w)
+                    on_stack[w] = 1
+                    work.append((w, offsets[w]))
+                    break
+                if on_stack[w] and index[w] < low[v]:
+                    low[v] = index[w]
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    if low[v] < low[parent]:
+                        low[parent] = low[v]
+                if low[v] == index[v]:
+                    while True:
+                        w = stack.pop()
+                        on_stack[w] = 0
+                        comp[w] = num_comps
+                        if w == v:
+                            break
+                    num_comps += 1
+    return comp, num_comps
+
+
+def _condense(graph: CompiledGraph, comp: array, num_comps: int) -> List[List[int]]:
+    """Sucessores (sem repetição) de cada componente no DAG condensado."""
+    succ: List[List[int]] = [[] for _ in range(num_comps)]
+    seen = set()
+    for s, d in zip(graph.edge_src, graph.edge_dst):
+        cs, cd = comp[s], comp[d]
+        if cs != cd and (cs, cd) not in seen:
+            seen.add((cs, cd))
+            succ[cs].append(cd)
+    return succ
+
+
+def _bitset_closure(succ: List[List[int]]) -> Tuple[bytearray, int]:
+    """Fecho transitivo como matriz de bits (linha por componente, little-endian)."""
+    num = len(succ)
+    row_bytes = (num + 7) // 8
+    table = bytearray(num * row_bytes)
+    rows: List[int] = [0] * num
+    # Sucessores têm número menor (Tarjan): já estão prontos
+    for c in range(num):
+        bits = 1 << c
+        for s in succ[c]:
+            bits |= rows[s]
+        rows[c] = bits
+        table[c * row_bytes:(c + 1) * row_bytes] = bits.to_bytes(row_bytes, 'little')
+    return table, row_bytes
+
+
+def _interval_labels(succ: List[List[int]]) -> Tuple[array, array, array, array]:
+    """Rótulos por intervalos (Agrawal-Borgida-Jagadish) sobre uma floresta DFS do DAG.
+
+    Retorna (post, offsets, lo, hi): `post[c]` é o número pós-ordem da
+    componente; os intervalos de `c` são `lo[k]..hi[k]` para k em
+    `offsets[c]:offsets[c + 1]`, ordenados e disjuntos. `c` alcança `d` sse
+    `post[d]` cai em um deles.
+    """
+    num = len(succ)
+    has_pred = bytearray(num)
+    for c in range(num):
+        for s in succ[c]:
+            has_pred[s] = 1
+    post = array('i', [NONE]) * num
+    low = array('i', [0]) * num
+    order: List[int] = []
+    visited = bytearray(num)
+    # Raízes: fontes primeiro (número maior = mais perto do início na ordem topológica)
+    roots = [c for c in range(num - 1, -1, -1) if not has_pred[c]]
+    roots += [c for c in range(num - 1, -1, -1) if has_pred[c]]
+    counter = 0
+    for root in roots:
+        if visited[root]:
+            continue
+        visited[root] = 1
+        work = [(root, 0, counter)]
+        while work:
+            c, k, first = work[-1]
+            children = succ[c]
+            while k < len(children) and visited[children[k]]:
+                k += 1
+            if k < len(children):
+                child = children[k]
+                visited[child] = 1
+                work[-1] = (c, k + 1, first)
+                work.append((child, 0, counter))
+                continue
+            work.pop()
+            post[c] = counter
+            low[c] = first
+            counter += 1
+            order.append(c)
+    labels: List[List[Tuple[int, int]]] = [[] for _ in range(num)]
+    # Pós-ordem: todos os sucessores de c já têm rótulo
+    for c in order:
+        intervals = [(low[c], post[c])]
+        for s in succ[c]:
+            intervals.extend(labels[s])
+        intervals.sort()
+        merged = [intervals[0]]
+        for a, b in intervals[1:]:
+            last_a, last_b = merged[-1]
+            if a <= last_b + 1:
+                if b > last_b:
+                    merged[-1] = (last_a, b)
+            else:
+                merged.append((a, b))
+        labels[c] = merged
+    offsets = array('i', [0])
+    lo = array('i')
+    hi = array('i')
+    for c in range(num):
+        for a, b in labels[c]:
+            lo.append(a)
+            hi.append(b)
+        offsets.append(len(lo))
+    return post, offsets, lo, hi
+
+
+def _lengauer_tarjan(num: int, offsets, targets, p_offsets, p_sources, root: int) -> array:
+    """Dominador imediato de cada vértice a partir de `root` (-1 na raiz e nos inalcançáveis).
+
+    Versão simples do Lengauer-Tarjan (compressão de caminho, O(m log n)),
+    com DFS e compressão iterativas.
+    """
+    idom_out = array('i', [NONE]) * num
+    if root < 0 or root >= num:
+        return idom_out
+    dfn = array('i', [NONE]) * num
+    vertex: List[int] = []
+    parent: List[int] = []
+    stack = [(root, NONE)]
+    while stack:
+        v, p = stack.pop()
+        if dfn[v] != NONE:
+            continue
+        dfn[v] = len(vertex)
+        vertex.append(v)
+        parent.append(p)
+        for k in range(offsets[v + 1] - 1, offsets[v] - 1, -1):
+            w = targets[k]
+            if dfn[w] == NONE:
+                stack.append((w, dfn[v]))
+    size = len(vertex)
+    semi = list(range(size))
+    label = list(range(size))
+    ancestor = [NONE] * size
+    idom = [0] * size
+    bucket: List[List[int]] = [[] for _ in range(size)]
+
+    def evaluate(v: int) -> int:
+        if ancestor[v] == NONE:
+            return v
+        path = []
+        u = v
+        while ancestor[ancestor[u]] != NONE:
+            path.append(u)
+            u = ancestor[u]
+        for u in reversed(path):
+            a = ancestor[u]
+            if semi[label[a]] < semi[label[u]]:
+                label[u] = label[a]
+            ancestor[u] = ancestor[a]
+        return label[v]
+
+    for i in range(size - 1, 0, -1):
+        w = vertex[i]
+        for k in range(p_offsets[w], p_offsets[w + 1]):
+            v = dfn[p_sources[k]]
+            if v == NONE:
+                continue
+            u = evaluate(v)
+            if semi[u] < semi[i]:
+                semi[i] = semi[u]
+        bucket[semi[i]].append(i)
+        p = parent[i]
+        ancestor[i] = p
+        for v in bucket[p]:
+            u = evaluate(v)
+            idom[v] = u if semi[u] < semi[v] else p
+        bucket[p] = []
+    for i in range(1, size):
+        if idom[i] != semi[i]:
+            idom[i] = idom[idom[i]]
+        idom_out[vertex[i]] = vertex[idom[i]]
+    return idom_out
+
+
+def _tree_intervals(num: int, idom: array, root: int) -> Tuple[array, array]:
+    """Numeração de entrada/saída na árvore de dominadores (tin = -1 fora da árvore)."""
+    children: List[List[int]] = [[] for _ in range(num)]
+    for v in range(num):
+        if idom[v] != NONE:
+            children[idom[v]].append(v)
+    tin = array('i', [NONE]) * num
+    tout = array('i', [NONE]) * num
+    if root < 0 or root >= num:
+        return tin, tout
+    counter = 0
+    stack = [(root, False)]
+    while stack:
+        v, done = stack.pop()
+        if done:
+            tout[v] = counter
+            continue
+        tin[v] = counter
+        counter += 1
+        stack.append((v, True))
+        stack.extend((c, False) for c in reversed(children[v]))
+    return tin, tout
+
+
+class QueryIndex:
+    """Índice de consultas pré-calculado sobre um `CompiledGraph` (veja o docstring do módulo)."""
+
+    def __init__(
+        self,
+        graph: CompiledGraph,
+        start: Optional[str] = None,
+        ends: Optional[Iterable[str]] = None,
+        method: str = 'auto',
+    ):
+        if method not in QUERY_METHODS:
+            raise ValueError(f"Método de alcançabilidade inválido: {method} (use {'|'.join(QUERY_METHODS)})")
+        t0 = time.perf_counter()
+        self.graph = graph
+        n = graph.num_nodes
+        annotate(nodes=n, edges=graph.num_edges)
+        # 1. Componentes fortes + fecho transitivo do DAG condensado
+        with phase('reachability') as span:
+            self.comp, self.num_components = _strongly_connected(n, graph.next_offsets, graph.next_targets)
+            succ = _condense(graph, self.comp, self.num_components)
+            if method == 'auto':
+                method = 'bitset' if self.num_components <= BITSET_MAX_COMPONENTS else 'intervals'
+            self.method = method
+            if method == 'bitset':
+                self._bits, self._row_bytes = _bitset_closure(succ)
+                self.closure_bytes = len(self._bits)
+            else:
+                self._post, self._offsets, self._lo, self._hi = _interval_labels(succ)
+                self.closure_bytes = sum(a.itemsize * len(a) for a in (self._post, self._offsets, self._lo, self._hi))
+            span.set(method=method, components=self.num_components, closure_bytes=self.closure_bytes)
+        # 2. Dominadores a partir do start
+        node_index = graph.node_index
+        self.root = node_index.get(start, NONE) if start is not None else NONE
+        with phase('dominators'):
+            self.idom = _lengauer_tarjan(n, graph.next_offsets, graph.next_targets,
+                                         graph.prev_offsets, graph.prev_sources, self.root)
+            self._dom_in, self._dom_out = _tree_intervals(n, self.idom, self.root)
+        # 3. Pós-dominadores: grafo reverso com saída virtual (nó n) ligada aos ends
+        end_ids = [node_index[e] for e in (ends or []) if e in node_index]
+        if not end_ids:
+            end_ids = [i for i in range(n) if graph.out_degree(i) == 0]
+        self.ends = end_ids
+        with phase('post_dominators'):
+            exit_node = n
+            rev_src = array('i', graph.edge_dst)
+            rev_src.extend([exit_node] * len(end_ids))
+            rev_dst = array('i', graph.edge_src)
+            rev_dst.extend(end_ids)
+            r_off, r_order = _csr(n + 1, rev_src)
+            r_tgt = array('i', [rev_dst[k] for k in r_order])
+            p_off, p_order = _csr(n + 1, rev_dst)
+            p_src = array('i', [rev_src[k] for k in p_order])
+            ipdom = _lengauer_tarjan(n + 1, r_off, r_tgt, p_off, p_src, exit_node)
+            self._pdom_in, self._pdom_out = _tree_intervals(n + 1, ipdom, exit_node)
+            # A saída virtual não é um nó do fluxo
+            self.ipdom = array('i', [NONE if p == exit_node else p for p in ipdom[:n]])
+        # 4. Dependência de controle: edge X→S onde S não pós-domina X marca
+        # S e seus pós-dominadores até (exclusive) o pós-dominador imediato de X
+        with phase('control_dependence'):
+            self._control: Dict[int, List[Tuple[int, int]]] = {}
+            for x in range(n):
+                if graph.out_degree(x) < 2 or self._pdom_in[x] == NONE:
+                    continue
+                stop = ipdom[x]
+                for k in graph.out_edges(x):
+                    s = graph.edge_dst[k]
+                    if self._pdom_in[s] == NONE:
+                        continue
+                    y = s
+                    while y != stop and y != NONE and y != exit_node:
+                        self._control.setdefault(y, []).append((x, k))
+                        y = ipdom[y]
+        self.build_ms = (time.perf_counter() - t0) * 1000
+
+    def _index(self, node_id: str) -> int:
+        i = self.graph.node_index.get(node_id)
+        if i is None:
+            raise ValueError(f"Nó desconhecido: {node_id}")
+        return i
+
+    # Alcançabilidade
+
+    def reaches(self, source: str, target: str) -> bool:
+        """Existe caminho de `source` até `target` (um nó sempre alcança a si mesmo)."""
+        cu = self.comp[self._index(source)]
+        cv = self.comp[self._index(target)]
+        if cu == cv:
+            return True
+        if self.method == 'bitset':
+            return bool(self._bits[cu * self._row_bytes + (cv >> 3)] >> (cv & 7) & 1)
+        p = self._post[cv]
+        lo, hi = self._lo, self._hi
+        k = bisect_right(lo, p, self._offsets[cu], self._offsets[cu + 1]) - 1
+        return k >= self._offsets[cu] and hi[k] >= p
+
+    def same_cycle(self, a: str, b: str) -> bool:
+        """`a` e `b` estão no mesmo componente forte (um alcança o outro)."""
+        return self.comp[self._index(a)] == self.comp[self._index(b)]
+
+    # Dominadores
+
+    def dominates(self, a: str, b: str) -> bool:
+        """Todo caminho do start até `b` passa por `a` (inclui a = b)."""
+        i, j = self._index(a), self._index(b)
+        tin = self._dom_in
+        return tin[i] != NONE and tin[j] != NONE and tin[i] <= tin[j] < self._dom_out[i]
+
+    def immediate_dominator(self, node_id: str) -> Optional[str]:
+        d = self.idom[self._index(node_id)]
+        return None if d == NONE else self.graph.node_ids[d]
+
+    def dominators(self, node_id: str) -> List[str]:
+        """Nós por onde passa todo caminho do start até `node_id`, do start até ele."""
+        i = self._index(node_id)
+        if self._dom_in[i] == NONE:
+            return []
+        chain = []
+        while i != NONE:
+            chain.append(self.graph.node_ids[i])
+            i = self.idom[i]
+        return chain[::-1]
+
+    # Pós-dominadores
+
+    def post_dominates(self, a: str, b: str) -> bool:
+        """Todo caminho de `b` até um end passa por `a` (inclui a = b)."""
+        i, j = self._index(a), self._index(b)
+        tin = self._pdom_in
+        return tin[i] != NONE and tin[j] != NONE and tin[i] <= tin[j] < self._pdom_out[i]
+
+    def immediate_post_dominator(self, node_id: str) -> Optional[str]:
+        d = self.ipdom[self._index(node_id)]
+        return None if d == NONE else self.graph.node_ids[d]
+
+    def post_dominators(self, node_id: str) -> List[str]:
+        """Nós por onde passa todo caminho de `node_id` até um end, dele até o fim."""
+        i = self._index(node_id)
+        if self._pdom_in[i] == NONE:
+            return []
+        chain = []
+        while i != NONE:
+            chain.append(self.graph.node_ids[i])
+            i = self.ipdom[i]
+        return chain
+
+    # Controle
+
+    def controlled_by(self, node_id: str) -> List[Tuple[str, Optional[str]]]:
+        """Pares (decision, branch) que decidem se `node_id` executa."""
+        ids = self.graph.node_ids
+        return [(ids[x], self.graph.branch_of(k)) for x, k in self._control.get(self._index(node_id), [])]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'nodes': self.graph.num_nodes,
+            'edges': self.graph.num_edges,
+            'components': self.num_components,
+            'method': self.method,
+            'closure_bytes': self.closure_bytes,
+            'unreachable_from_start': sum(1 for t in self._dom_in if t == NONE) if self.root != NONE else None,
+            'control_dependences': sum(len(v) for v in self._control.values()),
+            'build_ms': round(self.build_ms, 3),
+        }
+
+
+@instrumented()
+def build_query_index(data: Dict[str, Any], compiled: Dict[str, Any], method: str = 'auto') -> QueryIndex:
+    """Índice de consultas do fluxo compilado (start e ends vêm de `entry`)."""
+    entry = data.get('entry', {})
+    return QueryIndex(compiled['graph'], entry.get('start'), entry.get('ends'), method)
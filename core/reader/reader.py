@@ -1,15 +1,201 @@
 """
 core/reader/reader.py
 Responsável por ler arquivos .sff (JSON) e retornar o dicionário bruto ou erro de leitura.
+
+Além da leitura completa (`read_sff_file`), há um leitor incremental
+(`iter_sff_events`) que percorre o objeto de topo bloco a bloco e emite cada
+nó de `nodes` e cada edge de `edges` assim que é decodificado. A memória usada
+pelo leitor fica limitada ao buffer de leitura mais o maior item individual,
+e arquivos malformados falham na posição do primeiro erro. Arquivos `.gz`
+(ou com cabeçalho gzip) são descomprimidos em streaming nos dois modos.
 """
 import json
-from typing import Any, Dict
+import re
+from typing import Any, Dict, Iterator, Optional, TextIO, Tuple
+
+from core.profiler.profiler import instrumented
+
+CHUNK_SIZE = 1024 * 1024
+MAX_ITEM_CHARS = 64 * 1024 * 1024
+
+# Eventos: ('block', chave, valor) para blocos lidos inteiros, ('open', chave, None)
+# no início de `nodes`/`edges`, ('node', id, nó) e ('edge', posição, edge)
+SffEvent = Tuple[str, Any, Any]
+
+_GZIP_MAGIC = b'\x1f\x8b'
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+_NUMBER_CHARS = frozenset('0123456789.eE+-')
+
+
+def open_sff(filepath: str) -> TextIO:
+    """Abre um .sff como texto UTF-8, descomprimindo gzip quando necessário."""
+    with open(filepath, 'rb') as f:
+        compressed = f.read(2) == _GZIP_MAGIC
+    if compressed or filepath.endswith('.gz'):
+        import gzip
+        return gzip.open(filepath, 'rt', encoding='utf-8')
+    return open(filepath, 'r', encoding='utf-8')
+
 
+@instrumented()
 def read_sff_file(filepath: str) -> Dict[str, Any]:
-    """Lê um arquivo .sff (JSON) e retorna o dicionário correspondente."""
+    """Lê um arquivo .sff (JSON, opcionalmente .sff.gz) e retorna o dicionário correspondente."""
     try:
-        with open(filepath, 'r', encoding='utf-8') as f:
+        with open_sff(filepath) as f:
             data = json.load(f)
         return data
     except Exception as e:
         raise RuntimeError(f"Erro ao ler arquivo {filepath}: {e}")
+
+
+def _only_number_chars(buf: str, start: int) -> bool:
+    return all(ch in _NUMBER_CHARS for ch in buf[start:start + 32]) and len(buf) - start <= 32
+
+
+class _JsonStream:
+    """Cursor sobre um texto JSON lido em pedaços; valores via `raw_decode` (C)."""
+
+    def __init__(self, handle: TextIO, chunk_size: int = CHUNK_SIZE, max_item: int = MAX_ITEM_CHARS):
+        self.handle = handle
+        self.chunk_size = chunk_size
+        self.max_item = max_item
+        self.decoder = json.JSONDecoder()
+        self.buf = ''
+        self.pos = 0
+        # Caracteres já descartados antes do início de `buf` (para mensagens de erro)
+        self.offset = 0
+        self.eof = False
+
+    def _fill(self) -> bool:
+        if self.eof:
+            return False
+        chunk = self.handle.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.offset += self.pos
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def error(self, message: str, pos: Optional[int] = None) -> ValueError:
+        return ValueError(f"{message} (posição {self.offset + (self.pos if pos is None else pos)})")
+
+    def peek(self) -> str:
+        """Próximo caractere não branco ('' no fim do arquivo), sem consumi-lo."""
+        while True:
+            buf = self.buf
+            pos = self.pos = _WHITESPACE.match(buf, self.pos).end()
+            if pos < len(buf):
+                return buf[pos]
+            if not self._fill():
+                return ''
+
+    def expect(self, chars: str) -> str:
+        ch = self.peek()
+        if not ch or ch not in chars:
+            found = repr(ch) if ch else 'fim do arquivo'
+            raise self.error(f"Esperado {' ou '.join(repr(c) for c in chars)}, encontrado {found}")
+        self.pos += 1
+        return ch
+
+    def value(self) -> Any:
+        """Decodifica o próximo valor JSON completo, lendo mais texto se ele estiver cortado."""
+        self.peek()
+        while True:
+            try:
+                obj, end = self.decoder.raw_decode(self.buf, self.pos)
+                # Número que vai até o fim do buffer pode estar cortado ("7." + "5e3")
+                if self.eof or not (isinstance(obj, (int, float)) and _only_number_chars(self.buf, end)):
+                    self.pos = end
+                    return obj
+            except json.JSONDecodeError as e:
+                if self.eof:
+                    raise self.error(f"JSON inválido: {e.msg}", e.pos)
+            if len(self.buf) - self.pos > self.max_item:
+                raise self.error(f"Item maior que {self.max_item} caracteres ou malformado")
+            self._fill()
+
+    def key(self) -> str:
+        if self.peek() != '"':
+            raise self.error("Esperada chave (string)")
+        key = self.value()
+        self.expect(':')
+        return key
+
+    def iter_object(self) -> Iterator[Tuple[str, Any]]:
+        self.expect('{')
+        if self.peek() == '}':
+            self.pos += 1
+            return
+        while True:
+            key = self.key()
+            yield key, self.value()
+            if self.expect(',}') == '}':
+                return
+
+    def iter_array(self) -> Iterator[Any]:
+        self.expect('[')
+        if self.peek() == ']':
+            self.pos += 1
+            return
+        while True:
+            yield self.value()
+            if self.expect(',]') == ']':
+                return
+
+
+def iter_sff_events(filepath: str, chunk_size: int = CHUNK_SIZE) -> Iterator[SffEvent]:
+    """Percorre o .sff incrementalmente, emitindo blocos, nós e edges na ordem do arquivo.
+
+    `nodes` e `edges` nunca são montados inteiros: cada item é emitido e
+    descartado. Erros de sintaxe levantam RuntimeError com a posição.
+    """
+    try:
+        with open_sff(filepath) as f:
+            stream = _JsonStream(f, chunk_size)
+            stream.expect('{')
+            if stream.peek() == '}':
+                stream.pos += 1
+            else:
+                while True:
+                    key = stream.key()
+                    ch = stream.peek()
+                    if key == 'nodes' and ch == '{':
+                        yield ('open', key, None)
+                        for node_id, node in stream.iter_object():
+                            yield ('node', node_id, node)
+                    elif key == 'edges' and ch == '[':
+                        yield ('open', key, None)
+                        for i, edge in enumerate(stream.iter_array()):
+                            yield ('edge', i, edge)
+                    else:
+                        yield ('block', key, stream.value())
+                    if stream.expect(',}') == '}':
+                        break
+            if stream.peek():
+                raise stream.error("Conteúdo após o fim do documento")
+    except (ValueError, OSError, EOFError) as e:
+        raise RuntimeError(f"Erro ao ler arquivo {filepath}: {e}")
+
+
+def read_sff_stream(filepath: str, on_event=None) -> Dict[str, Any]:
+    """Monta o documento a partir de `iter_sff_events`, chamando `on_event(evento)` a cada item.
+
+    Útil para validar/indexar durante a leitura (o callback pode levantar
+    exceção para abortar cedo); o dicionário final equivale ao de `read_sff_file`.
+    """
+    data: Dict[str, Any] = {}
+    for event in iter_sff_events(filepath):
+        if on_event is not None:
+            on_event(event)
+        kind, key, value = event
+        if kind == 'block':
+            data[key] = value
+        elif kind == 'open':
+            data[key] = {} if key == 'nodes' else []
+        elif kind == 'node':
+            data['nodes'][key] = value
+        else:
+            data['edges'].append(value)
+    return data
@@ -0,0 +1 @@
+# __init__.py para tornar o diretório server um pacote Python
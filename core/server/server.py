@@ -0,0 +1,309 @@
+"""
+core/server/server.py
+Servidor de compilação de longa duração (HTTP/1.1 em localhost ou socket Unix).
+
+Evita o custo de subir o interpretador e importar a CLI a cada chamada: as
+conexões são atendidas com asyncio e o trabalho pesado (parse, compilação,
+layout, exportação) roda em um pool de processos. Respostas recentes ficam
+em um LRU em memória (chave = SHA-256 do corpo + rota + parâmetros), e
+requisições idênticas simultâneas compartilham o mesmo processamento.
+
+Rotas:
+- `GET  /health`                                  → {"status": "ok"}
+- `GET  /stats`                                   → contadores do servidor
+- `POST /compile?max_errors=N&fail_fast=1`        → índice prev/next + validação
+- `POST /layout?rank_mode=M`                      → layout (mesmo formato do export JSON)
+- `POST /export?format=F&rank_mode=M`             → saída do exporter (formatos do registro de exporters)
+
+O corpo dos POSTs é o documento SFF (JSON). Erros estruturais/lógicos
+respondem 422 com `errors` e o `exit_code` equivalente ao da CLI; erros
+lógicos também vêm em `issues` (código, nó, severidade e mensagem).
+
+Documentos com nós subflow são ligados por `load_flow`, como na CLI, com os
+módulos relativos ao diretório raiz do servidor (`--root`, padrão: diretório
+de trabalho); módulos que resolvem para fora dele (caminho absoluto, `..`,
+link simbólico) são recusados com `SFF011` sem serem lidos. Como a resposta
+depende dos arquivos dos módulos, esses documentos não entram no LRU de
+respostas.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import signal
+import stat
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from core.batch.batch import EXIT_OK, EXIT_LOGIC_ERRORS, EXIT_STRUCTURE_ERRORS, EXIT_EXCEPTION
+from core.exporters.registry import available_formats, export_output, get_exporter
+from core.cache.cache import FlowCache, MemoryCache
+from core.exporters.json_exporter import layout_to_json
+from core.layout.ranking import RANK_MODES, DEFAULT_RANK_MODE
+from core.linker.linker import load_flow
+from core.logger.logger import Logger
+from core.validator.validator import validate_sff_structure
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+MAX_BODY_BYTES = 64 * 1024 * 1024
+RESPONSE_CACHE_ENTRIES = 512
+
+_JSON = 'application/json; charset=utf-8'
+_REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+            413: 'Payload Too Large', 422: 'Unprocessable Entity', 500: 'Internal Server Error'}
+
+Response = Tuple[int, str, bytes]
+
+# Nome do documento do corpo para a ligação: os módulos são resolvidos a partir do seu diretório
+REQUEST_FILE = '<corpo>.sff'
+
+# Cache de compile/layout de cada processo worker (fluxos quentes)
+_worker_cache: Optional[FlowCache] = None
+# Diretório raiz dos módulos de subflow (definido no início de cada worker)
+_worker_root: Optional[str] = None
+
+
+def _init_worker(root: Optional[str]):
+    global _worker_root
+    _worker_root = root
+    # O fork herda o wakeup fd do loop asyncio: um SIGTERM recebido pelo worker
+    # (ex.: ao encerrar um pool quebrado) chegaria ao servidor como se fosse dele
+    signal.set_wakeup_fd(-1)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+
+
+def _json_response(status: int, obj: Any) -> Response:
+    return status, _JSON, json.dumps(obj, ensure_ascii=False).encode('utf-8')
+
+
+def handle_request(route: str, body: bytes, params: Dict[str, str]) -> Response:
+    """Processa uma requisição no worker; nunca levanta exceção."""
+    global _worker_cache
+    if _worker_cache is None:
+        _worker_cache = FlowCache(MemoryCache())
+    try:
+        try:
+            data = json.loads(body)
+        except ValueError as e:
+            return _json_response(400, {'error': f'JSON inválido: {e}'})
+        if not isinstance(data, dict):
+            return _json_response(400, {'error': 'O corpo deve ser um objeto SFF'})
+        errors = validate_sff_structure(data)
+        if errors:
+            return _json_response(422, {'errors': errors, 'exit_code': EXIT_STRUCTURE_ERRORS})
+        rank_mode = params.get('rank_mode', DEFAULT_RANK_MODE)
+        if rank_mode not in RANK_MODES:
+            return _json_response(400, {'error': f"Modo de ranking inválido: {rank_mode} (use {'|'.join(RANK_MODES)})"})
+        root = _worker_root or os.getcwd()
+        filepath = os.path.join(root, REQUEST_FILE)
+        if route == '/compile':
+            max_errors = params.get('max_errors')
+            if max_errors is not None and (not max_errors.isdigit() or int(max_errors) < 1):
+                return _json_response(400, {'error': f"max_errors inválido: {max_errors} (use um inteiro >= 1)"})
+            flow = load_flow(filepath, _worker_cache, data, int(max_errors) if max_errors is not None else None,
+                             params.get('fail_fast') in ('1', 'true'), root=root)
+            compiled = flow['compiled']
+            validation = compiled['validation']
+            return _json_response(200, {
+                'index': {'prev': compiled['index']['prev'], 'next': compiled['index']['next']},
+                'validation': validation,
+                'issues': [issue.to_dict() for issue in validation['errors'] + validation['warnings']],
+                'exit_code': EXIT_LOGIC_ERRORS if validation['errors'] else EXIT_OK,
+            })
+        flow = load_flow(filepath, _worker_cache, data, root=root)
+        data = flow['data']
+        compiled, layout = _worker_cache.compile_and_layout(data, rank_mode, flow['hash'])
+        if layout is None:
+            errors = compiled['validation']['errors']
+            return _json_response(422, {'errors': errors, 'issues': [issue.to_dict() for issue in errors],
+                                        'exit_code': EXIT_LOGIC_ERRORS})
+        if route == '/layout':
+            return _json_response(200, {'layout': layout_to_json(layout), 'warnings': compiled['validation']['warnings']})
+        export_format = params.get('format') or ''
+        try:
+            exporter = get_exporter(export_format)
+        except ValueError:
+            return _json_response(400, {'error': f"Formato de exportação inválido: {export_format} (use {'|'.join(available_formats())})"})
+        output = export_output(exporter.name, data, compiled, layout)
+        if isinstance(output, str) or output is None:
+            output = (output or '').encode('utf-8')
+        return 200, exporter.content_type, output
+    except Exception as e:
+        return _json_response(500, {'error': str(e), 'exit_code': EXIT_EXCEPTION})
+
+
+class FlowServer:
+    """Servidor asyncio com pool de processos e LRU de respostas."""
+
+    ROUTES = ('/compile', '/layout', '/export')
+
+    def __init__(self, workers: Optional[int] = None, cache_entries: int = RESPONSE_CACHE_ENTRIES, root: Optional[str] = None):
+        self.workers = workers or os.cpu_count() or 1
+        self.root = os.path.abspath(root or os.getcwd())
+        self.pool: Optional[ProcessPoolExecutor] = None
+        self.responses = MemoryCache(cache_entries)
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.started = time.time()
+        self.stats = {'requests': 0, 'cache_hits': 0, 'shared': 0, 'errors': 0, 'pool_restarts': 0}
+
+    def _new_pool(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker, initargs=(self.root,))
+
+    async def _run(self, path: str, body: bytes, params: Dict[str, str]) -> Response:
+        """Roda `handle_request` no pool; recria o pool se um worker morreu."""
+        pool = self.pool
+        try:
+            return await asyncio.get_running_loop().run_in_executor(pool, handle_request, path, body, params)
+        except BrokenProcessPool:
+            # Um worker encerrado (ex.: falta de memória) inutiliza o pool inteiro
+            if self.pool is pool:
+                self.pool = self._new_pool()
+                pool.shutdown(wait=False)
+                self.stats['pool_restarts'] += 1
+            return _json_response(500, {'error': 'Worker encerrado durante o processamento; tente novamente',
+                                        'exit_code': EXIT_EXCEPTION})
+
+    async def dispatch(self, method: str, target: str, body: bytes) -> Response:
+        url = urlsplit(target)
+        path = url.path.rstrip('/') or '/'
+        if path == '/health':
+            return _json_response(200, {'status': 'ok'})
+        if path == '/stats':
+            return _json_response(200, dict(self.stats, workers=self.workers,
+                                             uptime_s=round(time.time() - self.started, 1)))
+        if path not in self.ROUTES:
+            return _json_response(404, {'error': f'Rota desconhecida: {path}'})
+        if method != 'POST':
+            return _json_response(405, {'error': 'Use POST com o documento SFF no corpo'})
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        key = hashlib.sha256(body).hexdigest() + '|' + path + '|' + json.dumps(params, sort_keys=True)
+        cached = self.responses.get(key)
+        if cached is not None:
+            self.stats['cache_hits'] += 1
+            return cached
+        pending = self._inflight.get(key)
+        if pending is not None:
+            self.stats['shared'] += 1
+            return await asyncio.shield(pending)
+        future = asyncio.ensure_future(self._run(path, body, params))
+        self._inflight[key] = future
+        try:
+            response = await future
+        finally:
+            del self._inflight[key]
+        # Com subflow, a resposta depende também dos arquivos dos módulos
+        if response[0] < 500 and b'"subflow"' not in body:
+            self.responses.put(key, response)
+        return response
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """HTTP/1.1 mínimo com keep-alive e Content-Length."""
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                parts = line.decode('latin-1').split()
+                if len(parts) != 3:
+                    await self._write(writer, _json_response(400, {'error': 'Requisição malformada'}), False)
+                    break
+                method, target, version = parts
+                headers = {}
+                while True:
+                    header = await reader.readline()
+                    if header in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = header.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get('content-length') or 0)
+                if length > MAX_BODY_BYTES:
+                    await self._write(writer, _json_response(413, {'error': 'Documento grande demais'}), False)
+                    break
+                body = await reader.readexactly(length) if length else b''
+                self.stats['requests'] += 1
+                response = await self.dispatch(method.upper(), target, body)
+                if response[0] >= 400:
+                    self.stats['errors'] += 1
+                keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+                await self._write(writer, response, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _write(writer: asyncio.StreamWriter, response: Response, keep_alive: bool):
+        status, content_type, payload = response
+        head = (f'HTTP/1.1 {status} {_REASONS.get(status, "")}\r\n'
+                f'Content-Type: {content_type}\r\n'
+                f'Content-Length: {len(payload)}\r\n'
+                f'Connection: {"keep-alive" if keep_alive else "close"}\r\n\r\n')
+        writer.write(head.encode('latin-1') + payload)
+        await writer.drain()
+
+    async def serve(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, socket_path: Optional[str] = None):
+        if socket_path:
+            _remove_stale_socket(socket_path)
+        self.pool = self._new_pool()
+        try:
+            if socket_path:
+                server = await asyncio.start_unix_server(self.handle_connection, path=socket_path)
+            else:
+                server = await asyncio.start_server(self.handle_connection, host, port)
+            # SIGTERM encerra como Ctrl+C: fecha o socket e o pool de workers
+            stop = asyncio.Event()
+            try:
+                asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, stop.set)
+            except (NotImplementedError, RuntimeError):
+                pass
+            async with server:
+                await stop.wait()
+        finally:
+            self.pool.shutdown(cancel_futures=True)
+            if socket_path:
+                _remove_stale_socket(socket_path)
+
+
+def _remove_stale_socket(path: str):
+    """Remove um socket Unix que sobrou em `path`; recusa apagar qualquer outro tipo de arquivo."""
+    try:
+        mode = os.lstat(path).st_mode
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(mode):
+        raise ValueError(f"--socket aponta para um arquivo que não é socket: {path}")
+    os.remove(path)
+
+
+def run_server(
+    host: str = DEFAULT_HOST,
+    port: int = DEFAULT_PORT,
+    socket_path: Optional[str] = None,
+    workers: Optional[int] = None,
+    root: Optional[str] = None,
+):
+    """Sobe o servidor e bloqueia até Ctrl+C; `root` é o diretório dos módulos de subflow."""
+    logger = Logger()
+    server = FlowServer(workers, root=root)
+    if socket_path:
+        try:
+            _remove_stale_socket(socket_path)
+        except ValueError as e:
+            logger.error(str(e))
+            print(f"Erro: {e}")
+            sys.exit(1)
+    address = socket_path or f'http://{host}:{port}'
+    logger.info(f"Servidor iniciado em {address} (workers={server.workers})")
+    print(f"Servindo em {address} (workers={server.workers}); Ctrl+C para encerrar")
+    try:
+        asyncio.run(server.serve(host, port, socket_path))
+    except KeyboardInterrupt:
+        pass
+    logger.info(f"Servidor encerrado: {server.stats}")
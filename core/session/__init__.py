@@ -0,0 +1 @@
+# __init__.py para tornar o diretório session um pacote Python
@@ -0,0 +1,494 @@
+"""
+core/session/session.py
+Sessão de edição incremental de um fluxo SFF.
+
+Aplica operações (adicionar/remover nó ou edge, trocar lane) mantendo
+atualizados o índice prev/next, as regras lógicas afetadas e os ranks, sem
+recompilar o documento inteiro. O resultado é sempre idêntico ao de
+`compile_sff` + `generate_layout` sobre o documento atual:
+- regras 1–4, 6 e 8 são recalculadas só para os nós tocados;
+- alcançabilidade (regra 5) é refeita apenas na região a jusante da mudança;
+- coerência de decisions (regra 7) é refeita só para as decisions envolvidas;
+- ranks (modo `longest-path`, grafo acíclico) são refeitos só a jusante.
+Os problemas saem das regras registradas em `core.validator.rules`: as
+nativas (`LOGIC_RULES`) usam o estado incremental e as demais (de terceiros
+ou substituídas) rodam sobre a IR atual.
+Em grafos com ciclos ou no modo `network-simplex` os ranks voltam ao cálculo
+completo. Ordenação e roteamento são globais e rodam em `layout()`.
+"""
+import copy
+from array import array
+from typing import Any, Dict, List, Optional, Set
+
+from core.compiler.graph import CompiledGraph, IndexView
+from core.layout.layout import layout_from_ranks
+from core.layout.ordering import DEFAULT_ORDER_METHOD, DEFAULT_ORDER_ITERATIONS
+from core.layout.ranking import RANK_MODES, DEFAULT_RANK_MODE, compute_ranks
+from core.validator.rules import Issue, RuleContext, registered_rules
+from core.validator.validator import LOGIC_RULES
+
+# Versão incremental de cada regra nativa (método da sessão que gera `(mensagem, nó)`)
+_INCREMENTAL = {
+    'edges_existentes': '_dangling_issues',
+    'start_unico': '_start_issues',
+    'ends_declarados': '_end_issues',
+    'start_sem_entrada': '_start_in_issues',
+    'end_sem_saida': '_end_out_issues',
+    'alcancabilidade': '_reach_issues',
+    'nos_isolados': '_isolated_issues',
+    'decisions_coerentes': '_decision_issues',
+    'subflows_referenciados': '_subflow_issues',
+    'caminho_principal': '_main_path_issues',
+}
+_NATIVE = {rule.name: rule for rule in LOGIC_RULES}
+
+
+class FlowSession:
+    """Documento SFF editável com índice, validação e ranks incrementais."""
+
+    def __init__(self, data: Dict[str, Any], rank_mode: str = DEFAULT_RANK_MODE):
+        if rank_mode not in RANK_MODES:
+            raise ValueError(f"Modo de ranking inválido: {rank_mode} (use {', '.join(RANK_MODES)})")
+        self.data = copy.deepcopy(data)
+        self.data.setdefault('nodes', {})
+        self.data.setdefault('edges', [])
+        self.rank_mode = rank_mode
+        nodes = self.data['nodes']
+        # Ordem de declaração: contador crescente (dict preserva a ordem de inserção)
+        self._seq = 0
+        self._order: Dict[str, int] = {}
+        self.prev: Dict[str, List[str]] = {}
+        self.next: Dict[str, List[str]] = {}
+        # Edges (dicts do documento) de saída/entrada por nó, na ordem do documento
+        self._out: Dict[str, List[Dict[str, Any]]] = {}
+        self._in: Dict[str, List[Dict[str, Any]]] = {}
+        self._isolated: Set[str] = set()
+        self._by_type: Dict[str, Set[str]] = {'start': set(), 'end': set(), 'decision': set(), 'subflow': set()}
+        # Decisions que referenciam cada id em branches.*.next
+        self._branch_refs: Dict[Any, Set[str]] = {}
+        for node_id, node in nodes.items():
+            self._register_node(node_id, node)
+        for edge in self.data['edges']:
+            if edge['from'] not in nodes or edge['to'] not in nodes:
+                raise ValueError(f"Edge aponta para nó inexistente: {edge['from']} → {edge['to']}")
+            self._link(edge)
+        self._decision_errors: Dict[str, List[str]] = {}
+        for node_id in self._by_type['decision']:
+            self._check_decision(node_id)
+        self._reachable: Set[str] = set()
+        self._unreachable: Set[str] = set()
+        self._recompute_reachability()
+        self._graph: Optional[CompiledGraph] = None
+        self._ranks: Dict[str, int] = {}
+        self._acyclic = False
+        self._ranks_dirty = True
+
+    # ------------------------------------------------------------------
+    # Operações
+
+    def add_node(self, node_id: str, node: Dict[str, Any]):
+        if node_id in self.data['nodes']:
+            raise ValueError(f"Nó já existe: {node_id}")
+        node = copy.deepcopy(node)
+        self.data['nodes'][node_id] = node
+        self._register_node(node_id, node)
+        self._invalidate()
+        if node.get('type') == 'decision':
+            self._check_decision(node_id)
+        for decision in self._branch_refs.get(node_id, ()):
+            self._check_decision(decision)
+        self._unreachable.add(node_id)
+        if node_id == self.data.get('entry', {}).get('start'):
+            self._recompute_reachability()
+        if not self._ranks_dirty:
+            self._ranks[node_id] = 0
+
+    def remove_node(self, node_id: str):
+        """Remove o nó e todas as edges incidentes."""
+        if node_id not in self.data['nodes']:
+            raise ValueError(f"Nó inexistente: {node_id}")
+        for edge in self._out[node_id][::-1]:
+            self._remove_edge(edge)
+        for edge in self._in[node_id][::-1]:
+            self._remove_edge(edge)
+        node = self.data['nodes'].pop(node_id)
+        self._invalidate()
+        for table in (self._order, self.prev, self.next, self._out, self._in):
+            del table[node_id]
+        self._isolated.discard(node_id)
+        node_type = node.get('type')
+        if node_type in self._by_type:
+            self._by_type[node_type].discard(node_id)
+        if node_type == 'decision':
+            self._decision_errors.pop(node_id, None)
+            for branch in (node.get('branches') or {}).values():
+                refs = self._branch_refs.get(branch.get('next') if isinstance(branch, dict) else None)
+                if refs:
+                    refs.discard(node_id)
+        for decision in self._branch_refs.get(node_id, ()):
+            self._check_decision(decision)
+        self._reachable.discard(node_id)
+        self._unreachable.discard(node_id)
+        if node_id == self.data.get('entry', {}).get('start'):
+            self._recompute_reachability()
+        self._ranks.pop(node_id, None)
+
+    def add_edge(self, edge: Dict[str, Any]):
+        nodes = self.data['nodes']
+        u, v = edge['from'], edge['to']
+        if u not in nodes or v not in nodes:
+            raise ValueError(f"Edge aponta para nó inexistente: {u} → {v}")
+        edge = dict(edge)
+        self.data['edges'].append(edge)
+        self._invalidate()
+        self._link(edge)
+        if u in self._by_type['decision']:
+            self._check_decision(u)
+        if u in self._reachable and v not in self._reachable:
+            self._mark_reachable_from([v])
+        if not self._ranks_dirty:
+            if not self._acyclic or u == v or self._reaches(v, u):
+                # Edge fecha ciclo: back-edges dependem da DFS global
+                self._ranks_dirty = True
+            elif self._ranks[u] + 1 > self._ranks[v]:
+                self._rerank_downstream(v)
+
+    def remove_edge(self, source: str, target: str, branch: Optional[str] = None):
+        """Remove a primeira edge `source → target` (com `branch`, se informado)."""
+        for edge in self._out.get(source, ()):
+            if edge['to'] == target and (branch is None or edge.get('branch') == branch):
+                self._remove_edge(edge)
+                return
+        raise ValueError(f"Edge inexistente: {source} → {target}")
+
+    def change_lane(self, node_id: str, lane: Optional[str]):
+        if node_id not in self.data['nodes']:
+            raise ValueError(f"Nó inexistente: {node_id}")
+        node = self.data['nodes'][node_id]
+        if lane is None:
+            node.pop('lane', None)
+        else:
+            node['lane'] = lane
+        # Lane não afeta validação nem ranks; só a IR (ordenação/posições)
+        self._graph = None
+
+    # ------------------------------------------------------------------
+    # Resultados
+
+    @property
+    def errors(self) -> List[Issue]:
+        """Mesma lista (e ordem) de `validate_sff_logic` sobre o documento atual."""
+        return [issue for issue in self._issues() if issue.severity == 'error']
+
+    @property
+    def warnings(self) -> List[Issue]:
+        return [issue for issue in self._issues() if issue.severity == 'warning']
+
+    @property
+    def index(self) -> Dict[str, Dict[str, List[str]]]:
+        return {'prev': self.prev, 'next': self.next}
+
+    @property
+    def graph(self) -> CompiledGraph:
+        """IR compilada do documento atual (montada sob demanda)."""
+        if self._graph is None:
+            self._graph = CompiledGraph(self.data)
+        return self._graph
+
+    def compiled(self) -> Dict[str, Any]:
+        """Equivalente a `compile_sff(session.data)`."""
+        issues = self._issues()
+        return {
+            'graph': self.graph,
+            'index': IndexView(self.graph),
+            'validation': {'errors': [i for i in issues if i.severity == 'error'],
+                           'warnings': [i for i in issues if i.severity == 'warning']},
+        }
+
+    @property
+    def ranks(self) -> Dict[str, int]:
+        """Ranks de todos os nós (iguais a `generate_layout(...)['ranks']`)."""
+        self._ensure_ranks()
+        return self._ranks
+
+    def layout(
+        self,
+        order_method: str = DEFAULT_ORDER_METHOD,
+        order_iterations: int = DEFAULT_ORDER_ITERATIONS,
+        order_time_budget: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        """Equivalente a `generate_layout(session.data, compiled, rank_mode, ...)`."""
+        if self.data.get('entry', {}).get('start') is None:
+            return {"ranks": {}, "positions": {}, "routing": {}}
+        graph = self.graph
+        back = self._ensure_ranks()
+        if back is None:
+            back = bytearray(graph.num_edges)
+        rank_array = array('i', [self._ranks[node_id] for node_id in graph.node_ids])
+        return layout_from_ranks(self.data, graph, rank_array, back, self.rank_mode,
+                                 order_method, order_iterations, order_time_budget)
+
+    # ------------------------------------------------------------------
+    # Regras
+
+    def _issues(self) -> List[Issue]:
+        """Problemas de todas as regras registradas, na ordem de registro (como `run_rules` sem limite)."""
+        issues: List[Issue] = []
+        failed: Set[str] = set()
+        skipped: Set[str] = set()
+        ctx = None
+        for rule in registered_rules():
+            if any(d in failed or d in skipped for d in rule.requires):
+                skipped.add(rule.name)
+                continue
+            if _NATIVE.get(rule.name) is rule:
+                items = getattr(self, _INCREMENTAL[rule.name])()
+            else:
+                ctx = ctx or RuleContext(self.data, self.graph)
+                items = rule.check(ctx)
+            for item in items:
+                if not isinstance(item, Issue):
+                    item = Issue(item[0], rule.code, item[1], rule.severity, rule.name)
+                if item.severity == 'error':
+                    failed.add(rule.name)
+                issues.append(item)
+        return issues
+
+    def _sorted(self, node_ids) -> List[str]:
+        return sorted(node_ids, key=self._order.__getitem__)
+
+    def _dangling_issues(self):
+        # A sessão recusa edges para nós inexistentes
+        return ()
+
+    def _start_issues(self):
+        start_nodes = self._sorted(self._by_type['start'])
+        if len(start_nodes) != 1:
+            yield "Deve existir exatamente 1 nó do tipo 'start'.", None
+        elif self.data.get('entry', {}).get('start') != start_nodes[0]:
+            start = self.data.get('entry', {}).get('start')
+            yield f"O entry.start ('{start}') deve ser o nó do tipo 'start' ('{start_nodes[0]}').", start_nodes[0]
+
+    def _end_issues(self):
+        end_nodes = self._sorted(self._by_type['end'])
+        if not end_nodes:
+            yield "Deve existir pelo menos 1 nó do tipo 'end'.", None
+            return
+        entry_ends = set(self.data.get('entry', {}).get('ends', []))
+        for node_id in end_nodes:
+            if node_id not in entry_ends:
+                yield f"Nó 'end' ('{node_id}') não está listado em entry.ends.", node_id
+
+    def _start_in_issues(self):
+        start_nodes = self._sorted(self._by_type['start'])
+        if start_nodes and self.prev[start_nodes[0]]:
+            yield f"Nó 'start' ('{start_nodes[0]}') não pode ter edges de entrada.", start_nodes[0]
+
+    def _end_out_issues(self):
+        for node_id in self._sorted(self._by_type['end']):
+            if self.next[node_id]:
+                yield f"Nó 'end' ('{node_id}') não pode ter edges de saída.", node_id
+
+    def _reach_issues(self):
+        if self._by_type['start']:
+            for node_id in self._sorted(self._unreachable):
+                yield f"Nó '{node_id}' não é alcançável a partir do start.", node_id
+
+    def _isolated_issues(self):
+        for node_id in self._sorted(self._isolated):
+            yield f"Nó '{node_id}' está isolado (sem entrada e sem saída).", node_id
+
+    def _decision_issues(self):
+        for node_id in self._sorted(self._decision_errors):
+            for message in self._decision_errors[node_id]:
+                yield message, node_id
+
+    def _subflow_issues(self):
+        nodes = self.data['nodes']
+        for node_id in self._sorted(self._by_type['subflow']):
+            ref = nodes[node_id].get('subflow')
+            if not isinstance(ref, dict) or not isinstance(ref.get('file'), str) or not ref['file']:
+                yield f"Subflow '{node_id}' deve ter subflow.file.", node_id
+
+    def _main_path_issues(self):
+        if 'mainPath' not in self.data.get('sff', {}):
+            yield 'Nenhum caminho principal (mainPath) definido.', None
+
+    # ------------------------------------------------------------------
+    # Internos
+
+    def _register_node(self, node_id: str, node: Dict[str, Any]):
+        self._order[node_id] = self._seq
+        self._seq += 1
+        self.prev[node_id] = []
+        self.next[node_id] = []
+        self._out[node_id] = []
+        self._in[node_id] = []
+        self._isolated.add(node_id)
+        node_type = node.get('type')
+        if node_type in self._by_type:
+            self._by_type[node_type].add(node_id)
+        if node_type == 'decision':
+            for branch in (node.get('branches') or {}).values():
+                if isinstance(branch, dict):
+                    self._branch_refs.setdefault(branch.get('next'), set()).add(node_id)
+
+    def _invalidate(self):
+        self._graph = None
+
+    def _link(self, edge: Dict[str, Any]):
+        u, v = edge['from'], edge['to']
+        self.next[u].append(v)
+        self.prev[v].append(u)
+        self._out[u].append(edge)
+        self._in[v].append(edge)
+        self._isolated.discard(u)
+        self._isolated.discard(v)
+
+    def _remove_edge(self, edge: Dict[str, Any]):
+        # Edges iguais são indistinguíveis no documento: remover a primeira
+        # ocorrência igual dá o mesmo resultado de uma recompilação
+        self.data['edges'].remove(edge)
+        self._invalidate()
+        u, v = edge['from'], edge['to']
+        # prev/next seguem posição a posição as listas de edges por nó
+        k = _position(self._out[u], edge)
+        del self._out[u][k]
+        del self.next[u][k]
+        k = _position(self._in[v], edge)
+        del self._in[v][k]
+        del self.prev[v][k]
+        for node_id in (u, v):
+            if not self.prev[node_id] and not self.next[node_id]:
+                self._isolated.add(node_id)
+        if u in self._by_type['decision']:
+            self._check_decision(u)
+        if v in self._reachable:
+            self._shrink_reachability(v)
+        if not self._ranks_dirty:
+            if not self._acyclic:
+                self._ranks_dirty = True
+            else:
+                self._rerank_downstream(v)
+
+    def _check_decision(self, node_id: str):
+        """Regra 7 para uma decision (mesmas mensagens de validate_sff_logic)."""
+        nodes = self.data['nodes']
+        branches = nodes[node_id].get('branches', {})
+        errors = []
+        if 'true' not in branches or 'false' not in branches:
+            errors.append(f"Decision '{node_id}' deve ter branches 'true' e 'false'.")
+        for branch_key in ['true', 'false']:
+            if branch_key in branches:
+                next_id = branches[branch_key].get('next')
+                if next_id not in nodes:
+                    errors.append(f"Decision '{node_id}' branch '{branch_key}' aponta para nó inexistente '{next_id}'.")
+                found = next_id in nodes and any(
+                    edge['to'] == next_id and edge.get('branch') == branch_key
+                    for edge in self._out[node_id]
+                )
+                if not found:
+                    errors.append(f"Decision '{node_id}' branch '{branch_key}' não possui edge coerente para '{next_id}'.")
+        if errors:
+            self._decision_errors[node_id] = errors
+        else:
+            self._decision_errors.pop(node_id, None)
+
+    def _recompute_reachability(self):
+        self._reachable = set()
+        self._unreachable = set(self._order)
+        start = self.data.get('entry', {}).get('start')
+        if start in self.data['nodes']:
+            self._mark_reachable_from([start])
+
+    def _mark_reachable_from(self, seeds: List[str]):
+        reachable = self._reachable
+        unreachable = self._unreachable
+        stack = [s for s in seeds if s not in reachable]
+        reachable.update(stack)
+        unreachable.difference_update(stack)
+        while stack:
+            node_id = stack.pop()
+            for j in self.next[node_id]:
+                if j not in reachable:
+                    reachable.add(j)
+                    unreachable.discard(j)
+                    stack.append(j)
+
+    def _downstream(self, root: str, within: Optional[Set[str]] = None) -> List[str]:
+        seen = {root}
+        region = [root]
+        for node_id in region:
+            for j in self.next[node_id]:
+                if j not in seen and (within is None or j in within):
+                    seen.add(j)
+                    region.append(j)
+        return region
+
+    def _shrink_reachability(self, root: str):
+        """Refaz a alcançabilidade só na região a jusante de `root`."""
+        region = self._downstream(root, self._reachable)
+        self._reachable.difference_update(region)
+        self._unreachable.update(region)
+        start = self.data.get('entry', {}).get('start')
+        seeds = [n for n in region if n == start or any(p in self._reachable for p in self.prev[n])]
+        # Nós fora da região continuam alcançáveis; basta propagar a partir das sementes
+        self._mark_reachable_from(seeds)
+
+    def _reaches(self, source: str, target: str) -> bool:
+        stack = [source]
+        seen = {source}
+        while stack:
+            node_id = stack.pop()
+            if node_id == target:
+                return True
+            for j in self.next[node_id]:
+                if j not in seen:
+                    seen.add(j)
+                    stack.append(j)
+        return False
+
+    def _rerank_downstream(self, root: str):
+        """Longest-path restrito à região a jusante de `root` (Kahn na região)."""
+        ranks = self._ranks
+        preds = self.prev[root]
+        if ranks.get(root) == (max(ranks[p] for p in preds) + 1 if preds else 0):
+            # Rank da raiz não mudou: nada a jusante muda
+            return
+        region = self._downstream(root)
+        members = set(region)
+        indeg = {n: 0 for n in region}
+        for n in region:
+            for j in self.next[n]:
+                if j in members:
+                    indeg[j] += 1
+        queue = [n for n in region if indeg[n] == 0]
+        for n in queue:
+            preds = self.prev[n]
+            ranks[n] = max(ranks[p] for p in preds) + 1 if preds else 0
+            for j in self.next[n]:
+                if j in members:
+                    indeg[j] -= 1
+                    if indeg[j] == 0:
+                        queue.append(j)
+
+    def _ensure_ranks(self) -> Optional[bytearray]:
+        """Garante ranks válidos; devolve a máscara de back-edges quando recalculada."""
+        if not self._ranks_dirty:
+            return None
+        graph = self.graph
+        start = graph.node_index.get(self.data.get('entry', {}).get('start'))
+        rank_array, back = compute_ranks(graph, start, self.rank_mode)
+        self._ranks = dict(zip(graph.node_ids, rank_array))
+        # Incremental só para longest-path sem ciclos
+        self._acyclic = self.rank_mode == 'longest-path' and not any(back)
+        self._ranks_dirty = not self._acyclic
+        return back
+
+
+def _position(edges: List[Dict[str, Any]], edge: Dict[str, Any]) -> int:
+    """Posição de `edge` (por identidade, ou a primeira igual) em `edges`."""
+    for k, candidate in enumerate(edges):
+        if candidate is edge:
+            return k
+    return edges.index(edge)
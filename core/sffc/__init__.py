@@ -0,0 +1 @@
+# __init__.py para tornar o diretório sffc um pacote Python
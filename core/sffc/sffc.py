@@ -0,0 +1,358 @@
+"""
+core/sffc/sffc.py
+Formato binário compilado (.sffc): IR, layout e documento prontos para mmap.
+
+Layout do arquivo (little-endian, seções alinhadas em 8 bytes):
+- cabeçalho: `SFFC`, versão do formato, nº de seções e SHA-256 do conteúdo;
+- tabela de seções: nome, typecode (`array`), offset e nº de itens;
+- seções: `meta` (JSON pequeno: tabelas de lanes/tipos/branches, validação e
+  campos escalares do layout), `doc` (sff/entry/lanes/nodes/edges em JSON),
+  tabela de strings dos ids de nó (`ids_blob` + `ids_off`), colunas da IR
+  (`CompiledGraph`), ranks/posições por nó e routing em CSR de pontos.
+
+`load_compiled` mapeia o arquivo com mmap (somente leitura) e expõe as colunas
+como memoryviews sobre as páginas mapeadas: nada é copiado nem decodificado
+na carga, e processos que abrem o mesmo arquivo compartilham o page cache.
+Dicts (`layout`, `data`, índice prev/next) só são montados quando acessados.
+
+O `meta` guarda a versão do engine e do export que gravaram o arquivo. Um
+.sffc de outra versão (ranks, posições e roteamento de um engine antigo) é
+recusado na carga, como o cache recusa chaves de outra `ENGINE_VERSION`;
+`allow_stale=True` abre assim mesmo, marcando `stale`.
+"""
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from collections.abc import Sequence
+from typing import Any, Dict, List, Optional, Tuple
+
+from core.cache.cache import ENGINE_VERSION
+from core.compiler.graph import COLUMNS, CompiledGraph, IndexView
+from core.exporters.json_exporter import EXPORT_VERSION
+
+FORMAT_VERSION = 1
+SFFC_EXTENSION = '.sffc'
+
+_MAGIC = b'SFFC'
+_HEADER = struct.Struct('<4sHHI32s')
+_SECTION = struct.Struct('<16sc7xQQ')
+_ALIGN = 8
+_LITTLE = sys.byteorder == 'little'
+
+# Campos do layout guardados em colunas; no JSON de `meta` ficam como None
+_LAYOUT_COLUMNS = ('ranks', 'positions', 'routing', 'back_edges')
+
+
+class StringTable(Sequence):
+    """Sequência de strings UTF-8 decodificadas sob demanda a partir de blob + offsets."""
+
+    def __init__(self, blob: memoryview, offsets):
+        self._blob = blob
+        self._offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        return str(self._blob[self._offsets[i]:self._offsets[i + 1]], 'utf-8')
+
+    def __iter__(self):
+        blob = self._blob
+        offsets = self._offsets
+        for i in range(len(offsets) - 1):
+            yield str(blob[offsets[i]:offsets[i + 1]], 'utf-8')
+
+
+def _column(typecode: str, values) -> array:
+    if isinstance(values, array) and values.typecode == typecode:
+        return values
+    return array(typecode, values)
+
+
+def _string_table(values) -> Tuple[bytes, array]:
+    encoded = [v.encode('utf-8') for v in values]
+    offsets = array('q', [0]) * (len(encoded) + 1)
+    total = 0
+    for i, raw in enumerate(encoded):
+        total += len(raw)
+        offsets[i + 1] = total
+    return b''.join(encoded), offsets
+
+
+def _layout_sections(graph, layout) -> Tuple[Dict[str, Any], List[Tuple[str, str, Any]]]:
+    """Colunas do layout por índice de nó + o restante (escalares) para `meta`."""
+    ids = graph.node_ids
+    n = len(ids)
+    node_index = graph.node_index
+    ranks = layout.get('ranks', {})
+    if list(ranks) != list(ids):
+        raise ValueError("ranks do layout não seguem a ordem dos nós da IR")
+    positions = layout.get('positions', {})
+    pos_x = array('i', [0]) * n
+    pos_y = array('i', [0]) * n
+    pos_mask = bytearray(n)
+    for node_id, (x, y) in positions.items():
+        i = node_index[node_id]
+        pos_x[i], pos_y[i], pos_mask[i] = x, y, 1
+    if [ids[i] for i in range(n) if pos_mask[i]] != list(positions):
+        raise ValueError("positions do layout não seguem a ordem dos nós da IR")
+    routing = layout.get('routing', {})
+    stats = layout.get('routing_stats')
+    bends_map = stats.get('bends', {}) if stats else {}
+    route_src = array('i')
+    route_dst = array('i')
+    route_off = array('i', [0])
+    route_xy = array('d')
+    bends = array('i')
+    for (a, b), segments in routing.items():
+        route_src.append(node_index[a])
+        route_dst.append(node_index[b])
+        if segments:
+            route_xy.extend(segments[0][0])
+            for p, q in segments:
+                route_xy.extend(q)
+        route_off.append(len(route_xy) // 2)
+        bends.append(bends_map.get((a, b), 0))
+    if stats is not None and list(bends_map) != list(routing):
+        raise ValueError("bends do layout não seguem as chaves de routing")
+    back = layout.get('back_edges', [])
+    scalars = {k: (None if k in _LAYOUT_COLUMNS else v) for k, v in layout.items()}
+    if stats is not None:
+        scalars['routing_stats'] = dict(stats, bends=None)
+    sections = [
+        ('ranks', 'i', _column('i', ranks.values())),
+        ('pos_x', 'i', pos_x),
+        ('pos_y', 'i', pos_y),
+        ('pos_mask', 'B', pos_mask),
+        ('route_src', 'i', route_src),
+        ('route_dst', 'i', route_dst),
+        ('route_off', 'i', route_off),
+        ('route_xy', 'd', route_xy),
+        ('bends', 'i', bends),
+        ('back_src', 'i', array('i', [node_index[a] for a, _ in back])),
+        ('back_dst', 'i', array('i', [node_index[b] for _, b in back])),
+    ]
+    return scalars, sections
+
+
+def _sections(data, compiled, layout) -> List[Tuple[str, str, Any]]:
+    graph = compiled['graph']
+    meta = {
+        'engine_version': ENGINE_VERSION,
+        'export_version': EXPORT_VERSION,
+        'num_nodes': graph.num_nodes,
+        'num_edges': graph.num_edges,
+        'lane_ids': list(graph.lane_ids),
+        'type_ids': list(graph.type_ids),
+        'branch_ids': list(graph.branch_ids),
+        'validation': compiled['validation'],
+        'layout': None,
+    }
+    sections = []
+    if layout is not None:
+        meta['layout'], sections = _layout_sections(graph, layout)
+    doc = {k: data.get(k, default) for k, default in
+           (('sff', {}), ('entry', {}), ('lanes', {}), ('nodes', {}), ('edges', []))}
+    blob, offsets = _string_table(graph.node_ids)
+    head = [
+        ('meta', 'B', json.dumps(meta, ensure_ascii=False, separators=(',', ':')).encode('utf-8')),
+        ('doc', 'B', json.dumps(doc, ensure_ascii=False, separators=(',', ':')).encode('utf-8')),
+        ('ids_blob', 'B', blob),
+        ('ids_off', 'q', offsets),
+    ]
+    head.extend((name, tc, _column(tc, getattr(graph, name))) for name, tc in COLUMNS)
+    return head + sections
+
+
+def export_sffc(data, compiled, layout) -> bytes:
+    """Serializa documento + IR compilada + layout (ou None) no formato .sffc."""
+    sections = _sections(data, compiled, layout)
+    header_size = _HEADER.size + _SECTION.size * len(sections)
+    table = []
+    chunks = []
+    offset = -header_size % _ALIGN + header_size
+    for name, typecode, values in sections:
+        if isinstance(values, array) and not _LITTLE:
+            values = array(typecode, values)
+            values.byteswap()
+        raw = bytes(values)
+        table.append(_SECTION.pack(name.encode('ascii'), typecode.encode('ascii'), offset, len(values)))
+        pad = -len(raw) % _ALIGN
+        chunks.append(raw + b'\0' * pad)
+        offset += len(raw) + pad
+    body = b''.join(chunks)
+    digest = hashlib.sha256(body).digest()
+    header = _HEADER.pack(_MAGIC, FORMAT_VERSION, 0, len(sections), digest) + b''.join(table)
+    return header + b'\0' * (-len(header) % _ALIGN) + body
+
+
+def write_sffc(data, compiled, layout, sink) -> int:
+    """Escreve o .sffc em um sink binário; retorna o nº de bytes."""
+    payload = export_sffc(data, compiled, layout)
+    sink.write(payload)
+    return len(payload)
+
+
+def sibling_path(out_path: str) -> str:
+    """Caminho do .sffc ao lado de um export (ex.: fluxo.json → fluxo.sffc)."""
+    return os.path.splitext(out_path)[0] + SFFC_EXTENSION
+
+
+class CompiledFlow:
+    """Fluxo compilado carregado de um .sffc (colunas em memoryviews sobre o mmap).
+
+    `compiled` tem o mesmo formato de `compile_sff` e `layout` o de
+    `generate_layout` (None se o arquivo foi gravado sem layout); ambos, e
+    `data`, são montados só no primeiro acesso. Use `close()` ou `with`.
+    `stale` indica um arquivo de outra versão do engine/export (só com
+    `allow_stale=True`).
+    """
+
+    def __init__(self, path: str, verify: bool = False, allow_stale: bool = False):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mmap)
+        self._views: List[memoryview] = []
+        try:
+            self._sections = self._read_header(verify)
+            self.meta = json.loads(str(self._bytes('meta'), 'utf-8'))
+            written = (self.meta.get('engine_version'), self.meta.get('export_version'))
+            self.stale = written != (ENGINE_VERSION, EXPORT_VERSION)
+            if self.stale and not allow_stale:
+                raise ValueError(f"{self.path}: .sffc gravado pelo engine {written[0]} (export {written[1]}); "
+                                 f"o atual é {ENGINE_VERSION} (export {EXPORT_VERSION}). Gere o arquivo de novo.")
+        except Exception:
+            self.close()
+            raise
+        self.graph = CompiledGraph.from_columns(
+            StringTable(self._bytes('ids_blob'), self.column('ids_off')),
+            self.meta['lane_ids'], self.meta['type_ids'], self.meta['branch_ids'],
+            {name: self.column(name) for name, _ in COLUMNS},
+        )
+        self._data: Optional[Dict[str, Any]] = None
+        self._layout: Optional[Dict[str, Any]] = None
+
+    def _read_header(self, verify: bool) -> Dict[str, Tuple[str, int, int]]:
+        view = self._view
+        if len(view) < _HEADER.size:
+            raise ValueError(f"{self.path}: arquivo .sffc truncado")
+        magic, version, _, count, digest = _HEADER.unpack_from(view, 0)
+        if magic != _MAGIC:
+            raise ValueError(f"{self.path}: não é um arquivo .sffc")
+        if version != FORMAT_VERSION:
+            raise ValueError(f"{self.path}: versão do .sffc {version} não suportada (esperada {FORMAT_VERSION})")
+        sections = {}
+        body_start = None
+        for k in range(count):
+            name, typecode, offset, length = _SECTION.unpack_from(view, _HEADER.size + k * _SECTION.size)
+            name = name.rstrip(b'\0').decode('ascii')
+            typecode = typecode.decode('ascii')
+            if offset + length * array(typecode).itemsize > len(view):
+                raise ValueError(f"{self.path}: seção {name} fora do arquivo")
+            sections[name] = (typecode, offset, length)
+            body_start = offset if body_start is None else min(body_start, offset)
+        if verify and hashlib.sha256(view[body_start or len(view):]).digest() != digest:
+            raise ValueError(f"{self.path}: digest do .sffc não confere")
+        return sections
+
+    def _bytes(self, name: str) -> memoryview:
+        _, offset, length = self._sections[name]
+        view = self._view[offset:offset + length]
+        self._views.append(view)
+        return view
+
+    def has_section(self, name: str) -> bool:
+        return name in self._sections
+
+    def column(self, name: str):
+        """Coluna numérica sem cópia (memoryview; cópia em `array` em hosts big-endian)."""
+        typecode, offset, length = self._sections[name]
+        raw = self._view[offset:offset + length * array(typecode).itemsize]
+        if not _LITTLE:
+            values = array(typecode, bytes(raw))
+            values.byteswap()
+            return values
+        view = raw.cast(typecode)
+        self._views.extend((raw, view))
+        return view
+
+    @property
+    def data(self) -> Dict[str, Any]:
+        """Documento original (sff/entry/lanes/nodes/edges)."""
+        if self._data is None:
+            self._data = json.loads(str(self._bytes('doc'), 'utf-8'))
+        return self._data
+
+    @property
+    def compiled(self) -> Dict[str, Any]:
+        return {
+            'graph': self.graph,
+            'index': IndexView(self.graph),
+            'validation': self.meta['validation'],
+        }
+
+    @property
+    def layout(self) -> Optional[Dict[str, Any]]:
+        if self._layout is None and self.meta['layout'] is not None:
+            self._layout = self._build_layout()
+        return self._layout
+
+    def _build_layout(self) -> Dict[str, Any]:
+        ids = self.graph.node_ids
+        names = list(ids)
+        pos_x, pos_y, pos_mask = self.column('pos_x'), self.column('pos_y'), self.column('pos_mask')
+        route_off, route_xy = self.column('route_off'), self.column('route_xy')
+        route_keys = [(names[a], names[b]) for a, b in zip(self.column('route_src'), self.column('route_dst'))]
+        routing = {}
+        for r, key in enumerate(route_keys):
+            start, end = route_off[r], route_off[r + 1]
+            points = [(route_xy[2 * p], route_xy[2 * p + 1]) for p in range(start, end)]
+            routing[key] = list(zip(points, points[1:]))
+        columns = {
+            'ranks': dict(zip(names, self.column('ranks'))),
+            'positions': {names[i]: (pos_x[i], pos_y[i]) for i in range(len(names)) if pos_mask[i]},
+            'routing': routing,
+            'back_edges': [(names[a], names[b]) for a, b in zip(self.column('back_src'), self.column('back_dst'))],
+        }
+        layout = {}
+        for key, value in self.meta['layout'].items():
+            layout[key] = columns[key] if key in _LAYOUT_COLUMNS else value
+        stats = layout.get('routing_stats')
+        if stats is not None:
+            layout['routing_stats'] = dict(stats, bends=dict(zip(route_keys, self.column('bends'))))
+        return layout
+
+    def close(self):
+        """Libera as views e o mmap (views ainda referenciadas fora daqui adiam o fechamento)."""
+        for view in reversed(self._views):
+            view.release()
+        self._views.clear()
+        self._view.release()
+        try:
+            self._mmap.close()
+        except BufferError:
+            pass
+
+    def __enter__(self) -> 'CompiledFlow':
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def load_compiled(path: str, verify: bool = False, allow_stale: bool = False) -> CompiledFlow:
+    """Abre um .sffc sem copiar as colunas; `verify=True` confere o SHA-256 do conteúdo.
+
+    Arquivos de outra versão do engine/export levantam ValueError, a menos
+    que `allow_stale=True` (aí `flow.stale` fica True).
+    """
+    return CompiledFlow(path, verify, allow_stale)
@@ -0,0 +1,299 @@
+"""
+core/validator/rules.py
+Motor de regras da validação lógica: registro, ordem por custo, dependências e limites.
+
+Cada regra é um `Rule`:
+- `code` (ex.: `SFF005`) e `severity` (`error`/`warning`) vão para os `Issue`
+  que ela produz;
+- `cost`: estimativa relativa (1 = olha entry, tipos ou graus; 2 = percorre
+  todos os nós; 3 = busca no grafo). As mais baratas rodam antes, então
+  `max_errors`/`fail_fast` param antes das buscas caras;
+- `requires`: regras que precisam ter rodado sem erro. Se alguma falhou ou
+  foi pulada, a regra também é pulada (ex.: alcançabilidade não roda com
+  edges pendentes);
+- `group`: regras do mesmo grupo rodam juntas no mesmo worker na validação
+  paralela;
+- `check(ctx)`: gerador de `(mensagem, id do nó)` (ou de `Issue`); o motor
+  para de consumir quando atinge o limite de erros.
+
+Os problemas saem na ordem de registro das regras, qualquer que seja a ordem
+de execução: sem limite, a lista é a mesma de uma execução sequencial.
+
+Em grafos com `PARALLEL_MIN_NODES` nós ou mais, as regras de custo 3 de
+grupos diferentes rodam em processos criados por fork: o grafo é herdado sem
+cópia e só os problemas voltam serializados. Sem fork (ex.: Windows), tudo
+roda em sequência.
+
+Regras de terceiros entram por `register_rule(Rule(...))`.
+"""
+import os
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from core.compiler.graph import CompiledGraph
+from core.profiler.profiler import annotate, phase
+
+SEVERITIES = ('error', 'warning')
+PARALLEL_MIN_NODES = 500_000
+PARALLEL_MIN_COST = 3
+
+
+def error_limit(max_errors: Optional[int], fail_fast: bool = False) -> Optional[int]:
+    """Limite de erros efetivo (`fail_fast` equivale a 1); None = sem limite.
+
+    `max_errors` menor que 1 desligaria a validação em silêncio (nenhuma regra
+    roda e a lista sai vazia), então levanta ValueError.
+    """
+    if max_errors is not None and max_errors < 1:
+        raise ValueError(f"max_errors deve ser pelo menos 1 (recebido: {max_errors})")
+    return 1 if fail_fast else max_errors
+
+
+class Issue(str):
+    """Problema de validação: a própria mensagem, com `code`, `node`, `severity` e `rule`.
+
+    Por ser uma str, as listas de erros continuam valendo onde já eram usadas
+    (CLI, export JSON, `.sffc`, servidor); `to_dict` dá a forma estruturada.
+    """
+
+    def __new__(cls, message: str, code: str, node: Optional[str] = None, severity: str = 'error', rule: Optional[str] = None):
+        issue = super().__new__(cls, message)
+        issue.code = code
+        issue.node = node
+        issue.severity = severity
+        issue.rule = rule
+        return issue
+
+    def __reduce__(self):
+        return (Issue, (str(self), self.code, self.node, self.severity, self.rule))
+
+    def prefixed(self, prefix: str) -> 'Issue':
+        """Mesmo problema com `prefix` na mensagem (ex.: arquivo do módulo)."""
+        return Issue(prefix + str(self), self.code, self.node, self.severity, self.rule)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'code': self.code, 'severity': self.severity, 'node': self.node, 'rule': self.rule, 'message': str(self)}
+
+
+class Rule:
+    """Regra da validação lógica (ver o docstring do módulo)."""
+
+    __slots__ = ('name', 'code', 'check', 'cost', 'requires', 'group', 'severity')
+
+    def __init__(
+        self,
+        name: str,
+        code: str,
+        check: Callable[['RuleContext'], Iterable[Any]],
+        cost: int = 2,
+        requires: Sequence[str] = (),
+        group: Optional[str] = None,
+        severity: str = 'error',
+    ):
+        if severity not in SEVERITIES:
+            raise ValueError(f"Severidade inválida: {severity} (use {', '.join(SEVERITIES)})")
+        self.name = name
+        self.code = code
+        self.check = check
+        self.cost = cost
+        self.requires = tuple(requires)
+        self.group = group or name
+        self.severity = severity
+
+
+class RuleContext:
+    """Dados compartilhados pelas regras de uma validação: documento, IR e consultas memorizadas."""
+
+    __slots__ = ('data', 'graph', 'nodes', 'entry', 'ids', '_types')
+
+    def __init__(self, data: Dict[str, Any], graph: CompiledGraph):
+        self.data = data
+        self.graph = graph
+        self.nodes = data.get('nodes', {})
+        self.entry = data.get('entry', {})
+        self.ids = graph.node_ids
+        self._types: Dict[str, List[int]] = {}
+
+    def of_type(self, type_name: str) -> List[int]:
+        """`graph.nodes_of_type`, calculado uma vez por validação."""
+        found = self._types.get(type_name)
+        if found is None:
+            found = self._types[type_name] = self.graph.nodes_of_type(type_name)
+        return found
+
+
+_RULES: Dict[str, Rule] = {}
+
+
+def register_rule(rule: Rule, replace: bool = False):
+    """Registra uma regra; as dependências precisam já estar registradas."""
+    if rule.name in _RULES and not replace:
+        raise ValueError(f"Regra já registrada: {rule.name}")
+    missing = [name for name in rule.requires if name not in _RULES]
+    if missing:
+        raise ValueError(f"Regra '{rule.name}' depende de regras não registradas: {', '.join(missing)}")
+    _RULES[rule.name] = rule
+
+
+def registered_rules() -> List[Rule]:
+    """Regras na ordem de registro (a ordem dos problemas na saída)."""
+    return list(_RULES.values())
+
+
+def _execution_order(rules: List[Rule]) -> List[Rule]:
+    """Ordem por custo; uma regra nunca fica antes das suas dependências."""
+    effective: Dict[str, int] = {}
+    for rule in rules:
+        effective[rule.name] = max([rule.cost] + [effective[d] for d in rule.requires if d in effective])
+    position = {rule.name: p for p, rule in enumerate(rules)}
+    return sorted(rules, key=lambda r: (effective[r.name], position[r.name]))
+
+
+def _run_rule(rule: Rule, ctx: RuleContext, limit: Optional[int]) -> Tuple[List[Issue], bool]:
+    """(problemas, interrompida): consome o gerador da regra até `limit` erros."""
+    issues: List[Issue] = []
+    errors = 0
+    with phase(rule.name, cat='rule') as span:
+        for item in rule.check(ctx):
+            if not isinstance(item, Issue):
+                message, node = item
+                item = Issue(message, rule.code, node, rule.severity, rule.name)
+            issues.append(item)
+            if item.severity == 'error':
+                errors += 1
+                if limit is not None and errors >= limit:
+                    span.set(issues=len(issues), limited=True)
+                    return issues, True
+        span.set(issues=len(issues))
+    return issues, False
+
+
+# Contexto e regras herdados pelos workers no fork (não são serializados)
+_FORK_STATE: Optional[Tuple[RuleContext, Dict[str, Rule]]] = None
+
+
+def _run_group(names: List[str], limit: Optional[int]) -> List[Tuple[str, List[Issue], bool]]:
+    ctx, by_name = _FORK_STATE
+    results = []
+    for name in names:
+        issues, limited = _run_rule(by_name[name], ctx, limit)
+        results.append((name, issues, limited))
+        if limited:
+            break
+    return results
+
+
+def _available_cpus() -> int:
+    """CPUs que o processo pode usar (afinidade, quando o sistema informa)."""
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def _run_parallel(batch: List[Rule], ctx: RuleContext, limit: Optional[int]) -> List[Tuple[str, List[Issue], bool]]:
+    """Roda um lote de regras caras: um worker por grupo (no próprio processo se só há um grupo ou uma CPU)."""
+    global _FORK_STATE
+    groups: Dict[str, List[str]] = {}
+    for rule in batch:
+        groups.setdefault(rule.group, []).append(rule.name)
+    workers = min(len(groups), _available_cpus())
+    _FORK_STATE = (ctx, {rule.name: rule for rule in batch})
+    if workers < 2:
+        try:
+            return _run_group([rule.name for rule in batch], limit)
+        finally:
+            _FORK_STATE = None
+    # Import tardio: multiprocessing e concurrent.futures só pesam na partida da CLI
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+    results = []
+    try:
+        with phase('rules_parallel', cat='rule', groups=len(groups), workers=workers), \
+                ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('fork')) as pool:
+            for part in pool.map(_run_group, groups.values(), [limit] * len(groups)):
+                results.extend(part)
+    finally:
+        _FORK_STATE = None
+    return results
+
+
+def run_rules(
+    data: Dict[str, Any],
+    graph: CompiledGraph,
+    rules: Optional[List[Rule]] = None,
+    max_errors: Optional[int] = None,
+    fail_fast: bool = False,
+    parallel: Optional[bool] = None,
+) -> Dict[str, Any]:
+    """Roda as regras (padrão: todas as registradas) sobre o documento e a IR.
+
+    `fail_fast` equivale a `max_errors=1`. `parallel=None` decide pelo
+    tamanho do grafo (`PARALLEL_MIN_NODES`). Retorna `issues` (na ordem de
+    registro das regras), `skipped` (regras puladas por dependência ou pelo
+    limite) e `limited` (se o limite de erros foi atingido). `max_errors`
+    menor que 1 levanta ValueError.
+    """
+    rules = registered_rules() if rules is None else rules
+    limit = error_limit(max_errors, fail_fast)
+    if parallel is None:
+        parallel = graph.num_nodes >= PARALLEL_MIN_NODES
+    if parallel:
+        import multiprocessing
+        parallel = 'fork' in multiprocessing.get_all_start_methods()
+    ctx = RuleContext(data, graph)
+    state = {'found': {}, 'failed': set(), 'errors': 0, 'limited': False}
+    skipped: List[str] = []
+    found: Dict[str, List[Issue]] = state['found']
+
+    def record(results: List[Tuple[str, List[Issue], bool]]):
+        for name, issues, hit in results:
+            found[name] = issues
+            count = sum(1 for issue in issues if issue.severity == 'error')
+            if count:
+                state['failed'].add(name)
+            state['errors'] += count
+            if hit or (limit is not None and state['errors'] >= limit):
+                state['limited'] = True
+
+    def remaining() -> Optional[int]:
+        return None if limit is None else limit - state['errors']
+
+    # Regras caras de grupos diferentes esperam em lote até que alguma regra dependa delas
+    batch: List[Rule] = []
+
+    def flush():
+        if batch:
+            if not state['limited']:
+                record(_run_parallel(batch, ctx, remaining()))
+            skipped.extend(rule.name for rule in batch if rule.name not in found)
+            batch.clear()
+
+    for rule in _execution_order(rules):
+        if any(d in (rule_.name for rule_ in batch) for d in rule.requires):
+            flush()
+        if state['limited'] or any(d in state['failed'] or d in skipped for d in rule.requires):
+            skipped.append(rule.name)
+        elif parallel and rule.cost >= PARALLEL_MIN_COST:
+            batch.append(rule)
+        else:
+            record([(rule.name,) + _run_rule(rule, ctx, remaining())])
+    flush()
+    issues = [issue for rule in rules if rule.name in found for issue in found[rule.name]]
+    if limit is not None and state['errors'] > limit:
+        # No lote paralelo cada grupo respeita o limite sozinho: corta o excedente pela ordem de execução
+        issues = _cap(issues, [rule.name for rule in _execution_order(rules)], limit)
+    annotate(rules=len(found), skipped=len(skipped), limited=state['limited'])
+    return {'issues': issues, 'skipped': skipped, 'limited': state['limited']}
+
+
+def _cap(issues: List[Issue], order: List[str], limit: int) -> List[Issue]:
+    """Os primeiros `limit` erros pela ordem de execução (mais os avisos), na ordem original."""
+    rank = {name: p for p, name in enumerate(order)}
+    keep = set()
+    errors = 0
+    for p in sorted(range(len(issues)), key=lambda p: rank.get(issues[p].rule, len(rank))):
+        if issues[p].severity != 'error':
+            keep.add(p)
+        elif errors < limit:
+            keep.add(p)
+            errors += 1
+    return [issue for p, issue in enumerate(issues) if p in keep]
@@ -2,13 +2,17 @@
 core/validator/validator.py
 Valida estrutura obrigatória e regras do SFF.
 """
-from typing import Dict, Any, List, Set
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+from core.compiler.graph import CompiledGraph
+from core.profiler.profiler import annotate, instrumented
+from core.validator.rules import Issue, Rule, RuleContext, error_limit, register_rule, run_rules
 
 REQUIRED_BLOCKS = ["sff", "entry", "lanes", "nodes", "edges"]
 
 class ValidationError(Exception):
     pass
 
+@instrumented()
 def validate_sff_structure(data: Dict[str, Any]) -> List[str]:
     """Valida a presença dos blocos obrigatórios e retorna lista de erros."""
     errors = []
@@ -17,77 +21,269 @@ def validate_sff_structure(data: Dict[str, Any]) -> List[str]:
             errors.append(f"Bloco obrigatório ausente: {block}")
     return errors
 
-def validate_sff_logic(data: Dict[str, Any]) -> List[str]:
-    """Valida regras lógicas do SFF."""
-    errors = []
-    nodes = data.get("nodes", {})
-    edges = data.get("edges", [])
-    entry = data.get("entry", {})
+def validate_sff_stream(
+    events: Iterable[Tuple[str, Any, Any]],
+    fail_fast: bool = False,
+    max_errors: Optional[int] = None,
+) -> List[str]:
+    """Validação estrutural durante a leitura incremental (eventos de `iter_sff_events`).
+
+    Além dos blocos obrigatórios, confere a forma de cada nó e edge e se as
+    edges apontam para nós existentes, guardando apenas os ids dos nós.
+    Com `fail_fast` (ou ao chegar a `max_errors` erros), para de consumir os
+    eventos. `max_errors` menor que 1 levanta ValueError.
+    """
+    limit = error_limit(max_errors, fail_fast)
+    errors: List[str] = []
+    seen_blocks = set()
+    node_ids = set()
+    # Edges lidas antes de `nodes` só podem ser conferidas no fim
+    pending: List[Tuple[int, str]] = []
+    nodes_done = False
+    for kind, key, value in events:
+        found = []
+        if kind in ('block', 'open'):
+            if 'nodes' in seen_blocks and key != 'nodes':
+                nodes_done = True
+            seen_blocks.add(key)
+        elif kind == 'node':
+            if not isinstance(value, dict):
+                found.append(f"Nó '{key}' deve ser um objeto.")
+            node_ids.add(key)
+        elif kind == 'edge':
+            if not isinstance(value, dict) or not isinstance(value.get('from'), str) or not isinstance(value.get('to'), str):
+                found.append(f"Edge #{key} deve ter 'from' e 'to'.")
+            else:
+                for end in (value['from'], value['to']):
+                    if end in node_ids:
+                        continue
+                    if nodes_done:
+                        found.append(f"Edge #{key} aponta para nó inexistente '{end}'.")
+                    else:
+                        pending.append((key, end))
+        if found:
+            errors.extend(found)
+            if limit is not None and len(errors) >= limit:
+                return errors[:limit]
+    for key, end in pending:
+        if end not in node_ids:
+            errors.append(f"Edge #{key} aponta para nó inexistente '{end}'.")
+    missing = [f"Bloco obrigatório ausente: {block}" for block in REQUIRED_BLOCKS if block not in seen_blocks]
+    return (missing + errors)[:limit]
+
+
+# Regras lógicas do SFF (ordem de registro = ordem das mensagens; ver core.validator.rules)
+
+def _edges_existentes(ctx: RuleContext):
+    # 0. Edges com 'from' e 'to' apontando para nós existentes (as demais ficaram fora da IR)
+    for k in ctx.graph.dangling_edges:
+        edge = ctx.data['edges'][k]
+        if not isinstance(edge, dict) or not isinstance(edge.get('from'), str) or not isinstance(edge.get('to'), str):
+            yield f"Edge #{k} deve ter 'from' e 'to'.", None
+            continue
+        source = edge['from'] if edge['from'] in ctx.nodes else None
+        for end in (edge['from'], edge['to']):
+            if end not in ctx.nodes:
+                yield f"Edge #{k} aponta para nó inexistente '{end}'.", source
+
+
+def _start_unico(ctx: RuleContext):
     # 1. Exatamente 1 nó type=start e deve ser entry.start
-    start_nodes = [k for k, v in nodes.items() if v.get("type") == "start"]
+    start_nodes = ctx.of_type("start")
     if len(start_nodes) != 1:
-        errors.append("Deve existir exatamente 1 nó do tipo 'start'.")
-    else:
-        if entry.get("start") != start_nodes[0]:
-            errors.append(f"O entry.start ('{entry.get('start')}') deve ser o nó do tipo 'start' ('{start_nodes[0]}').")
+        yield "Deve existir exatamente 1 nó do tipo 'start'.", None
+    elif ctx.entry.get("start") != ctx.ids[start_nodes[0]]:
+        node_id = ctx.ids[start_nodes[0]]
+        yield f"O entry.start ('{ctx.entry.get('start')}') deve ser o nó do tipo 'start' ('{node_id}').", node_id
+
+
+def _ends_declarados(ctx: RuleContext):
     # 2. Pelo menos 1 nó type=end e todos devem estar em entry.ends
-    end_nodes = [k for k, v in nodes.items() if v.get("type") == "end"]
+    end_nodes = ctx.of_type("end")
     if not end_nodes:
-        errors.append("Deve existir pelo menos 1 nó do tipo 'end'.")
-    else:
-        entry_ends = set(entry.get("ends", []))
-        for eid in end_nodes:
-            if eid not in entry_ends:
-                errors.append(f"Nó 'end' ('{eid}') não está listado em entry.ends.")
+        yield "Deve existir pelo menos 1 nó do tipo 'end'.", None
+        return
+    entry_ends = set(ctx.entry.get("ends", []))
+    for i in end_nodes:
+        if ctx.ids[i] not in entry_ends:
+            yield f"Nó 'end' ('{ctx.ids[i]}') não está listado em entry.ends.", ctx.ids[i]
+
+
+def _start_sem_entrada(ctx: RuleContext):
     # 3. start não pode ter edges de entrada
-    if start_nodes:
-        incoming = [e for e in edges if e.get("to") == start_nodes[0]]
-        if incoming:
-            errors.append(f"Nó 'start' ('{start_nodes[0]}') não pode ter edges de entrada.")
+    start_nodes = ctx.of_type("start")
+    if start_nodes and ctx.graph.in_degree(start_nodes[0]):
+        node_id = ctx.ids[start_nodes[0]]
+        yield f"Nó 'start' ('{node_id}') não pode ter edges de entrada.", node_id
+
+
+def _end_sem_saida(ctx: RuleContext):
     # 4. end não pode ter edges de saída
-    for eid in end_nodes:
-        outgoing = [e for e in edges if e.get("from") == eid]
-        if outgoing:
-            errors.append(f"Nó 'end' ('{eid}') não pode ter edges de saída.")
-    # 5. Todos os nós devem ser alcançáveis a partir de entry.start
-    if start_nodes:
-        reachable = set()
-        def dfs(node_id):
-            if node_id in reachable:
-                return
-            reachable.add(node_id)
-            for e in edges:
-                if e.get("from") == node_id:
-                    dfs(e.get("to"))
-        dfs(entry.get("start"))
-        for node_id in nodes:
-            if node_id not in reachable:
-                errors.append(f"Nó '{node_id}' não é alcançável a partir do start.")
+    for i in ctx.of_type("end"):
+        if ctx.graph.out_degree(i):
+            yield f"Nó 'end' ('{ctx.ids[i]}') não pode ter edges de saída.", ctx.ids[i]
+
+
+def _alcancabilidade(ctx: RuleContext):
+    # 5. Todos os nós devem ser alcançáveis a partir de entry.start (DFS iterativa)
+    graph = ctx.graph
+    if not ctx.of_type("start"):
+        return
+    reachable = bytearray(len(ctx.ids))
+    start = graph.node_index.get(ctx.entry.get("start"))
+    if start is not None:
+        reachable[start] = 1
+        stack = [start]
+        offsets = graph.next_offsets
+        targets = graph.next_targets
+        while stack:
+            i = stack.pop()
+            for k in range(offsets[i], offsets[i + 1]):
+                j = targets[k]
+                if not reachable[j]:
+                    reachable[j] = 1
+                    stack.append(j)
+    for i, node_id in enumerate(ctx.ids):
+        if not reachable[i]:
+            yield f"Nó '{node_id}' não é alcançável a partir do start.", node_id
+
+
+def _nos_isolados(ctx: RuleContext):
     # 6. Não permitir nós isolados (sem prev e sem next)
-    prev = {k: [] for k in nodes}
-    next_ = {k: [] for k in nodes}
-    for e in edges:
-        prev[e["to"]].append(e["from"])
-        next_[e["from"]].append(e["to"])
-    for node_id in nodes:
-        if not prev[node_id] and not next_[node_id]:
-            errors.append(f"Nó '{node_id}' está isolado (sem entrada e sem saída).")
+    next_offsets = ctx.graph.next_offsets
+    prev_offsets = ctx.graph.prev_offsets
+    for i, node_id in enumerate(ctx.ids):
+        if next_offsets[i] == next_offsets[i + 1] and prev_offsets[i] == prev_offsets[i + 1]:
+            yield f"Nó '{node_id}' está isolado (sem entrada e sem saída).", node_id
+
+
+def _decisions_coerentes(ctx: RuleContext):
     # 7. Para decision boolean: branches.true/false obrigatórios, next deve existir, edges coerentes
-    for node_id, node in nodes.items():
-        if node.get("type") == "decision":
-            branches = node.get("branches", {})
-            if "true" not in branches or "false" not in branches:
-                errors.append(f"Decision '{node_id}' deve ter branches 'true' e 'false'.")
-            for branch_key in ["true", "false"]:
-                if branch_key in branches:
-                    next_id = branches[branch_key].get("next")
-                    if next_id not in nodes:
-                        errors.append(f"Decision '{node_id}' branch '{branch_key}' aponta para nó inexistente '{next_id}'.")
-                    # Edge coerente
-                    found = False
-                    for e in edges:
-                        if e.get("from") == node_id and e.get("to") == next_id and e.get("branch") == branch_key:
-                            found = True
-                    if not found:
-                        errors.append(f"Decision '{node_id}' branch '{branch_key}' não possui edge coerente para '{next_id}'.")
+    graph = ctx.graph
+    nodes = ctx.nodes
+    for i in ctx.of_type("decision"):
+        node_id = ctx.ids[i]
+        branches = nodes[node_id].get("branches", {})
+        if "true" not in branches or "false" not in branches:
+            yield f"Decision '{node_id}' deve ter branches 'true' e 'false'.", node_id
+        for branch_key in ["true", "false"]:
+            if branch_key in branches:
+                next_id = branches[branch_key].get("next")
+                if next_id not in nodes:
+                    yield f"Decision '{node_id}' branch '{branch_key}' aponta para nó inexistente '{next_id}'.", node_id
+                # Edge coerente: procura apenas nas edges de saída da decision
+                target = graph.node_index.get(next_id)
+                code = graph.branch_index.get(branch_key)
+                found = target is not None and code is not None and any(
+                    graph.edge_dst[k] == target and graph.edge_branch[k] == code
+                    for k in graph.out_edges(i)
+                )
+                if not found:
+                    yield f"Decision '{node_id}' branch '{branch_key}' não possui edge coerente para '{next_id}'.", node_id
+
+
+def _subflows_referenciados(ctx: RuleContext):
+    # 8. Subflow: referência ao arquivo do módulo (o contrato é conferido na ligação, ver core.linker)
+    for i in ctx.of_type("subflow"):
+        ref = ctx.nodes[ctx.ids[i]].get("subflow")
+        if not isinstance(ref, dict) or not isinstance(ref.get("file"), str) or not ref["file"]:
+            yield f"Subflow '{ctx.ids[i]}' deve ter subflow.file.", ctx.ids[i]
+
+
+def _caminho_principal(ctx: RuleContext):
+    # Aviso: sem mainPath declarado
+    if 'mainPath' not in ctx.data.get('sff', {}):
+        yield 'Nenhum caminho principal (mainPath) definido.', None
+
+
+# Regras nativas (a sessão de edição tem versões incrementais delas, ver core.session)
+LOGIC_RULES = (
+    Rule('edges_existentes', 'SFF000', _edges_existentes, cost=1),
+    Rule('start_unico', 'SFF001', _start_unico, cost=1),
+    Rule('ends_declarados', 'SFF002', _ends_declarados, cost=1),
+    Rule('start_sem_entrada', 'SFF003', _start_sem_entrada, cost=1, requires=('edges_existentes',)),
+    Rule('end_sem_saida', 'SFF004', _end_sem_saida, cost=1, requires=('edges_existentes',)),
+    Rule('alcancabilidade', 'SFF005', _alcancabilidade, cost=3, requires=('edges_existentes',), group='busca'),
+    Rule('nos_isolados', 'SFF006', _nos_isolados, cost=2, requires=('edges_existentes',)),
+    Rule('decisions_coerentes', 'SFF007', _decisions_coerentes, cost=3, requires=('edges_existentes',), group='decisions'),
+    Rule('subflows_referenciados', 'SFF008', _subflows_referenciados, cost=1),
+    Rule('caminho_principal', 'SFF009', _caminho_principal, cost=1, severity='warning'),
+)
+for _rule in LOGIC_RULES:
+    register_rule(_rule)
+
+
+def check_sff_logic(
+    data: Dict[str, Any],
+    graph: Optional[CompiledGraph] = None,
+    max_errors: Optional[int] = None,
+    fail_fast: bool = False,
+    parallel: Optional[bool] = None,
+) -> Dict[str, Any]:
+    """Roda as regras registradas; retorna `errors` e `warnings` (listas de `Issue`), `skipped` e `limited`.
+
+    `max_errors` para a validação ao atingir esse número de erros (as regras
+    mais baratas rodam antes); `fail_fast` para no primeiro. Regras que
+    dependem de uma regra com erro são puladas.
+    """
+    if graph is None:
+        graph = CompiledGraph(data)
+    annotate(nodes=graph.num_nodes, edges=graph.num_edges)
+    result = run_rules(data, graph, max_errors=max_errors, fail_fast=fail_fast, parallel=parallel)
+    issues = result['issues']
+    return {
+        'errors': [issue for issue in issues if issue.severity == 'error'],
+        'warnings': [issue for issue in issues if issue.severity == 'warning'],
+        'skipped': result['skipped'],
+        'limited': result['limited'],
+    }
+
+
+@instrumented()
+def validate_sff_logic(
+    data: Dict[str, Any],
+    graph: Optional[CompiledGraph] = None,
+    max_errors: Optional[int] = None,
+    fail_fast: bool = False,
+) -> List[Issue]:
+    """Valida regras lógicas do SFF em O(V+E) e retorna os erros (`Issue`: mensagem com código, nó e severidade).
+
+    Todas as regras consultam a IR compilada (`CompiledGraph`), montada aqui
+    ou reaproveitada de `compile_sff` via `graph`. Ver `check_sff_logic`.
+    """
+    return check_sff_logic(data, graph, max_errors, fail_fast)['errors']
+
+
+def validate_subflow_interface(graph: CompiledGraph, node_id: str, module_entry: Dict[str, Any]) -> List[Issue]:
+    """Confere um nó subflow contra o `entry` do módulo referenciado.
+
+    O módulo precisa declarar `entry.start` e `entry.ends`. Cada edge de saída
+    do nó escolhe, pelo `branch`, o end do módulo que continua por ela (sem
+    branch só quando o módulo tem um único end); todo end precisa de
+    exatamente uma edge. Os erros são `Issue` com código `SFF010`.
+    """
+    start = module_entry.get("start") if isinstance(module_entry, dict) else None
+    ends = module_entry.get("ends") if isinstance(module_entry, dict) else None
+    if not isinstance(start, str) or not isinstance(ends, list) or not ends:
+        return [Issue(f"Subflow '{node_id}': o módulo deve declarar entry.start e entry.ends.", 'SFF010', node_id)]
+    errors = []
+    mapped: Dict[str, int] = {}
+    for k in graph.out_edges(graph.node_index[node_id]):
+        branch = graph.branch_of(k)
+        target = graph.node_ids[graph.edge_dst[k]]
+        if branch is None and len(ends) == 1:
+            branch = ends[0]
+        if branch is None:
+            message = f"Subflow '{node_id}': edge para '{target}' sem branch; use um dos ends do módulo ({', '.join(ends)})."
+        elif branch not in ends:
+            message = f"Subflow '{node_id}': branch '{branch}' não é um end do módulo ({', '.join(ends)})."
+        else:
+            mapped[branch] = mapped.get(branch, 0) + 1
+            continue
+        errors.append(Issue(message, 'SFF010', node_id))
+    for end in ends:
+        if mapped.get(end, 0) > 1:
+            errors.append(Issue(f"Subflow '{node_id}': end '{end}' do módulo ligado a mais de uma edge.", 'SFF010', node_id))
+        elif end not in mapped:
+            errors.append(Issue(f"Subflow '{node_id}': end '{end}' do módulo não tem edge de saída.", 'SFF010', node_id))
     return errors
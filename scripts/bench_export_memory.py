@@ -0,0 +1,63 @@
+"""
+scripts/bench_export_memory.py
+Pico de memória dos exporters: string completa × escrita em streaming.
+
+Para cada tamanho de fluxo sintético mede, com tracemalloc, o pico alocado
+por `export_*` (monta a saída inteira) e por `write_*` em um sink nulo.
+Com streaming o pico deve ficar praticamente constante com o tamanho.
+
+Uso:
+    python scripts/bench_export_memory.py
+    python scripts/bench_export_memory.py --sizes 1000 10000 50000
+"""
+import argparse
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from core.compiler.compiler import compile_sff
+from core.layout.layout import generate_layout
+from core.exporters.mermaid_exporter import export_mermaid, write_mermaid
+from core.exporters.dot_exporter import export_dot, write_dot
+from core.exporters.json_exporter import export_json, write_json
+from bench_validator import make_flow
+
+
+class NullSink:
+    mode = 'wb'
+
+    def write(self, block):
+        return len(block)
+
+
+def peak_kib(fn) -> float:
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1] / 1024
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Pico de memória dos exporters')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 5000, 20000])
+    args = parser.parse_args()
+    print(f"{'nós':>8} {'formato':>8} {'string KiB':>12} {'stream KiB':>12}")
+    for n in args.sizes:
+        data = make_flow(n)
+        compiled = compile_sff(data)
+        layout = generate_layout(data, compiled)
+        cases = [
+            ('mermaid', lambda: export_mermaid(data, layout), lambda: write_mermaid(data, layout, NullSink())),
+            ('dot', lambda: export_dot(data, layout), lambda: write_dot(data, layout, NullSink())),
+            ('json', lambda: export_json(data, compiled, layout), lambda: write_json(data, compiled, layout, NullSink())),
+        ]
+        for name, full, stream in cases:
+            print(f"{n:>8} {name:>8} {peak_kib(full):>12.0f} {peak_kib(stream):>12.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,206 @@
+"""
+scripts/bench_pipeline.py
+Benchmark ponta a ponta do pipeline SFF, etapa por etapa.
+
+Para cada tamanho gera um fluxo válido com `core.generator.generator` (semente
+fixa), grava em um arquivo temporário e mede separadamente: leitura, validação
+(estrutural + lógica), compilação, layout e cada exporter. O tempo é o melhor
+de `--repeat` execuções; o pico de memória de cada etapa é medido em uma
+passada extra com tracemalloc (desligável com `--no-memory`).
+
+Os resultados podem ser salvos em JSON (`--out`) e comparados com um resultado
+anterior (`--baseline`, ou `--compare BASE NOVO` sem rodar nada): etapas mais
+lentas (ou com pico maior) que `--threshold` são marcadas como regressão e o
+script sai com código 1.
+
+Uso:
+    python scripts/bench_pipeline.py --sizes 100 1000 10000 --out bench.json
+    python scripts/bench_pipeline.py --sizes 100 1000 10000 100000 1000000 --repeat 1
+    python scripts/bench_pipeline.py --sizes 100 1000 10000 --baseline bench.json
+    python scripts/bench_pipeline.py --compare bench.json bench_novo.json --threshold 0.2
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from core.cache.cache import ENGINE_VERSION
+from core.compiler.compiler import compile_sff
+from core.exporters.registry import write_output
+from core.generator.generator import generate_flow
+from core.layout.layout import generate_layout
+from core.reader.reader import read_sff_file
+from core.validator.validator import validate_sff_structure, validate_sff_logic
+
+RESULTS_VERSION = 1
+EXPORT_FORMATS = ('mermaid', 'dot', 'json', 'svg', 'sffc')
+
+
+class _NullSink:
+    """Sink binário que descarta a saída (só conta bytes)."""
+
+    mode = 'wb'
+
+    def __init__(self):
+        self.count = 0
+
+    def write(self, block):
+        self.count += len(block)
+
+
+def _stages(path):
+    """Etapas na ordem do pipeline; cada uma lê e completa o dict de estado compartilhado."""
+    def read(state):
+        state['data'] = read_sff_file(path)
+
+    def validate(state):
+        errors = validate_sff_structure(state['data']) + validate_sff_logic(state['data'])
+        if errors:
+            raise RuntimeError(f"Fluxo gerado inválido: {errors[:3]}")
+
+    def compile_(state):
+        state['compiled'] = compile_sff(state['data'])
+
+    def layout(state):
+        state['layout'] = generate_layout(state['data'], state['compiled'])
+
+    stages = [('read', read), ('validate', validate), ('compile', compile_), ('layout', layout)]
+    for fmt in EXPORT_FORMATS:
+        def export(state, fmt=fmt):
+            write_output(fmt, state['data'], state['compiled'], state['layout'], _NullSink())
+        stages.append((f'export_{fmt}', export))
+    return stages
+
+
+def run_size(size: int, args) -> dict:
+    data = generate_flow(size, args.lanes, args.decision_ratio, args.delay_ratio, args.loop_ratio, seed=args.seed)
+    num_edges = len(data['edges'])
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'flow.sff')
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        file_bytes = os.path.getsize(path)
+        del data
+        stages = _stages(path)
+        times = {name: None for name, _ in stages}
+        for _ in range(args.repeat):
+            state = {}
+            for name, stage in stages:
+                t0 = time.perf_counter()
+                stage(state)
+                elapsed = (time.perf_counter() - t0) * 1000
+                if times[name] is None or elapsed < times[name]:
+                    times[name] = elapsed
+            del state
+        peaks = {}
+        if not args.no_memory:
+            state = {}
+            tracemalloc.start()
+            for name, stage in stages:
+                base = tracemalloc.get_traced_memory()[0]
+                tracemalloc.reset_peak()
+                stage(state)
+                peaks[name] = (tracemalloc.get_traced_memory()[1] - base) / 1024
+            tracemalloc.stop()
+            del state
+    return {
+        'nodes': size,
+        'edges': num_edges,
+        'file_bytes': file_bytes,
+        'stages': {
+            name: {'time_ms': round(times[name], 3), 'peak_kib': round(peaks[name], 1) if name in peaks else None}
+            for name in times
+        },
+    }
+
+
+def compare(baseline: dict, current: dict, threshold: float, min_ms: float) -> int:
+    """Imprime a comparação por (tamanho, etapa) e devolve o nº de regressões."""
+    base_runs = {run['nodes']: run for run in baseline['runs']}
+    regressions = 0
+    print(f"{'nós':>9} {'etapa':<15} {'base ms':>10} {'novo ms':>10} {'Δ tempo':>8} {'Δ pico':>8}")
+    for run in current['runs']:
+        base = base_runs.get(run['nodes'])
+        if base is None:
+            continue
+        for name, stage in run['stages'].items():
+            old = base['stages'].get(name)
+            if old is None:
+                continue
+            flags = []
+            time_delta = stage['time_ms'] / old['time_ms'] - 1 if old['time_ms'] else 0.0
+            # Etapas muito curtas são dominadas por ruído
+            if max(old['time_ms'], stage['time_ms']) >= min_ms and time_delta > threshold:
+                flags.append('tempo')
+            mem_delta = None
+            if old.get('peak_kib') and stage.get('peak_kib') is not None:
+                mem_delta = stage['peak_kib'] / old['peak_kib'] - 1
+                if mem_delta > threshold and stage['peak_kib'] - old['peak_kib'] >= 64:
+                    flags.append('memória')
+            regressions += bool(flags)
+            mem_text = f"{mem_delta:>+8.1%}" if mem_delta is not None else f"{'-':>8}"
+            mark = f"  REGRESSÃO ({', '.join(flags)})" if flags else ''
+            print(f"{run['nodes']:>9} {name:<15} {old['time_ms']:>10.2f} {stage['time_ms']:>10.2f} "
+                  f"{time_delta:>+8.1%} {mem_text}{mark}")
+    if base_runs.keys().isdisjoint(run['nodes'] for run in current['runs']):
+        print("Nenhum tamanho em comum entre os resultados.")
+    print(f"{regressions} regressão(ões) acima de {threshold:.0%}")
+    return regressions
+
+
+def _load(path: str) -> dict:
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 10000])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--lanes', type=int, default=3)
+    parser.add_argument('--decision-ratio', type=float, default=0.1)
+    parser.add_argument('--delay-ratio', type=float, default=0.05)
+    parser.add_argument('--loop-ratio', type=float, default=0.2)
+    parser.add_argument('--no-memory', action='store_true', help='não mede o pico de memória (sem tracemalloc)')
+    parser.add_argument('--out', help='salva os resultados em JSON')
+    parser.add_argument('--baseline', help='compara com um resultado salvo anteriormente')
+    parser.add_argument('--compare', nargs=2, metavar=('BASE', 'NOVO'), help='só compara dois resultados salvos')
+    parser.add_argument('--threshold', type=float, default=0.15, help='piora relativa tolerada (0.15 = 15%%)')
+    parser.add_argument('--min-ms', type=float, default=5.0, help='ignora etapas mais curtas que isto')
+    args = parser.parse_args()
+    if args.compare:
+        sys.exit(1 if compare(_load(args.compare[0]), _load(args.compare[1]), args.threshold, args.min_ms) else 0)
+    results = {
+        'version': RESULTS_VERSION,
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'engine_version': ENGINE_VERSION,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'params': {k: getattr(args, k) for k in ('seed', 'lanes', 'decision_ratio', 'delay_ratio', 'loop_ratio', 'repeat')},
+        'runs': [],
+    }
+    for size in args.sizes:
+        run = run_size(size, args)
+        results['runs'].append(run)
+        print(f"{run['nodes']:>9} nós {run['edges']:>9} edges {run['file_bytes'] / 1024:>10.0f} KiB")
+        for name, stage in run['stages'].items():
+            peak = f"{stage['peak_kib']:>10.0f} KiB" if stage['peak_kib'] is not None else ''
+            print(f"    {name:<15} {stage['time_ms']:>11.2f} ms {peak}")
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+        print(f"Resultados salvos em {args.out}")
+    if args.baseline:
+        sys.exit(1 if compare(_load(args.baseline), results, args.threshold, args.min_ms) else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""
+scripts/bench_startup.py
+Tempo de início da CLI: custo de import e tempo de parede por comando.
+
+Para cada comando roda `python -m core.cli ...` em um processo novo e mede:
+- o tempo de parede do processo (mediana de `--repeat` execuções);
+- o import cumulativo de `core.cli.cli` e dos pacotes do core carregados
+  (`python -X importtime`), o que mostra o que cada comando deixou de importar.
+O cache em disco fica em um diretório temporário (a primeira execução
+preenche e as seguintes medem o cache quente).
+
+Uso:
+    python scripts/bench_startup.py
+    python scripts/bench_startup.py exemplo/exemplo_basico.sff --repeat 10
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+COMMANDS = [
+    ['validate'],
+    ['compile'],
+    ['export', '--format', 'mermaid'],
+    ['export', '--format', 'json'],
+]
+
+
+def _run(args, env, importtime=False):
+    cmd = [sys.executable] + (['-X', 'importtime'] if importtime else []) + ['-m', 'core.cli'] + args
+    t0 = time.perf_counter()
+    proc = subprocess.run(cmd, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    return (time.perf_counter() - t0) * 1000, proc
+
+
+def _imports(stderr: str) -> dict:
+    """Import cumulativo (ms) por módulo de nível superior do core."""
+    result = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        parts = line.split('|')
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue
+        name = parts[2].strip()
+        if name.startswith('core.') and name.count('.') == 2:
+            result[name] = int(parts[1]) / 1000
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('file', nargs='?', default=os.path.join('docs', 'model', 'example.sff'))
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, SFF_CACHE_DIR=tmp)
+        for command in COMMANDS:
+            argv = [command[0], args.file] + command[1:]
+            _run(argv, env)
+            walls = [_run(argv, env)[0] for _ in range(args.repeat)]
+            _, proc = _run(argv, env, importtime=True)
+            imports = _imports(proc.stderr)
+            label = ' '.join(command)
+            print(f"{label:<24} parede {statistics.median(walls):8.1f} ms   "
+                  f"import core.cli {imports.get('core.cli.cli', 0.0):6.1f} ms")
+            loaded = sorted((ms, name) for name, ms in imports.items() if name != 'core.cli.cli')
+            for ms, name in reversed(loaded):
+                print(f"    {name:<32} {ms:6.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
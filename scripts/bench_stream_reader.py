@@ -0,0 +1,86 @@
+"""
+scripts/bench_stream_reader.py
+Leitor incremental × json.load em fluxos grandes gerados direto em disco.
+
+O arquivo sintético (cadeia com decisões, como em bench_validator) é escrito
+em streaming, sem montar o documento em memória, opcionalmente em gzip.
+Mede tempo e pico de memória (tracemalloc) de:
+- `validate_sff_stream(iter_sff_events(...))` (validação durante a leitura);
+- `read_sff_file` + `validate_sff_structure` (documento inteiro em memória).
+
+Uso:
+    python scripts/bench_stream_reader.py
+    python scripts/bench_stream_reader.py --nodes 1000000 --gzip --skip-full
+"""
+import argparse
+import gzip
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from core.reader.reader import iter_sff_events, read_sff_file
+from core.validator.validator import validate_sff_stream, validate_sff_structure
+
+
+def write_flow(path: str, n_nodes: int, decision_every: int = 10, compress: bool = False):
+    """Escreve um fluxo válido com ~n_nodes nós sem montá-lo em memória."""
+    opener = gzip.open if compress else open
+    with opener(path, 'wt', encoding='utf-8') as f:
+        f.write('{"sff": {"version": "1.0", "id": "stream_bench", "direction": "TB"},\n')
+        f.write('"entry": {"start": "start", "ends": ["end_success", "end_failure"]},\n')
+        f.write('"lanes": {"main": {"title": "Main", "order": 1}},\n"nodes": {\n')
+        f.write('"start": {"type": "start", "lane": "main", "label": "Início"}')
+        for i in range(1, n_nodes - 2):
+            if i % decision_every == 0:
+                node = {'type': 'decision', 'lane': 'main', 'label': f'Decisão {i}',
+                        'branches': {'true': {'next': f'n{i + 1}'}, 'false': {'next': f'f{i}'}}}
+                f.write(f',\n"f{i}": ' + json.dumps({'type': 'process', 'lane': 'main', 'label': f'Falha {i}'}))
+            else:
+                node = {'type': 'process', 'lane': 'main', 'label': f'Passo {i}'}
+            f.write(f',\n"n{i}": ' + json.dumps(node, ensure_ascii=False))
+        f.write(',\n"end_success": {"type": "end", "lane": "main"},\n"end_failure": {"type": "end", "lane": "main"}\n},\n')
+        f.write('"edges": [\n{"from": "start", "to": "n1"}')
+        for i in range(1, n_nodes - 3):
+            branch = ', "branch": "true"' if i % decision_every == 0 else ''
+            f.write(f',\n{{"from": "n{i}", "to": "n{i + 1}"{branch}}}')
+            if i % decision_every == 0:
+                f.write(f',\n{{"from": "n{i}", "to": "f{i}", "branch": "false"}},\n{{"from": "f{i}", "to": "end_failure"}}')
+        f.write(f',\n{{"from": "n{n_nodes - 3}", "to": "end_success"}}\n]}}\n')
+
+
+def measure(fn):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    try:
+        result = fn()
+        return result, time.perf_counter() - t0, tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Leitor incremental × json.load')
+    parser.add_argument('--nodes', type=int, nargs='+', default=[10000, 100000])
+    parser.add_argument('--gzip', action='store_true')
+    parser.add_argument('--skip-full', action='store_true', help='não roda json.load (arquivos enormes)')
+    args = parser.parse_args()
+    tmp = tempfile.mkdtemp()
+    for n in args.nodes:
+        path = os.path.join(tmp, f'flow_{n}.sff' + ('.gz' if args.gzip else ''))
+        write_flow(path, n, compress=args.gzip)
+        size_mb = os.path.getsize(path) / (1024 * 1024)
+        errors, elapsed, peak = measure(lambda: validate_sff_stream(iter_sff_events(path)))
+        print(f"{n:>9} nós ({size_mb:.1f} MiB): stream {elapsed:.2f}s pico {peak:.1f} MiB erros={len(errors)}")
+        if not args.skip_full:
+            errors, elapsed, peak = measure(lambda: validate_sff_structure(read_sff_file(path)))
+            print(f"{'':>9}               json.load {elapsed:.2f}s pico {peak:.1f} MiB erros={len(errors)}")
+        os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""
+scripts/bench_validator.py
+Benchmark de escala do validate_sff_logic.
+
+Gera fluxos sintéticos válidos (cadeias lineares com decisões intercaladas)
+de tamanhos crescentes e mede o tempo da validação lógica. Como as regras
+rodam em O(V+E), o tempo por edge deve permanecer aproximadamente constante.
+
+Uso:
+    python scripts/bench_validator.py
+    python scripts/bench_validator.py --sizes 1000 10000 100000
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from core.validator.validator import validate_sff_logic
+
+
+def make_flow(n_nodes: int, decision_every: int = 10):
+    """Monta um fluxo válido com ~n_nodes nós: cadeia principal com decisões a cada `decision_every` nós."""
+    nodes = {'start': {'type': 'start', 'lane': 'main', 'label': 'Início'}}
+    edges = []
+    prev_id = 'start'
+    for i in range(1, n_nodes - 2):
+        node_id = f'n{i}'
+        if i % decision_every == 0:
+            fail_id = f'f{i}'
+            nodes[node_id] = {
+                'type': 'decision', 'lane': 'main', 'label': f'Decisão {i}',
+                'branches': {'true': {'next': f'n{i + 1}'}, 'false': {'next': fail_id}},
+            }
+            nodes[fail_id] = {'type': 'process', 'lane': 'main', 'label': f'Falha {i}'}
+            edges.append({'from': prev_id, 'to': node_id})
+            edges.append({'from': node_id, 'to': fail_id, 'branch': 'false'})
+            edges.append({'from': fail_id, 'to': 'end_failure'})
+            # A edge true é criada na próxima iteração
+            prev_id = node_id
+            continue
+        nodes[node_id] = {'type': 'process', 'lane': 'main', 'label': f'Passo {i}'}
+        branch = {'branch': 'true'} if nodes[prev_id]['type'] == 'decision' else {}
+        edges.append({'from': prev_id, 'to': node_id, **branch})
+        prev_id = node_id
+    nodes['end_success'] = {'type': 'end', 'lane': 'main', 'label': 'Sucesso'}
+    nodes['end_failure'] = {'type': 'end', 'lane': 'main', 'label': 'Falha'}
+    edges.append({'from': prev_id, 'to': 'end_success'})
+    return {
+        'sff': {'version': '1.0', 'id': f'bench_{n_nodes}', 'direction': 'TB'},
+        'entry': {'start': 'start', 'ends': ['end_success', 'end_failure']},
+        'lanes': {'main': {'title': 'Main', 'order': 1}},
+        'nodes': nodes,
+        'edges': edges,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark do validate_sff_logic')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 50000, 100000, 200000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    print(f"{'nós':>10} {'edges':>10} {'tempo (ms)':>12} {'µs/edge':>10} {'erros':>6}")
+    for size in args.sizes:
+        data = make_flow(size)
+        best = None
+        for _ in range(args.repeat):
+            t0 = time.perf_counter()
+            errors = validate_sff_logic(data)
+            elapsed = time.perf_counter() - t0
+            best = elapsed if best is None else min(best, elapsed)
+        n_edges = len(data['edges'])
+        print(f"{len(data['nodes']):>10} {n_edges:>10} {best * 1000:>12.2f} {best * 1e6 / n_edges:>10.3f} {len(errors):>6}")
+
+
+if __name__ == '__main__':
+    main()
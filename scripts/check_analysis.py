@@ -0,0 +1,176 @@
+"""
+scripts/check_analysis.py
+Confere a análise de caminhos (core.analysis) contra enumeração explícita e mede o custo.
+
+Para fluxos pequenos (exemplos do repositório, fluxos gerados e grafos
+aleatórios com ciclos) condensa os ciclos por alcançabilidade mútua, enumera
+todos os caminhos start→end e compara com `analyze_paths`:
+- número de caminhos e espera mínima/máxima por end;
+- espera do caminho crítico (e se a lista de nós devolvida soma essa espera);
+- folga de cada nó.
+Confere também que as amostras de `monte_carlo` ficam dentro de [mínimo, máximo]
+de cada end. Depois mede as duas funções em fluxos grandes.
+
+Uso:
+    python scripts/check_analysis.py
+    python scripts/check_analysis.py --sizes 10000 100000 --samples 10000
+"""
+import argparse
+import glob
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from core.analysis.analysis import analyze_paths, monte_carlo
+from core.compiler.graph import CompiledGraph
+from core.generator.generator import generate_flow
+from core.reader.reader import read_sff_file
+
+EPS = 1e-6
+
+
+def _random_flow(n: int, extra: int, seed: int) -> dict:
+    """Grafo aleatório (não necessariamente um SFF válido) com ciclos e delays."""
+    rng = random.Random(seed)
+    nodes = {}
+    for i in range(n):
+        nodes[f'v{i}'] = {'type': 'process', 'lane': 'l'}
+        if rng.random() < 0.4:
+            low = rng.randint(0, 20)
+            nodes[f'v{i}'] = {'type': 'delay', 'lane': 'l', 'delay': {'min_seconds': low, 'max_seconds': low + rng.randint(0, 30)}}
+    edges = [{'from': f'v{i}', 'to': f'v{i + 1}'} for i in range(n - 1)]
+    for _ in range(extra):
+        a, b = rng.randrange(n), rng.randrange(n)
+        if rng.random() < 0.8 and a > b:
+            a, b = b, a
+        edges.append({'from': f'v{a}', 'to': f'v{b}'})
+    ends = [f'v{n - 1}'] + [f'v{i}' for i in range(n - 1) if rng.random() < 0.05]
+    return {'entry': {'start': 'v0', 'ends': ends}, 'lanes': {'l': {}}, 'nodes': nodes, 'edges': edges}
+
+
+def _expected(data: dict, graph: CompiledGraph) -> dict:
+    n = graph.num_nodes
+    succ = [set(graph.successors(i)) for i in range(n)]
+    reach = []
+    for s in range(n):
+        seen = {s}
+        stack = [s]
+        while stack:
+            for w in succ[stack.pop()]:
+                if w not in seen:
+                    seen.add(w)
+                    stack.append(w)
+        reach.append(seen)
+    comp = {}
+    for v in range(n):
+        if v not in comp:
+            for w in reach[v]:
+                if v in reach[w]:
+                    comp[w] = v
+    dag = {c: set() for c in set(comp.values())}
+    for v in range(n):
+        dag[comp[v]].update(comp[w] for w in succ[v] if comp[w] != comp[v])
+    low = dict.fromkeys(dag, 0.0)
+    high = dict.fromkeys(dag, 0.0)
+    for i, node_id in enumerate(graph.node_ids):
+        block = data['nodes'][node_id].get('delay')
+        if block:
+            low[comp[i]] += block['min_seconds']
+            high[comp[i]] += max(block['max_seconds'], block['min_seconds'])
+    ends = [e for e in data['entry']['ends'] if e in graph.node_index]
+    end_comps = {comp[graph.node_index[e]] for e in ends}
+    per_end = {c: [0, None, None] for c in end_comps}
+    through = {}
+    # DFS explícita por todos os caminhos (um end não interrompe o caminho)
+    start = comp[graph.node_index[data['entry']['start']]]
+    stack = [(start, (start,), low[start], high[start])]
+    while stack:
+        c, path, lo, hi = stack.pop()
+        if c in end_comps:
+            item = per_end[c]
+            item[0] += 1
+            item[1] = lo if item[1] is None else min(item[1], lo)
+            item[2] = hi if item[2] is None else max(item[2], hi)
+            for x in path:
+                through[x] = max(through.get(x, hi), hi)
+        for d in dag[c]:
+            stack.append((d, path + (d,), lo + low[d], hi + high[d]))
+    total = max((v[2] for v in per_end.values() if v[0]), default=0.0)
+    slack = {}
+    for i, node_id in enumerate(graph.node_ids):
+        slack[node_id] = total - through[comp[i]] if comp[i] in through else None
+    return {'ends': {e: per_end[comp[graph.node_index[e]]] for e in ends}, 'total': total, 'slack': slack}
+
+
+def check(name: str, data: dict) -> bool:
+    graph = CompiledGraph(data)
+    compiled = {'graph': graph}
+    result = analyze_paths(data, compiled)
+    expected = _expected(data, graph)
+    ok = True
+    for e, (paths, lo, hi) in expected['ends'].items():
+        got = result['ends'][e]
+        if got['paths'] != paths or (lo is None) != (got['min_seconds'] is None) or \
+                (lo is not None and (abs(got['min_seconds'] - lo) > EPS or abs(got['max_seconds'] - hi) > EPS)):
+            print(f"  end {e}: {got} != caminhos {paths}, mínimo {lo}, máximo {hi}")
+            ok = False
+    critical = result['critical_path']
+    if abs(critical['max_seconds'] - expected['total']) > EPS:
+        print(f"  caminho crítico: {critical['max_seconds']} != {expected['total']}")
+        ok = False
+    delays = [data['nodes'][x].get('delay') for x in critical['nodes']]
+    if abs(sum(max(d['max_seconds'], d['min_seconds']) for d in delays if d) - critical['max_seconds']) > EPS:
+        print(f"  nós do caminho crítico não somam {critical['max_seconds']}")
+        ok = False
+    for node_id, value in expected['slack'].items():
+        got = result['slack'][node_id]
+        if (value is None) != (got is None) or (value is not None and abs(got - value) > EPS):
+            print(f"  folga de {node_id}: {got} != {value}")
+            ok = False
+            break
+    sim = monte_carlo(data, compiled, samples=500, seed=1)
+    for e, stats in sim['ends'].items():
+        lo, hi = result['ends'][e]['min_seconds'], result['ends'][e]['max_seconds']
+        if stats['min'] is not None and (stats['min'] < lo - EPS or stats['max'] > hi + EPS):
+            print(f"  monte carlo em {e}: [{stats['min']}, {stats['max']}] fora de [{lo}, {hi}]")
+            ok = False
+    print(f"{name:40} {'OK' if ok else 'ERRO'}  ({graph.num_nodes} nós, {result['paths_total']} caminhos)")
+    return ok
+
+
+def bench(n: int, samples: int):
+    data = generate_flow(n, seed=0)
+    compiled = {'graph': CompiledGraph(data)}
+    t0 = time.perf_counter()
+    result = analyze_paths(data, compiled)
+    dp = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    monte_carlo(data, compiled, samples=samples)
+    mc = time.perf_counter() - t0
+    print(f"{n:>9} nós  analyze_paths {dp * 1000:8.1f} ms  monte_carlo ({samples} amostras) {mc * 1000:8.1f} ms  "
+          f"caminhos ~10^{len(str(result['paths_total'])) - 1}  crítico {result['critical_path']['max_seconds']:.0f} s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000])
+    parser.add_argument('--samples', type=int, default=10000)
+    args = parser.parse_args()
+    root = os.path.join(os.path.dirname(__file__), '..')
+    ok = True
+    for f in sorted(glob.glob(os.path.join(root, 'exemplo', '*.sff'))):
+        ok = check(os.path.relpath(f, root), read_sff_file(f)) and ok
+    for seed in range(3):
+        ok = check(f'gerado 60 nós (semente {seed})', generate_flow(60, seed=seed)) and ok
+    for seed in range(20):
+        ok = check(f'aleatório 16 nós (semente {seed})', _random_flow(16, 10, seed)) and ok
+    for n in args.sizes:
+        bench(n, args.samples)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
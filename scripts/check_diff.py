@@ -0,0 +1,178 @@
+"""
+scripts/check_diff.py
+Confere o diff estrutural (core.diff) e o layout com dica, e mede o ganho sobre o layout completo.
+
+Para os exemplos do repositório e fluxos gerados:
+- diff de um fluxo com ele mesmo é vazio e o layout com dica do próprio
+  layout reproduz posições e roteamento;
+- edições aleatórias (nó novo em um desvio de duas edges, nó removido com religação,
+  label alterado, nó renomeado, troca de lane) aparecem no diff exatamente
+  como aplicadas;
+- no layout com dica não há duas posições iguais e toda edge que não é
+  back-edge desce de rank.
+Depois compara, em fluxos grandes, quantos nós mantêm a posição e o tempo do
+layout completo contra o layout com dica.
+
+Uso:
+    python scripts/check_diff.py
+    python scripts/check_diff.py --sizes 2000 20000
+"""
+import argparse
+import copy
+import glob
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from core.compiler.compiler import compile_sff
+from core.diff.diff import diff_flows, layout_hint, position_changes
+from core.generator.generator import generate_flow
+from core.layout.layout import generate_layout
+from core.reader.reader import read_sff_file
+
+
+def _edit(data: dict, rng: random.Random):
+    """Aplica uma edição aleatória; retorna (documento novo, resumo esperado do diff, renomes)."""
+    new = copy.deepcopy(data)
+    nodes, edges = new['nodes'], new['edges']
+    inner = [e for e in edges if nodes[e['from']].get('type') == 'process' and nodes[e['to']].get('type') == 'process']
+    kind = rng.choice(['lateral', 'remove', 'label', 'rename', 'lane'])
+    if kind == 'lateral' and inner:
+        edge = rng.choice(inner)
+        nodes['novo_lateral'] = {'type': 'process', 'lane': nodes[edge['from']]['lane'], 'label': 'Novo'}
+        edges += [{'from': edge['from'], 'to': 'novo_lateral'}, {'from': 'novo_lateral', 'to': edge['to']}]
+        return new, {'nodes_added': 1, 'edges_added': 2}, {}
+    if kind == 'remove':
+        candidates = [x for x in nodes if nodes[x].get('type') == 'process'
+                      and sum(e['from'] == x for e in edges) == 1 and sum(e['to'] == x for e in edges) == 1]
+        if candidates:
+            x = rng.choice(candidates)
+            out = next(e for e in edges if e['from'] == x)
+            into = next(e for e in edges if e['to'] == x)
+            new['edges'] = [e for e in edges if e is not out and e is not into]
+            new['edges'].append(dict(into, to=out['to']))
+            del nodes[x]
+            return new, {'nodes_removed': 1, 'edges_removed': 2, 'edges_added': 1}, {}
+    if kind == 'rename':
+        x = rng.choice([x for x in nodes if nodes[x].get('type') == 'process'])
+        unique = [y for y in nodes if y != x and nodes[y] == nodes[x]]
+        if not unique:
+            nodes['renomeado'] = nodes.pop(x)
+            for e in edges:
+                e['from'] = 'renomeado' if e['from'] == x else e['from']
+                e['to'] = 'renomeado' if e['to'] == x else e['to']
+            changed = set()
+            for node_id, node in nodes.items():
+                for branch in (node.get('branches') or {}).values():
+                    if isinstance(branch, dict) and branch.get('next') == x:
+                        branch['next'] = 'renomeado'
+                        changed.add(node_id)
+            expected = {'nodes_renamed': 1}
+            if changed:
+                expected['nodes_modified'] = len(changed)
+            return new, expected, {x: 'renomeado'}
+    if kind == 'lane' and len(new['lanes']) > 1:
+        x = rng.choice(list(nodes))
+        nodes[x]['lane'] = next(l for l in new['lanes'] if l != nodes[x]['lane'])
+        return new, {'nodes_modified': 1}, {}
+    x = rng.choice(list(nodes))
+    nodes[x]['label'] = str(nodes[x].get('label')) + ' (v2)'
+    return new, {'nodes_modified': 1}, {}
+
+
+def _check_layout(data: dict, compiled: dict, layout: dict) -> bool:
+    graph = compiled['graph']
+    positions = layout['positions']
+    if len(set(positions.values())) != len(positions):
+        return False
+    back = set(layout['back_edges'])
+    ranks = layout['ranks']
+    ids = graph.node_ids
+    for k in range(graph.num_edges):
+        u, v = ids[graph.edge_src[k]], ids[graph.edge_dst[k]]
+        if u != v and (u, v) not in back and ranks[v] <= ranks[u]:
+            return False
+    return True
+
+
+def check(name: str, data: dict, rng: random.Random, edits: int = 10) -> bool:
+    ok = True
+    if diff_flows(data, data)['summary']['changed']:
+        print("  diff do fluxo com ele mesmo não é vazio")
+        ok = False
+    compiled = compile_sff(data)
+    layout = generate_layout(data, compiled)
+    again = generate_layout(data, compiled, hint=layout_hint(data, layout))
+    if again['positions'] != layout['positions'] or again['routing'] != layout['routing']:
+        print("  layout com dica do próprio layout difere do original")
+        ok = False
+    kept = common = 0
+    for _ in range(edits):
+        new, expected, renamed = _edit(data, rng)
+        result = diff_flows(data, new)
+        got = {k: v for k, v in result['summary'].items() if v and k != 'changed'}
+        if got != expected:
+            print(f"  diff {got} != esperado {expected}")
+            ok = False
+        if {r['from']: r['to'] for r in result['nodes']['renamed']} != renamed:
+            print(f"  renomes {result['nodes']['renamed']} != {renamed}")
+            ok = False
+        new_compiled = compile_sff(new)
+        hinted = generate_layout(new, new_compiled, hint=layout_hint(data, layout, renamed))
+        if not _check_layout(new, new_compiled, hinted):
+            print("  layout com dica inválido (posição repetida ou edge subindo de rank)")
+            ok = False
+        stats = position_changes(layout, hinted, renamed)
+        kept += stats['kept']
+        common += stats['common']
+    print(f"{name:40} {'OK' if ok else 'ERRO'}  (posições mantidas {kept}/{common} em {edits} edições)")
+    return ok
+
+
+def bench(n: int, seed: int = 0):
+    data = generate_flow(n, seed=seed)
+    compiled = compile_sff(data)
+    layout = generate_layout(data, compiled)
+    rng = random.Random(seed)
+    totals = {'full': [0.0, 0], 'hint': [0.0, 0]}
+    common = 0
+    for _ in range(3):
+        new, _, renamed = _edit(data, rng)
+        new_compiled = compile_sff(new)
+        t0 = time.perf_counter()
+        full = generate_layout(new, new_compiled)
+        totals['full'][0] += time.perf_counter() - t0
+        t0 = time.perf_counter()
+        hinted = generate_layout(new, new_compiled, hint=layout_hint(data, layout, renamed))
+        totals['hint'][0] += time.perf_counter() - t0
+        totals['full'][1] += position_changes(layout, full, renamed)['kept']
+        stats = position_changes(layout, hinted, renamed)
+        totals['hint'][1] += stats['kept']
+        common += stats['common']
+    print(f"{n:>9} nós  completo {totals['full'][0] / 3 * 1000:8.1f} ms (mantidas {totals['full'][1] / common:6.1%})  "
+          f"com dica {totals['hint'][0] / 3 * 1000:8.1f} ms (mantidas {totals['hint'][1] / common:6.1%})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[2000, 20000])
+    args = parser.parse_args()
+    root = os.path.join(os.path.dirname(__file__), '..')
+    rng = random.Random(0)
+    ok = True
+    for f in sorted(glob.glob(os.path.join(root, 'exemplo', '*.sff'))):
+        data = read_sff_file(f)
+        if not compile_sff(data)['validation']['errors']:
+            ok = check(os.path.relpath(f, root), data, rng) and ok
+    for seed in range(3):
+        ok = check(f'gerado 300 nós (semente {seed})', generate_flow(300, seed=seed), rng) and ok
+    for n in args.sizes:
+        bench(n)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
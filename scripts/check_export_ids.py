@@ -0,0 +1,131 @@
+"""
+scripts/check_export_ids.py
+Confere que os exporters DOT e Mermaid geram sintaxe válida para qualquer id e label.
+
+Exporta o fluxo ligado de `exemplo/modulos/pedido.sff` (ids `pagamento/aprovado`)
+e um fluxo gerado com ids e labels hostis (barras, espaços, aspas, colchetes,
+palavras reservadas como `end`, ids que colidem depois da troca por `_`), e
+confere cada linha contra a gramática do subconjunto que os exporters usam:
+- DOT: ids identificadores ou entre aspas (com escapes), `->` entre dois ids;
+- Mermaid: ids identificadores não reservados, labels sem caracteres da
+  sintaxe ou entre aspas, `-->` e `-->|label|`.
+Confere também que cada nó do documento vira um id distinto na saída e que
+toda edge liga os ids dos seus nós.
+
+Sem Graphviz nem mermaid-cli no ambiente, a conferência é pela gramática.
+
+Uso:
+    python scripts/check_export_ids.py
+"""
+import os
+import re
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from core.cache.cache import FlowCache
+from core.exporters.dot_exporter import export_dot
+from core.exporters.mermaid_exporter import export_mermaid
+from core.generator.generator import generate_flow
+from core.linker.linker import link_flow
+
+_DOT_ID = r'(?:[A-Za-z_][A-Za-z0-9_]*|"(?:[^"\\]|\\.)*")'
+_DOT_LINES = [
+    re.compile(r'digraph G \{'),
+    re.compile(r'  rankdir=(TB|LR);'),
+    re.compile(rf'  subgraph {_DOT_ID} \{{'),
+    re.compile(rf'    label={_DOT_ID};'),
+    re.compile(rf'    (?P<node>{_DOT_ID}) \[label={_DOT_ID}\]'),
+    re.compile(rf'  (?P<src>{_DOT_ID}) -> (?P<dst>{_DOT_ID})( \[label={_DOT_ID}\])?'),
+    re.compile(r' {0,2}\}'),
+]
+_MMD_ID = r'[A-Za-z_][A-Za-z0-9_]*'
+_MMD_TEXT = r'(?:[^\[\](){}<>|"#;`]+|"[^"]*")'
+_MMD_LINES = [
+    re.compile(r'flowchart (TB|LR)'),
+    re.compile(rf'subgraph {_MMD_ID}( \[{_MMD_TEXT}\])?'),
+    re.compile(r'end'),
+    re.compile(rf'    (?P<node>{_MMD_ID})\[{_MMD_TEXT}\]'),
+    re.compile(rf'(?P<src>{_MMD_ID}) -->(\|{_MMD_TEXT}\|)? (?P<dst>{_MMD_ID})'),
+]
+_MMD_RESERVED = {'end', 'graph', 'subgraph', 'flowchart', 'style', 'class', 'classdef', 'click', 'linkstyle', 'direction'}
+_DOT_KEYWORDS = {'node', 'edge', 'graph', 'digraph', 'subgraph', 'strict'}
+
+
+def _parse(text: str, grammar, reserved):
+    """(nós, edges, linhas inválidas) da saída."""
+    nodes, edges, bad = [], [], []
+    for line in text.split('\n'):
+        match = next((m for m in (g.fullmatch(line) for g in grammar) if m), None)
+        if match is None:
+            bad.append(line)
+            continue
+        groups = match.groupdict()
+        if any(v and v.lower() in reserved for v in groups.values()):
+            bad.append(line)
+        if groups.get('node'):
+            nodes.append(groups['node'])
+        if groups.get('src'):
+            edges.append((groups['src'], groups['dst']))
+    return nodes, edges, bad
+
+
+def _check(name: str, data: dict, layout: dict) -> bool:
+    ok = True
+    for fmt, text, grammar, reserved in (
+        ('dot', export_dot(data, layout), _DOT_LINES, _DOT_KEYWORDS),
+        ('mermaid', export_mermaid(data, layout), _MMD_LINES, _MMD_RESERVED),
+    ):
+        nodes, edges, bad = _parse(text, grammar, reserved)
+        if bad:
+            print(f"  {fmt}: {len(bad)} linha(s) inválida(s), ex.: {bad[0]!r}")
+            ok = False
+        if len(set(nodes)) != len(data['nodes']):
+            print(f"  {fmt}: {len(set(nodes))} ids distintos para {len(data['nodes'])} nós")
+            ok = False
+        # Os exporters listam os nós por lane, na ordem do documento dentro de cada lane
+        in_order = [n for lane in layout['lane_order'] for n, node in data['nodes'].items() if node['lane'] == lane]
+        out_id = dict(zip(in_order, nodes))
+        expected = [(out_id.get(e['from']), out_id.get(e['to'])) for e in data['edges']]
+        if edges != expected:
+            print(f"  {fmt}: edges não ligam os ids dos seus nós")
+            ok = False
+    print(f"{name:40} {'OK' if ok else 'ERRO'}")
+    return ok
+
+
+def _hostile(data: dict) -> dict:
+    """Mesmo fluxo com ids e labels que quebram DOT/Mermaid se saírem sem tratamento."""
+    odd = ['end', 'a/b', 'a_b', 'a b', 'node', '9x', 'x"y', 'Sub Graph', 'é', '']
+    rename = {}
+    for i, node_id in enumerate(data['nodes']):
+        rename[node_id] = odd[i] if i < len(odd) else node_id
+    nodes = {}
+    for i, (node_id, node) in enumerate(data['nodes'].items()):
+        node = dict(node, label=['Pós (boot)', 'a "b" [c]', 'x|y', 'a\\b', '#1; {z}'][i % 5])
+        if isinstance(node.get('branches'), dict):
+            node['branches'] = {k: dict(b, next=rename[b['next']]) for k, b in node['branches'].items()}
+        nodes[rename[node_id]] = node
+    edges = [dict(e, **{'from': rename[e['from']], 'to': rename[e['to']]}, label='a|b "c"') for e in data['edges']]
+    entry = dict(data['entry'], start=rename[data['entry']['start']], ends=[rename[x] for x in data['entry']['ends']])
+    return dict(data, nodes=nodes, edges=edges, entry=entry)
+
+
+def main():
+    root = os.path.join(os.path.dirname(__file__), '..')
+    cache = FlowCache()
+    ok = True
+    linked = link_flow(os.path.join(root, 'exemplo', 'modulos', 'pedido.sff'), cache)
+    _, layout = cache.compile_and_layout(linked['data'], doc_hash=linked['hash'])
+    ok = _check('exemplo/modulos/pedido.sff (ligado)', linked['data'], layout) and ok
+    data = _hostile(generate_flow(200, seed=0))
+    _, layout = cache.compile_and_layout(data)
+    if layout is None:
+        print("fluxo com ids hostis não compilou")
+        sys.exit(1)
+    ok = _check('gerado 200 nós, ids/labels hostis', data, layout) and ok
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
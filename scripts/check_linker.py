@@ -0,0 +1,94 @@
+"""
+scripts/check_linker.py
+Confere que `load_flow(..., root=DIR)` não lê módulos fora de `DIR`.
+
+Monta um diretório raiz com o fluxo de `exemplo/modulos/pedido.sff` e um
+diretório vizinho com um módulo "secreto". Com `root`, o subflow apontando
+para o módulo secreto por caminho absoluto, por `..` ou por link simbólico
+dentro da raiz tem de dar `SFF011` sem que o módulo entre no fluxo ligado;
+o módulo dentro da raiz continua ligando. Sem `root` (CLI, lote), o caminho
+absoluto continua aceito. O mesmo é conferido pelo `handle_request` do
+servidor, que sempre passa a raiz.
+
+Uso:
+    python scripts/check_linker.py
+"""
+import json
+import os
+import shutil
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from core.cache.cache import FlowCache
+from core.linker.linker import load_flow
+from core.server import server
+
+MODULES = os.path.join(os.path.dirname(__file__), '..', 'exemplo', 'modulos')
+
+
+def _pedido(file: str):
+    with open(os.path.join(MODULES, 'pedido.sff'), encoding='utf-8') as f:
+        data = json.load(f)
+    data['nodes']['pagamento']['subflow'] = {'file': file}
+    return data
+
+
+def _codes(flow):
+    return [err.code for err in flow['compiled']['validation']['errors']]
+
+
+def _leaked(flow) -> bool:
+    files = [m['file'] for m in flow['modules'] or []]
+    return any('secreto' in f for f in files) or any('secreto' in node_id for node_id in flow['data']['nodes'])
+
+
+def main():
+    tmp = tempfile.mkdtemp()
+    ok = True
+    try:
+        root = os.path.join(tmp, 'raiz')
+        outside = os.path.join(tmp, 'fora')
+        os.makedirs(root)
+        os.makedirs(outside)
+        for name in ('pagamento.sff', 'antifraude.sff'):
+            shutil.copy(os.path.join(MODULES, name), root)
+            shutil.copy(os.path.join(MODULES, name), outside)
+        os.rename(os.path.join(outside, 'pagamento.sff'), os.path.join(outside, 'secreto.sff'))
+        os.symlink(os.path.join(outside, 'secreto.sff'), os.path.join(root, 'atalho.sff'))
+        secret = os.path.join(outside, 'secreto.sff')
+        filepath = os.path.join(root, 'pedido.sff')
+
+        cases = [
+            ('caminho absoluto', secret, root, False),
+            ('caminho com ..', '../fora/secreto.sff', root, False),
+            ('link simbólico', 'atalho.sff', root, False),
+            ('módulo dentro da raiz', 'pagamento.sff', root, True),
+            ('sem root (CLI)', secret, None, True),
+        ]
+        for title, file, confine, accepted in cases:
+            flow = load_flow(filepath, FlowCache(), _pedido(file), root=confine)
+            codes = _codes(flow)
+            if accepted:
+                good = not codes and len(flow['modules']) == 3
+            else:
+                good = 'SFF011' in codes and not _leaked(flow)
+            ok = good and ok
+            print(f"{'OK  ' if good else 'FAIL'} {title}: {codes or 'sem erros'}")
+
+        server._init_worker(root)
+        for title, file in (('servidor, caminho absoluto', secret), ('servidor, caminho com ..', '../fora/secreto.sff')):
+            status, _, body = server.handle_request('/layout', json.dumps(_pedido(file)).encode('utf-8'), {})
+            payload = json.loads(body)
+            codes = [issue['code'] for issue in payload.get('issues', [])]
+            good = status == 422 and 'SFF011' in codes and b'secreto' not in body.replace(b'secreto.sff', b'')
+            ok = good and ok
+            print(f"{'OK  ' if good else 'FAIL'} {title}: HTTP {status} {codes}")
+    finally:
+        shutil.rmtree(tmp)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
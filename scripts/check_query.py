@@ -0,0 +1,186 @@
+"""
+scripts/check_query.py
+Confere o índice de consultas (core.query) contra algoritmos ingênuos e mede o custo.
+
+Para fluxos pequenos (exemplos do repositório, fluxos gerados e grafos
+aleatórios com ciclos) compara, com os dois métodos de alcançabilidade
+(`bitset` e `intervals`):
+- `reaches` contra BFS para todos os pares;
+- dominadores e pós-dominadores contra o cálculo iterativo por conjuntos;
+- `controlled_by` contra a definição de dependência de controle.
+Depois mede a montagem do índice e o custo por consulta em fluxos grandes.
+
+Uso:
+    python scripts/check_query.py
+    python scripts/check_query.py --sizes 10000 100000
+"""
+import argparse
+import glob
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from core.compiler.graph import CompiledGraph
+from core.generator.generator import generate_flow
+from core.query.query import QueryIndex
+from core.reader.reader import read_sff_file
+
+
+def _random_flow(n: int, extra: int, seed: int) -> dict:
+    """Grafo aleatório (não necessariamente um SFF válido): cadeia + edges extras, com ciclos."""
+    rng = random.Random(seed)
+    nodes = {f'v{i}': {'type': 'process', 'lane': 'l'} for i in range(n)}
+    edges = [{'from': f'v{i}', 'to': f'v{i + 1}'} for i in range(n - 1) if rng.random() < 0.8]
+    for _ in range(extra):
+        edges.append({'from': f'v{rng.randrange(n)}', 'to': f'v{rng.randrange(n)}', 'branch': rng.choice(['true', 'false'])})
+    return {'entry': {'start': 'v0', 'ends': [f'v{n - 1}']}, 'lanes': {'l': {}}, 'nodes': nodes, 'edges': edges}
+
+
+def _reach_sets(succ):
+    result = []
+    for s in range(len(succ)):
+        seen = {s}
+        stack = [s]
+        while stack:
+            for w in succ[stack.pop()]:
+                if w not in seen:
+                    seen.add(w)
+                    stack.append(w)
+        result.append(seen)
+    return result
+
+
+def _dom_sets(succ, pred, roots):
+    """Dominadores por ponto fixo (conjuntos); nós fora do alcance das raízes ficam com None."""
+    n = len(succ)
+    reach = set()
+    stack = list(roots)
+    reach.update(roots)
+    while stack:
+        for w in succ[stack.pop()]:
+            if w not in reach:
+                reach.add(w)
+                stack.append(w)
+    dom = {v: ({v} if v in roots else set(reach)) for v in reach}
+    changed = True
+    while changed:
+        changed = False
+        for v in reach:
+            if v in roots:
+                continue
+            ps = [dom[p] for p in pred[v] if p in reach]
+            new = {v} | (set.intersection(*ps) if ps else set())
+            if new != dom[v]:
+                dom[v] = new
+                changed = True
+    return [dom.get(v) for v in range(n)]
+
+
+def check(name: str, data: dict) -> bool:
+    graph = CompiledGraph(data)
+    ids = graph.node_ids
+    n = graph.num_nodes
+    succ = [list(graph.successors(i)) for i in range(n)]
+    pred = [list(graph.predecessors(i)) for i in range(n)]
+    entry = data.get('entry', {})
+    reach = _reach_sets(succ)
+    start = graph.node_index.get(entry.get('start'))
+    dom = _dom_sets(succ, pred, [start]) if start is not None else [None] * n
+    ends = [graph.node_index[e] for e in entry.get('ends', []) if e in graph.node_index] or \
+        [i for i in range(n) if not succ[i]]
+    # Ends como raízes do grafo reverso equivalem à saída virtual do índice
+    pdom = _dom_sets(pred, succ, ends)
+    ok = True
+    for method in ('bitset', 'intervals'):
+        index = QueryIndex(graph, entry.get('start'), entry.get('ends'), method)
+        for u in range(n):
+            for v in range(n):
+                if index.reaches(ids[u], ids[v]) != (v in reach[u]):
+                    print(f"  {method}: reaches({ids[u]}, {ids[v]}) divergente")
+                    ok = False
+                    break
+        for v in range(n):
+            expected = dom[v]
+            got = set(index.dominators(ids[v]))
+            if (expected or set()) != {graph.node_index[x] for x in got}:
+                print(f"  dominators({ids[v]}) divergente: {sorted(got)} != {sorted(ids[x] for x in expected or ())}")
+                ok = False
+            for a in range(n):
+                if index.dominates(ids[a], ids[v]) != (expected is not None and a in expected):
+                    print(f"  dominates({ids[a]}, {ids[v]}) divergente")
+                    ok = False
+                    break
+        for v in range(n):
+            expected = pdom[v]
+            got = {graph.node_index[x] for x in index.post_dominators(ids[v])}
+            if (expected or set()) != got:
+                print(f"  post_dominators({ids[v]}) divergente: {sorted(ids[x] for x in got)} != "
+                      f"{sorted(ids[x] for x in expected or ())}")
+                ok = False
+        # Dependência de controle: Y depende de X pela edge X→S sse Y pós-domina S e
+        # Y não pós-domina estritamente X
+        for y in range(n):
+            expected = set()
+            for x in range(n):
+                if len(succ[x]) < 2 or pdom[x] is None:
+                    continue
+                for k in graph.out_edges(x):
+                    s = graph.edge_dst[k]
+                    if pdom[s] is not None and y in pdom[s] and not (y != x and y in pdom[x]):
+                        expected.add((ids[x], graph.branch_of(k)))
+            if set(index.controlled_by(ids[y])) != expected:
+                print(f"  controlled_by({ids[y]}) divergente: {sorted(index.controlled_by(ids[y]), key=str)} != "
+                      f"{sorted(expected, key=str)}")
+                ok = False
+                break
+    print(f"{name:40} {'OK' if ok else 'ERRO'}  ({n} nós, {graph.num_edges} edges)")
+    return ok
+
+
+def bench(n: int):
+    data = generate_flow(n, seed=0)
+    graph = CompiledGraph(data)
+    ids = graph.node_ids
+    rng = random.Random(1)
+    pairs = [(rng.choice(ids), rng.choice(ids)) for _ in range(20000)]
+    for method in ('bitset', 'intervals'):
+        if method == 'bitset' and n > 20000:
+            continue
+        t0 = time.perf_counter()
+        index = QueryIndex(graph, data['entry']['start'], data['entry']['ends'], method)
+        build = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        for a, b in pairs:
+            index.reaches(a, b)
+        per_reach = (time.perf_counter() - t0) / len(pairs) * 1e6
+        t0 = time.perf_counter()
+        for a, b in pairs:
+            index.dominates(a, b)
+        per_dom = (time.perf_counter() - t0) / len(pairs) * 1e6
+        stats = index.stats()
+        print(f"{n:>9} nós {method:<10} montagem {build * 1000:9.1f} ms  reaches {per_reach:5.2f} µs  "
+              f"dominates {per_dom:5.2f} µs  componentes {stats['components']}  fecho {stats['closure_bytes'] / 1024:.0f} KiB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000])
+    args = parser.parse_args()
+    root = os.path.join(os.path.dirname(__file__), '..')
+    ok = True
+    for f in sorted(glob.glob(os.path.join(root, 'exemplo', '*.sff'))):
+        ok = check(os.path.relpath(f, root), read_sff_file(f)) and ok
+    for seed in range(3):
+        ok = check(f'gerado 120 nós (semente {seed})', generate_flow(120, seed=seed)) and ok
+    for seed in range(20):
+        ok = check(f'aleatório 40 nós (semente {seed})', _random_flow(40, 25, seed)) and ok
+    for n in args.sizes:
+        bench(n)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
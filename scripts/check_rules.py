@@ -0,0 +1,191 @@
+"""
+scripts/check_rules.py
+Confere o motor de regras da validação (core.validator.rules) e mede limites e paralelismo.
+
+Para os exemplos do repositório, fluxos gerados e versões quebradas deles
+(edges pendentes, start removido, end com saída, nós isolados, decisions sem
+branch):
+- a execução paralela (workers por fork, forçada mesmo com uma CPU) devolve
+  exatamente a lista da execução sequencial;
+- com `max_errors=k` saem os k primeiros erros pela ordem de custo das regras
+  e `fail_fast` equivale a `max_errors=1`;
+- edges pendentes viram erros `SFF000` (sem KeyError) e as regras que
+  dependem delas são puladas;
+- `Issue` mantém código, nó e severidade depois de pickle (cache em disco);
+- `max_errors` menor que 1 é recusado (ValueError na API, erro de uso na
+  CLI, HTTP 400 no servidor) em vez de desligar a validação.
+Depois mede, em fluxos grandes, a validação completa contra `max_errors` e a
+sequencial contra a paralela.
+
+Uso:
+    python scripts/check_rules.py
+    python scripts/check_rules.py --size 1000000 --dangling 10000
+"""
+import argparse
+import copy
+import glob
+import json
+import os
+import pickle
+import random
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from core.cache.cache import FlowCache
+from core.compiler.graph import CompiledGraph
+from core.generator.generator import generate_flow
+from core.linker.linker import load_flow
+from core.reader.reader import iter_sff_events, read_sff_file
+from core.server.server import handle_request
+from core.validator import rules
+from core.validator.validator import check_sff_logic, validate_sff_stream
+
+
+def _break(data: dict, rng: random.Random) -> dict:
+    """Cópia com alguns defeitos sorteados."""
+    broken = copy.deepcopy(data)
+    nodes, edges = broken['nodes'], broken['edges']
+    ids = list(nodes)
+    for _ in range(rng.randint(1, 4)):
+        kind = rng.choice(['dangling', 'start', 'end_out', 'isolated', 'decision', 'malformed'])
+        if kind == 'dangling':
+            edges.append({'from': rng.choice(ids), 'to': f'fantasma{rng.randrange(100)}'})
+        elif kind == 'start':
+            for node_id, node in nodes.items():
+                if node.get('type') == 'start':
+                    nodes[node_id] = dict(node, type='process')
+        elif kind == 'end_out':
+            ends = [x for x in ids if nodes[x].get('type') == 'end']
+            if ends:
+                edges.append({'from': rng.choice(ends), 'to': rng.choice(ids)})
+        elif kind == 'isolated':
+            nodes[f'solto{rng.randrange(100)}'] = {'type': 'process', 'lane': nodes[ids[0]].get('lane')}
+        elif kind == 'decision':
+            decisions = [x for x in ids if nodes[x].get('type') == 'decision']
+            if decisions:
+                node_id = rng.choice(decisions)
+                nodes[node_id] = dict(nodes[node_id], branches={'true': nodes[node_id]['branches']['true']})
+        else:
+            edges.append({'from': rng.choice(ids)})
+    return broken
+
+
+def _check(name: str, data: dict) -> bool:
+    ok = True
+    graph = CompiledGraph(data)
+    full = check_sff_logic(data, graph, parallel=False)
+    parallel = check_sff_logic(data, graph, parallel=True)
+    if parallel['errors'] != full['errors'] or [e.code for e in parallel['errors']] != [e.code for e in full['errors']]:
+        print("  paralela difere da sequencial")
+        ok = False
+    order = [rule.name for rule in rules._execution_order(rules.registered_rules())]
+    for k in (1, 2, 5):
+        limited = check_sff_logic(data, graph, max_errors=k)
+        expected = [e for e in rules._cap(full['errors'], order, k)]
+        if limited['errors'] != expected:
+            print(f"  max_errors={k}: {limited['errors']} != {expected}")
+            ok = False
+        if limited['limited'] != (len(full['errors']) >= k):
+            print(f"  max_errors={k}: limited={limited['limited']} com {len(full['errors'])} erros")
+            ok = False
+    if check_sff_logic(data, graph, fail_fast=True)['errors'] != check_sff_logic(data, graph, max_errors=1)['errors']:
+        print("  fail_fast difere de max_errors=1")
+        ok = False
+    if graph.dangling_edges:
+        if not any(e.code == 'SFF000' for e in full['errors']) or 'alcancabilidade' not in full['skipped']:
+            print("  edges pendentes sem SFF000 ou sem pular as regras dependentes")
+            ok = False
+    for issue in pickle.loads(pickle.dumps(full['errors'] + full['warnings'])):
+        if not issue.code or issue.severity not in rules.SEVERITIES:
+            print(f"  Issue sem código/severidade após pickle: {issue!r}")
+            ok = False
+            break
+    print(f"{name:40} {'OK' if ok else 'ERRO'}  ({len(full['errors'])} erros, puladas: {', '.join(full['skipped']) or '-'})")
+    return ok
+
+
+def _check_limits(root: str) -> bool:
+    """`max_errors` 0 ou negativo: erro explícito em todas as entradas, nunca validação vazia."""
+    ok = True
+    path = os.path.join(root, 'exemplo', 'invalid_logic.sff')
+    data = read_sff_file(path)
+    graph = CompiledGraph(data)
+    for k in (0, -1):
+        calls = {
+            'run_rules': lambda: rules.run_rules(data, graph, max_errors=k),
+            'check_sff_logic': lambda: check_sff_logic(data, graph, max_errors=k),
+            'validate_sff_stream': lambda: validate_sff_stream(iter_sff_events(path), max_errors=k),
+            'load_flow': lambda: load_flow(path, FlowCache(), data, max_errors=k),
+        }
+        for name, call in calls.items():
+            try:
+                call()
+            except ValueError:
+                continue
+            print(f"  {name}(max_errors={k}) não levantou ValueError")
+            ok = False
+        for command in (['compile', path], ['validate', path, '--stream']):
+            proc = subprocess.run([sys.executable, '-m', 'core.cli', *command, '--max-errors', str(k), '--no-cache'],
+                                  cwd=root, capture_output=True, text=True)
+            if proc.returncode == 0 or '--max-errors inválido' not in proc.stdout:
+                print(f"  CLI {command[0]} --max-errors {k}: código {proc.returncode}, saída {proc.stdout.strip()!r}")
+                ok = False
+        status, _, _ = handle_request('/compile', json.dumps(data).encode('utf-8'), {'max_errors': str(k)})
+        if status != 400:
+            print(f"  servidor max_errors={k}: HTTP {status}")
+            ok = False
+    print(f"{'max_errors < 1 recusado':40} {'OK' if ok else 'ERRO'}")
+    return ok
+
+
+def bench(n: int, dangling: int):
+    data = generate_flow(n, seed=0)
+    graph = CompiledGraph(data)
+    cpus = rules._available_cpus()
+    for parallel in (False, True):
+        t0 = time.perf_counter()
+        check_sff_logic(data, graph, parallel=parallel)
+        print(f"{n:>9} nós válidos   {'paralela' if parallel else 'sequencial':10} {(time.perf_counter() - t0) * 1000:8.1f} ms  ({cpus} CPU(s))")
+    rng = random.Random(0)
+    ids = list(data['nodes'])
+    data['edges'].extend({'from': rng.choice(ids), 'to': f'fantasma{i}'} for i in range(dangling))
+    t0 = time.perf_counter()
+    graph = CompiledGraph(data)
+    build = time.perf_counter() - t0
+    for max_errors in (None, 100):
+        t0 = time.perf_counter()
+        result = check_sff_logic(data, graph, max_errors=max_errors)
+        print(f"{n:>9} nós, {dangling} edges pendentes  max_errors={max_errors}: {(time.perf_counter() - t0) * 1000:8.1f} ms  "
+              f"{len(result['errors'])} erros  (IR {build * 1000:.0f} ms)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size', type=int, default=1000000)
+    parser.add_argument('--dangling', type=int, default=10000)
+    args = parser.parse_args()
+    root = os.path.join(os.path.dirname(__file__), '..')
+    # Força o caminho com workers mesmo em máquinas com uma CPU (o resultado não pode mudar)
+    available = rules._available_cpus
+    rules._available_cpus = lambda: 2
+    rng = random.Random(0)
+    ok = True
+    try:
+        flows = [(os.path.relpath(f, root), read_sff_file(f)) for f in sorted(glob.glob(os.path.join(root, 'exemplo', '*.sff')))]
+        flows += [(f'gerado 200 nós (semente {seed})', generate_flow(200, seed=seed)) for seed in range(2)]
+        for name, data in flows:
+            ok = _check(name, data) and ok
+            for i in range(5):
+                ok = _check(f'{name} quebrado #{i}', _break(data, rng)) and ok
+    finally:
+        rules._available_cpus = available
+    ok = _check_limits(root) and ok
+    bench(args.size, args.dangling)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+"""
+scripts/check_session.py
+Verificação aleatória de equivalência da sessão incremental (FlowSession).
+
+Aplica sequências aleatórias de operações (adicionar/remover nó e edge,
+trocar lane) e, após cada uma, compara erros, índice prev/next e ranks da
+sessão com `compile_sff` + `generate_layout` sobre o documento resultante e
+os erros com `validate_sff_logic` também por código, nó e regra (`Issue`),
+incluindo nós subflow com e sem `subflow.file`.
+A cada `--layout-every` operações compara também o layout completo.
+
+Uso:
+    python scripts/check_session.py
+    python scripts/check_session.py --seeds 50 --ops 300 --rank-mode network-simplex
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from core.compiler.compiler import compile_sff
+from core.layout.layout import generate_layout
+from core.layout.ranking import RANK_MODES, DEFAULT_RANK_MODE
+from core.reader.reader import read_sff_file
+from core.session.session import FlowSession
+from core.validator.validator import validate_sff_logic
+from scripts.bench_validator import make_flow
+
+NODE_TYPES = ['process', 'process', 'process', 'decision', 'end', 'start', 'subflow']
+
+
+def _without_timing(layout):
+    stats = layout.get('routing_stats')
+    if stats:
+        layout = dict(layout, routing_stats=dict(stats, time_ms=None))
+    return layout
+
+
+def random_op(rng: random.Random, session: FlowSession, counter: list):
+    """Aplica uma operação aleatória válida; retorna sua descrição."""
+    nodes = list(session.data['nodes'])
+    lanes = list(session.data.get('lanes', {})) + [None]
+    choice = rng.random()
+    if choice < 0.2 or len(nodes) < 3:
+        counter[0] += 1
+        node_id = f'x{counter[0]}'
+        node_type = rng.choice(NODE_TYPES)
+        node = {'type': node_type, 'lane': rng.choice(lanes[:-1] or [None]), 'label': node_id}
+        if node_type == 'decision':
+            node['branches'] = {'true': {'next': rng.choice(nodes + [f'x{counter[0] + 1}'])},
+                                'false': {'next': rng.choice(nodes)}}
+        elif node_type == 'subflow' and rng.random() < 0.5:
+            node['subflow'] = {'file': f'{node_id}.sff'}
+        session.add_node(node_id, node)
+        return ('add_node', node_id)
+    if choice < 0.3:
+        node_id = rng.choice(nodes)
+        session.remove_node(node_id)
+        return ('remove_node', node_id)
+    if choice < 0.65:
+        u, v = rng.choice(nodes), rng.choice(nodes)
+        edge = {'from': u, 'to': v}
+        if session.data['nodes'][u].get('type') == 'decision':
+            edge['branch'] = rng.choice(['true', 'false'])
+        session.add_edge(edge)
+        return ('add_edge', u, v)
+    if choice < 0.9 and session.data['edges']:
+        edge = rng.choice(session.data['edges'])
+        session.remove_edge(edge['from'], edge['to'], edge.get('branch'))
+        return ('remove_edge', edge['from'], edge['to'])
+    node_id = rng.choice(nodes)
+    lane = rng.choice(lanes)
+    session.change_lane(node_id, lane)
+    return ('change_lane', node_id, lane)
+
+
+def check(session: FlowSession, with_layout: bool):
+    """Levanta AssertionError se a sessão divergir da recompilação completa."""
+    compiled = compile_sff(session.data)
+    assert session.errors == compiled['validation']['errors'], 'erros divergentes'
+    issue = lambda i: (str(i), i.code, i.node, i.severity, i.rule)
+    assert [issue(i) for i in session.errors] == [issue(i) for i in validate_sff_logic(session.data)], \
+        'códigos/nós dos erros divergentes de validate_sff_logic'
+    assert session.warnings == compiled['validation']['warnings'], 'avisos divergentes'
+    assert session.index['prev'] == compiled['index']['prev'], 'índice prev divergente'
+    assert session.index['next'] == compiled['index']['next'], 'índice next divergente'
+    full = generate_layout(session.data, compiled, session.rank_mode)
+    if session.data.get('entry', {}).get('start') is not None:
+        assert session.ranks == full['ranks'], 'ranks divergentes'
+    if with_layout:
+        assert _without_timing(session.layout()) == _without_timing(full), 'layout divergente'
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Equivalência FlowSession × recompilação completa')
+    parser.add_argument('--seeds', type=int, default=20)
+    parser.add_argument('--ops', type=int, default=200)
+    parser.add_argument('--layout-every', type=int, default=10)
+    parser.add_argument('--rank-mode', choices=RANK_MODES, default=DEFAULT_RANK_MODE)
+    args = parser.parse_args()
+    base = os.path.join(os.path.dirname(__file__), '..', 'exemplo')
+    flows = [make_flow(40), make_flow(120, decision_every=7)]
+    flows += [read_sff_file(os.path.join(base, name)) for name in sorted(os.listdir(base)) if name.endswith('.sff')]
+    t0 = time.perf_counter()
+    total = 0
+    for seed in range(args.seeds):
+        rng = random.Random(seed)
+        session = FlowSession(flows[seed % len(flows)], args.rank_mode)
+        counter = [0]
+        history = []
+        for step in range(args.ops):
+            history.append(random_op(rng, session, counter))
+            try:
+                check(session, step % args.layout_every == 0)
+            except AssertionError as e:
+                print(f"FALHA seed={seed} passo={step}: {e}")
+                print("Últimas operações:", history[-5:])
+                sys.exit(1)
+            total += 1
+    print(f"OK: {total} operações em {args.seeds} seeds ({time.perf_counter() - t0:.1f}s)")
+
+
+if __name__ == '__main__':
+    main()
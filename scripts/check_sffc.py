@@ -0,0 +1,104 @@
+"""
+scripts/check_sffc.py
+Round-trip do formato binário compilado (.sffc) contra o export JSON.
+
+Para cada fluxo (exemplos do repositório + fluxos sintéticos) grava o .sffc,
+carrega com `load_compiled` e confere que o export JSON gerado a partir do
+arquivo carregado é idêntico ao gerado a partir de compile_sff + generate_layout
+(forma indentada, compacta e em streaming). Também confere que o layout
+recalculado sobre a IR carregada é o mesmo e mede o tempo de carga. Por fim,
+confere que um .sffc gravado por outra versão do engine é recusado (e só
+abre com `allow_stale=True`, marcado como `stale`).
+
+Uso:
+    python scripts/check_sffc.py
+    python scripts/check_sffc.py --sizes 1000 100000
+"""
+import argparse
+import glob
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from bench_validator import make_flow
+from core.compiler.compiler import compile_sff
+from core.exporters.json_exporter import export_json, iter_json
+from core.layout.layout import generate_layout
+from core.reader.reader import read_sff_file
+from core.sffc import sffc
+from core.sffc.sffc import load_compiled, write_sffc
+
+
+def _strip_time(layout):
+    return dict(layout, routing_stats=dict(layout['routing_stats'], time_ms=None))
+
+
+def check(name: str, data, path: str) -> bool:
+    compiled = compile_sff(data)
+    layout = None if compiled['validation']['errors'] else generate_layout(data, compiled)
+    with open(path, 'wb') as f:
+        size = write_sffc(data, compiled, layout, f)
+    t0 = time.perf_counter()
+    flow = load_compiled(path)
+    load_ms = (time.perf_counter() - t0) * 1000
+    with flow:
+        ok = flow.compiled['validation'] == compiled['validation']
+        if layout is None:
+            ok = ok and flow.layout is None
+        else:
+            expected = export_json(data, compiled, layout)
+            ok = ok and export_json(flow.data, flow.compiled, flow.layout) == expected
+            ok = ok and ''.join(iter_json(flow.data, flow.compiled, flow.layout)) == expected
+            ok = ok and (export_json(flow.data, flow.compiled, flow.layout, compact=True)
+                         == export_json(data, compiled, layout, compact=True))
+            relaid = generate_layout(flow.data, flow.compiled)
+            ok = ok and _strip_time(relaid) == _strip_time(layout)
+    print(f"{name:40} {'OK ' if ok else 'ERRO'} {size:>12} bytes  carga {load_ms:8.3f} ms")
+    return ok
+
+
+def check_stale(data, path: str) -> bool:
+    """Arquivo gravado com outra ENGINE_VERSION: recusado por padrão, aberto com allow_stale."""
+    compiled = compile_sff(data)
+    layout = generate_layout(data, compiled)
+    current = sffc.ENGINE_VERSION
+    sffc.ENGINE_VERSION = '0.0'
+    try:
+        with open(path, 'wb') as f:
+            write_sffc(data, compiled, layout, f)
+    finally:
+        sffc.ENGINE_VERSION = current
+    try:
+        load_compiled(path).close()
+        ok = False
+    except ValueError:
+        ok = True
+    with load_compiled(path, allow_stale=True) as flow:
+        ok = ok and flow.stale
+    print(f"{'versão antiga do engine':40} {'OK ' if ok else 'ERRO'}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 10000])
+    args = parser.parse_args()
+    root = os.path.join(os.path.dirname(__file__), '..')
+    files = sorted(glob.glob(os.path.join(root, 'exemplo', '*.sff')))
+    files.append(os.path.join(root, 'docs', 'model', 'example.sff'))
+    ok = True
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'flow.sffc')
+        for f in files:
+            ok = check(os.path.relpath(f, root), read_sff_file(f), path) and ok
+        for n in args.sizes:
+            ok = check(f'sintético {n} nós', make_flow(n), path) and ok
+        ok = check_stale(make_flow(100), path) and ok
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+"""
+scripts/loadtest_server.py
+Teste de carga do servidor (`python -m core.cli serve`).
+
+Abre `--concurrency` conexões keep-alive e dispara `--requests` POSTs no
+total, medindo a latência de cada um. Reporta p50/p90/p99, média e vazão.
+Com `--spawn`, sobe o servidor em um subprocesso e o encerra ao final.
+`--unique` altera o documento a cada requisição (sem acerto no cache de
+respostas), medindo o caminho completo de compilação/layout.
+
+Uso:
+    python scripts/loadtest_server.py --spawn
+    python scripts/loadtest_server.py --route /export?format=mermaid --requests 5000 --concurrency 32
+    python scripts/loadtest_server.py --spawn --socket /tmp/sff.sock --unique
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+
+
+async def _request(reader, writer, host: str, route: str, body: bytes):
+    writer.write((f'POST {route} HTTP/1.1\r\nHost: {host}\r\n'
+                  f'Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n').encode('latin-1') + body)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        if name.lower() == 'content-length':
+            length = int(value)
+    await reader.readexactly(length)
+    return status
+
+
+async def _connect(args):
+    if args.socket:
+        return await asyncio.open_unix_connection(args.socket)
+    return await asyncio.open_connection(args.host, args.port)
+
+
+async def _client(args, doc, counter, latencies, statuses):
+    reader, writer = await _connect(args)
+    try:
+        while counter[0] < args.requests:
+            counter[0] += 1
+            if args.unique:
+                doc['sff']['id'] = f"loadtest_{counter[0]}"
+            body = json.dumps(doc).encode('utf-8')
+            t0 = time.perf_counter()
+            status = await _request(reader, writer, args.host, args.route, body)
+            latencies.append((time.perf_counter() - t0) * 1000)
+            statuses[status] = statuses.get(status, 0) + 1
+    finally:
+        writer.close()
+
+
+async def _wait_ready(args, timeout: float = 15.0):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            _, writer = await _connect(args)
+            writer.close()
+            return
+        except OSError:
+            await asyncio.sleep(0.1)
+    raise RuntimeError('Servidor não respondeu a tempo')
+
+
+def percentile(values, p: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    k = min(len(ordered) - 1, max(0, round(p / 100 * (len(ordered) - 1))))
+    return ordered[k]
+
+
+async def run(args):
+    with open(args.file, encoding='utf-8') as f:
+        doc = json.load(f)
+    await _wait_ready(args)
+    counter = [0]
+    latencies = []
+    statuses = {}
+    t0 = time.perf_counter()
+    await asyncio.gather(*(_client(args, json.loads(json.dumps(doc)), counter, latencies, statuses)
+                           for _ in range(args.concurrency)))
+    elapsed = time.perf_counter() - t0
+    return {
+        'route': args.route,
+        'requests': len(latencies),
+        'concurrency': args.concurrency,
+        'unique': args.unique,
+        'status': statuses,
+        'p50_ms': round(percentile(latencies, 50), 3),
+        'p90_ms': round(percentile(latencies, 90), 3),
+        'p99_ms': round(percentile(latencies, 99), 3),
+        'mean_ms': round(sum(latencies) / max(len(latencies), 1), 3),
+        'throughput_rps': round(len(latencies) / elapsed, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Teste de carga do servidor SFF')
+    parser.add_argument('--file', default=os.path.join(ROOT, 'exemplo', 'order_orchestration_flow.sff'))
+    parser.add_argument('--route', default='/layout')
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--socket')
+    parser.add_argument('--unique', action='store_true')
+    parser.add_argument('--spawn', action='store_true')
+    parser.add_argument('--workers', type=int)
+    args = parser.parse_args()
+    server = None
+    if args.spawn:
+        cmd = [sys.executable, '-m', 'core.cli', 'serve', '--host', args.host, '--port', str(args.port)]
+        if args.socket:
+            cmd += ['--socket', args.socket]
+        if args.workers:
+            cmd += ['--workers', str(args.workers)]
+        server = subprocess.Popen(cmd, cwd=ROOT, stdout=subprocess.DEVNULL)
+    try:
+        print(json.dumps(asyncio.run(run(args)), ensure_ascii=False))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == '__main__':
+    main()